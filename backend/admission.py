@@ -0,0 +1,221 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional
+
+from pymongo import ReturnDocument
+
+
+class Overloaded(Exception):
+    """A request was refused; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token; returns 0 on success, else seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """A token bucket per key (session id, client IP, ...). `rate` <= 0
+    disables the limit. Buckets of the least recently seen keys are dropped
+    beyond `max_keys`; a dropped key simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self.stats = {"allowed": 0, "limited": 0}
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def check(self, key: Hashable):
+        """Raise Overloaded if `key` is over its rate"""
+        if self.rate <= 0:
+            return
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        wait = bucket.take()
+        if wait:
+            self.stats["limited"] += 1
+            raise Overloaded("Rate limit exceeded", wait)
+        self.stats["allowed"] += 1
+
+
+class MongoRateLimiter(RateLimiter):
+    """A rate limit shared by every worker process.
+
+    Each key may make `burst` requests per window of burst / rate seconds,
+    counted in one MongoDB document per (scope, key, window) that expires
+    with the window (TTL index). A fixed window lets a key send up to
+    2 * burst across a window boundary, but the sustained rate holds no
+    matter how many workers share the collection. Until `collection` is
+    set, or when a MongoDB call fails, the worker's own token buckets
+    apply instead.
+    """
+
+    def __init__(self, collection, scope: str, rate: float, burst: float, max_keys: int = 100000):
+        super().__init__(rate, burst, max_keys)
+        self.collection = collection
+        self.scope = scope
+        self.window = self.burst / rate if rate > 0 else 0.0
+        self.stats["fallback"] = 0
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=0)
+
+    async def check_shared(self, key: Hashable):
+        """Raise Overloaded if `key` is over its rate across all workers"""
+        if self.rate <= 0:
+            return
+        if self.collection is None:
+            return self.check(key)
+        now = time.time()
+        window = int(now // self.window)
+        remaining = (window + 1) * self.window - now
+        try:
+            doc = await self.collection.find_one_and_update(
+                {"_id": f"{self.scope}:{key}:{window}"},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": datetime.utcnow() + timedelta(seconds=remaining)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception:
+            self.stats["fallback"] += 1
+            return self.check(key)
+        if doc["count"] > self.burst:
+            self.stats["limited"] += 1
+            raise Overloaded("Rate limit exceeded", remaining)
+        self.stats["allowed"] += 1
+
+
+class AdmissionController:
+    """Caps concurrent chat turns at `max_concurrent`.
+
+    Requests beyond the cap wait in a bounded priority queue (lower number
+    = served first, FIFO within a priority) for up to `queue_timeout`
+    seconds. When the queue is full, a new request either displaces the
+    lowest-priority waiter (if it has a higher priority itself) or is
+    refused straight away, so overload is shed fast instead of piling up.
+    """
+
+    def __init__(self, max_concurrent: int = 32, max_queue: int = 256, queue_timeout: float = 10.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        # (priority, sequence, future) heap; cancelled entries are skipped lazily
+        self.queue: List[tuple] = []
+        self.waiting = 0
+        self.sequence = itertools.count()
+        # Smoothed seconds per admitted request, for Retry-After estimates
+        self.service_time = 1.0
+        self.stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_timeout": 0, "displaced": 0}
+
+    def retry_after(self) -> float:
+        """Rough time until a slot frees up for a request joining the back of the queue"""
+        return self.service_time * (self.waiting + 1) / self.max_concurrent
+
+    def displace_lowest(self, priority: int) -> bool:
+        """Refuse the lowest-priority waiter if it ranks below `priority`"""
+        live = [entry for entry in self.queue if not entry[2].done()]
+        if not live:
+            return False
+        worst = max(live, key=lambda entry: (entry[0], entry[1]))
+        if worst[0] <= priority:
+            return False
+        worst[2].set_exception(Overloaded("Displaced by higher-priority traffic", self.retry_after()))
+        self.waiting -= 1
+        self.stats["displaced"] += 1
+        return True
+
+    async def acquire(self, priority: int = 1) -> float:
+        """Wait for a slot; returns the time it was admitted. Raises Overloaded."""
+        if self.active < self.max_concurrent and not self.waiting:
+            self.active += 1
+            self.stats["admitted"] += 1
+            return time.monotonic()
+        if self.waiting >= self.max_queue and not self.displace_lowest(priority):
+            self.stats["shed_queue_full"] += 1
+            raise Overloaded("Server is at capacity", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.queue, (priority, next(self.sequence), future))
+        self.waiting += 1
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.abandon(future)
+            self.stats["shed_timeout"] += 1
+            raise Overloaded("Timed out waiting for capacity", self.retry_after())
+        except asyncio.CancelledError:
+            self.abandon(future)
+            raise
+        self.stats["admitted"] += 1
+        return time.monotonic()
+
+    def abandon(self, future: asyncio.Future):
+        """Leave the queue after a timeout or cancellation"""
+        if not future.done():
+            future.cancel()
+            self.waiting -= 1
+        elif not future.cancelled() and future.exception() is None:
+            # Handed a slot just as we gave up: pass it on
+            self.release()
+
+    def release(self, admitted_at: Optional[float] = None):
+        """Free a slot, handing it straight to the best waiter if there is one"""
+        if admitted_at is not None:
+            self.service_time = 0.9 * self.service_time + 0.1 * (time.monotonic() - admitted_at)
+        while self.queue:
+            _, _, future = heapq.heappop(self.queue)
+            if not future.done():
+                self.waiting -= 1
+                # The slot passes to the waiter, so `active` stays the same
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def metrics(self) -> Dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            **self.stats,
+            "service_time": round(self.service_time, 3)
+        }
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+try:
+    import zstandard
+except ImportError:
+    # Archives are zlib-compressed instead; either codec can always be read back if installed
+    zstandard = None
+
+logger = logging.getLogger("saarthi.archive")
+
+EPOCH = datetime(1970, 1, 1)
+
+# Archived turns store the persona as its index here; append new personas, never reorder
+PERSONA_CODES = ("general", "education", "mental_health")
+
+# (timestamp, _id): the order turns are paginated in
+Position = Tuple[datetime, str]
+
+
+def encode_persona(persona: str):
+    """Small integer code for a known persona; unknown ones are kept as strings"""
+    return PERSONA_CODES.index(persona) if persona in PERSONA_CODES else persona
+
+
+def decode_persona(code) -> str:
+    return PERSONA_CODES[code] if isinstance(code, int) else code
+
+
+def expand_conversation(doc: Dict, persona_names: Dict[str, str]) -> Dict:
+    """Fill in the fields compact documents leave out: persona_name (derived
+    from persona_used) and error (omitted when there was none)
+    """
+    if "persona_name" not in doc and "persona_used" in doc:
+        doc["persona_name"] = persona_names.get(doc["persona_used"], doc["persona_used"])
+    doc.setdefault("error", None)
+    return doc
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return zlib.compress(data, 9)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def default_codec() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def to_millis(timestamp: datetime) -> int:
+    return (timestamp - EPOCH) // timedelta(milliseconds=1)
+
+
+def pack_chunk(turns: List[Dict], codec: str) -> Dict:
+    """One archive document for consecutive turns of a session, oldest first.
+
+    Turns become compact NDJSON rows - [_id, epoch ms, user message,
+    response, persona code] plus the error, if any - compressed together.
+    The chunk's _id is its first turn's, so archiving the same turns again
+    replaces the chunk instead of duplicating it.
+    """
+    rows = []
+    for turn in turns:
+        row = [turn["_id"], to_millis(turn["timestamp"]), turn["user_message"], turn["ai_response"],
+               encode_persona(turn["persona_used"])]
+        if turn.get("error") is not None:
+            row.append(turn["error"])
+        rows.append(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+    return {
+        "_id": turns[0]["_id"],
+        "session_id": turns[0]["session_id"],
+        "start": turns[0]["timestamp"],
+        "end": turns[-1]["timestamp"],
+        "last_id": turns[-1]["_id"],
+        "count": len(turns),
+        "codec": codec,
+        "data": compress("\n".join(rows).encode(), codec)
+    }
+
+
+def unpack_chunk(chunk: Dict) -> List[Dict]:
+    """The turns of an archive document, as conversation documents without persona_name"""
+    turns = []
+    for line in decompress(chunk["data"], chunk["codec"]).decode().split("\n"):
+        row = json.loads(line)
+        turn = {
+            "_id": row[0],
+            "session_id": chunk["session_id"],
+            "user_message": row[2],
+            "ai_response": row[3],
+            "persona_used": decode_persona(row[4]),
+            "timestamp": EPOCH + timedelta(milliseconds=row[1])
+        }
+        if len(row) > 5:
+            turn["error"] = row[5]
+        turns.append(turn)
+    return turns
+
+
+async def ensure_archive_indexes(archive):
+    await archive.create_index(
+        [("session_id", ASCENDING), ("start", ASCENDING), ("_id", ASCENDING)],
+        name="session_start"
+    )
+
+
+async def archived_turns(archive, session_id: str, after: Optional[Position] = None,
+                         before: Optional[Position] = None, descending: bool = False) -> AsyncIterator[Dict]:
+    """A session's archived turns strictly between `after` and `before`, in (timestamp, _id) order.
+
+    Chunks never overlap, so only those whose time range reaches the bounds
+    are fetched and decompressed, one at a time.
+    """
+    query = {"session_id": session_id}
+    if after is not None:
+        query["end"] = {"$gte": after[0]}
+    if before is not None:
+        query["start"] = {"$lte": before[0]}
+    order = -1 if descending else 1
+    async for chunk in archive.find(query).sort([("start", order), ("_id", order)]):
+        turns = unpack_chunk(chunk)
+        if descending:
+            turns.reverse()
+        for turn in turns:
+            position = (turn["timestamp"], turn["_id"])
+            if (after is not None and position <= after) or (before is not None and position >= before):
+                continue
+            yield turn
+
+
+async def archive_conversations(conversations, archive, cutoff: datetime, chunk_turns: int = 500,
+                                codec: Optional[str] = None, write_batch: int = 100) -> Dict[str, int]:
+    """Move every turn older than `cutoff` from `conversations` into compressed per-session chunks.
+
+    Turns are read in (session_id, timestamp, _id) order along the
+    conversations index. Every `write_batch` chunks, the chunks are written
+    first and only then are their turns deleted from the hot collection, so
+    an interrupted run loses nothing and a rerun rewrites the same chunks.
+    Since turns are archived oldest first, a session's archived turns
+    always come before its hot ones.
+    """
+    codec = codec or default_codec()
+    stats = {"turns": 0, "chunks": 0, "bytes": 0}
+    pending: List[Dict] = []
+    turn_ids: List[str] = []
+
+    async def write():
+        await archive.bulk_write([ReplaceOne({"_id": chunk["_id"]}, chunk, upsert=True) for chunk in pending],
+                                 ordered=False)
+        await conversations.delete_many({"_id": {"$in": turn_ids}})
+        stats["chunks"] += len(pending)
+        stats["turns"] += len(turn_ids)
+        stats["bytes"] += sum(len(chunk["data"]) for chunk in pending)
+        pending.clear()
+        turn_ids.clear()
+
+    turns: List[Dict] = []
+    cursor = conversations.find(
+        {"timestamp": {"$lt": cutoff}},
+        {"idempotency_key": 0}
+    ).sort([("session_id", 1), ("timestamp", 1), ("_id", 1)])
+    async for doc in cursor:
+        if turns and (doc["session_id"] != turns[0]["session_id"] or len(turns) >= chunk_turns):
+            pending.append(pack_chunk(turns, codec))
+            turn_ids.extend(turn["_id"] for turn in turns)
+            turns = []
+            if len(pending) >= write_batch:
+                await write()
+        turns.append(doc)
+    if turns:
+        pending.append(pack_chunk(turns, codec))
+        turn_ids.extend(turn["_id"] for turn in turns)
+    if pending:
+        await write()
+    return stats
+
+
+async def expire_conversations(db, cutoff: datetime) -> Dict[str, int]:
+    """Delete every turn, hot or archived, and every session summary last active before `cutoff`"""
+    hot = await db.conversations.delete_many({"timestamp": {"$lt": cutoff}})
+    archived = await db.conversation_archive.delete_many({"end": {"$lt": cutoff}})
+    sessions = await db.sessions.delete_many({"last_updated": {"$lt": cutoff}})
+    return {"turns": hot.deleted_count, "chunks": archived.deleted_count, "sessions": sessions.deleted_count}
+
+
+async def acquire_lease(collection, name: str, owner: str, seconds: float) -> bool:
+    """Hold the named lease for `seconds` unless another owner holds an unexpired one"""
+    now = datetime.utcnow()
+    try:
+        await collection.update_one(
+            {"_id": name, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+class ConversationArchiver:
+    """Periodic retention job for the conversations collection.
+
+    Every `interval` seconds, turns older than `archive_after` days move
+    into compressed per-session chunks in the archive collection, and
+    anything older than `retain_days` (if set) is deleted from both tiers.
+    With several workers, a lease in `db.jobs` lets only one of them run
+    the job at a time.
+    """
+
+    def __init__(self, db, archive_after: float, retain_days: float = 0, interval: float = 3600,
+                 chunk_turns: int = 500):
+        self.db = db
+        self.archive_after = archive_after
+        self.retain_days = retain_days
+        self.interval = interval
+        self.chunk_turns = chunk_turns
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"runs": 0, "archived": 0, "expired": 0, "failures": 0}
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run_once(self) -> bool:
+        """One archival pass, if this worker holds the lease; True if it ran"""
+        if not await acquire_lease(self.db.jobs, "conversation_archiver", self.owner, self.interval):
+            return False
+        now = datetime.utcnow()
+        if self.archive_after > 0:
+            result = await archive_conversations(
+                self.db.conversations,
+                self.db.conversation_archive,
+                now - timedelta(days=self.archive_after),
+                chunk_turns=self.chunk_turns
+            )
+            self.stats["archived"] += result["turns"]
+            logger.info("Archived conversations", extra=result)
+        if self.retain_days > 0:
+            result = await expire_conversations(self.db, now - timedelta(days=self.retain_days))
+            self.stats["expired"] += result["turns"]
+            logger.info("Expired conversations", extra=result)
+        self.stats["runs"] += 1
+        return True
+
+    async def run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error("Conversation archival failed: %s", e, extra={"error_type": type(e).__name__})
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
@@ -0,0 +1,79 @@
+import asyncio
+import json
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+class BatchRow:
+    """One input line of a batch: the validated request, or why it was rejected"""
+
+    def __init__(self, line: int, request: Any = None, error: Optional[str] = None):
+        self.line = line
+        self.request = request
+        self.error = error
+        # Filled in by the single classification pass over the whole batch
+        self.persona: Optional[str] = None
+
+
+def parse_rows(lines: Iterable[str], validate: Callable[[Dict], Any]) -> List[BatchRow]:
+    """Parse JSONL lines into rows; blank lines are skipped, bad ones kept with an error.
+
+    `validate` turns a decoded object into a request and raises ValueError
+    (pydantic's ValidationError is one) or TypeError if it isn't one.
+    """
+    rows = []
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError("Each line must be a JSON object")
+            rows.append(BatchRow(number, request=validate(data)))
+        except (ValueError, TypeError) as e:
+            rows.append(BatchRow(number, error=str(e)))
+    return rows
+
+
+def group_rows(rows: List[BatchRow]) -> List[List[BatchRow]]:
+    """Valid rows grouped by session (in input order), sessions ordered by persona.
+
+    A session's rows must run one after another so each turn sees the
+    history of the previous one. Sessions that open with the same persona
+    are dispatched next to each other, so calls in flight together share a
+    system prompt.
+    """
+    sessions: Dict[str, List[BatchRow]] = {}
+    for row in rows:
+        if row.request is not None:
+            sessions.setdefault(row.request.session_id, []).append(row)
+    return sorted(sessions.values(), key=lambda group: group[0].persona or "")
+
+
+async def run_groups(groups: List[List[BatchRow]], run_row: Callable[[BatchRow], Awaitable[Dict]],
+                     concurrency: int) -> AsyncIterator[Dict]:
+    """Run every group's rows in order, at most `concurrency` groups at once,
+    yielding each row's result as soon as it is ready.
+
+    Workers pull whole groups from a shared queue, so the dispatch order of
+    group_rows() is kept. Closing the iterator early cancels the workers.
+    """
+    pending = deque(groups)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while pending:
+            for row in pending.popleft():
+                results.put_nowait(await run_row(row))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(groups))))]
+    finished = asyncio.gather(*workers)
+    finished.add_done_callback(lambda _: results.put_nowait(None))
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        # Surface a worker's exception, if any
+        await finished
+    finally:
+        for task in workers:
+            task.cancel()
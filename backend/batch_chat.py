@@ -0,0 +1,59 @@
+"""
+Batch chat from the command line, for persona QA, regression replays and back-fills.
+
+Reads a JSONL file of {"session_id", "message", "persona_preference"} rows
+and answers it in-process through the same code as POST /api/chat/batch:
+one classification pass over every row, --concurrency sessions at a time
+(each session's rows in order), bulk inserts into MongoDB when it is
+reachable. Results are written as NDJSON, ending with a summary line.
+
+    python batch_chat.py prompts.jsonl --output results.ndjson --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+import server
+
+
+async def run(args) -> dict:
+    with open(args.input, encoding="utf-8") as f:
+        rows = server.parse_batch(f.readlines())
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    summary = {}
+    try:
+        async with server.lifespan(server.app):
+            await server.ensure_llm_client()
+            if server.groq_client is None:
+                raise SystemExit("❌ AI client not available; check GROQ_API_KEY and LLM_BASE_URL")
+            done = 0
+            async for item in server.run_batch(rows, args.concurrency):
+                output.write(json.dumps(item, default=str) + "\n")
+                if item["type"] == "summary":
+                    summary = item
+                elif args.output:
+                    done += 1
+                    print(f"  {done}/{len(rows)} rows", end="\r", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file, one chat row per line")
+    parser.add_argument("--output", help="NDJSON results file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=server.BATCH_CONCURRENCY, help="Sessions answered at once")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    print(f"\n✅ Answered {summary['rows']} rows in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']} rows/s): {summary['succeeded']} succeeded "
+          f"({summary['cached']} cached), {summary['failed']} failed, {summary['stored']} stored",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
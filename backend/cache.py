@@ -0,0 +1,199 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    # Only the semantic tier needs numpy
+    np = None
+
+WORD = re.compile(r"[^\W_]+")
+
+# Context hash of a turn with no prior exchanges or summary
+NO_CONTEXT = "0"
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase words only, so "Hello!" and "hello" share a cache entry"""
+    return " ".join(WORD.findall(message.lower()))
+
+
+def context_hash(context: List[Dict[str, str]]) -> str:
+    """Stable digest of the context messages sent before the user's message"""
+    if not context:
+        return NO_CONTEXT
+    payload = json.dumps([(m["role"], m["content"]) for m in context], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM responses keyed on (persona, normalized
+    message, context hash).
+
+    Turns for personas in `excluded` are never cached. When an `embedder`
+    is given, context-free turns that miss the exact tier are also matched
+    against cached context-free messages of the same persona, and a cosine
+    similarity of at least `threshold` counts as a (semantic) hit.
+    Every stored response remembers how long the LLM took to produce it, so
+    each hit adds that to `latency_saved`.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600,
+                 excluded: Iterable[str] = ("mental_health",), embedder=None, threshold: float = 0.9):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.excluded = set(excluded)
+        self.embedder = embedder
+        self.threshold = threshold
+        # key -> (expires_at, response, latency); most recently used last
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # persona -> {normalized message: embedding} for context-free entries
+        self.vectors: Dict[str, Dict[str, object]] = {}
+        # persona -> (messages, stacked embeddings), rebuilt after vectors change
+        self.matrices: Dict[str, tuple] = {}
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0,
+                      "evictions": 0, "skipped": 0, "latency_saved": 0.0}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def cacheable(self, persona: str) -> bool:
+        return persona not in self.excluded
+
+    @staticmethod
+    def key(persona: str, message: str, context: List[Dict[str, str]]) -> tuple:
+        return (persona, normalize_message(message), context_hash(context))
+
+    def lookup(self, key: tuple) -> Optional[tuple]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self.remove(key)
+            self.stats["evictions"] += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def remove(self, key: tuple):
+        self.entries.pop(key, None)
+        persona, message, context = key
+        if context == NO_CONTEXT and self.vectors.get(persona, {}).pop(message, None) is not None:
+            self.matrices.pop(persona, None)
+
+    def nearest(self, persona: str, message: str) -> Optional[tuple]:
+        """Most similar cached context-free message of `persona`, if close enough"""
+        vectors = self.vectors.get(persona)
+        if not vectors:
+            return None
+        if persona not in self.matrices:
+            self.matrices[persona] = (list(vectors), np.stack(list(vectors.values())))
+        candidates, matrix = self.matrices[persona]
+        similarities = matrix @ self.embedder.embed([message])[0]
+        best = int(similarities.argmax())
+        if similarities[best] < self.threshold:
+            return None
+        return (persona, candidates[best], NO_CONTEXT)
+
+    def get(self, persona: str, message: str, context: List[Dict[str, str]]) -> Optional[str]:
+        """Cached response for this turn, or None"""
+        if not self.cacheable(persona):
+            self.stats["skipped"] += 1
+            return None
+        key = self.key(persona, message, context)
+        entry = self.lookup(key)
+        if entry is None and self.embedder is not None and key[2] == NO_CONTEXT:
+            similar = self.nearest(persona, key[1])
+            entry = self.lookup(similar) if similar is not None else None
+            if entry is not None:
+                self.stats["semantic_hits"] += 1
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self.stats["latency_saved"] += entry[2]
+        return entry[1]
+
+    def put(self, persona: str, message: str, context: List[Dict[str, str]], response: str, latency: float = 0.0):
+        if not self.cacheable(persona):
+            return
+        key = self.key(persona, message, context)
+        self.entries[key] = (time.monotonic() + self.ttl, response, latency)
+        self.entries.move_to_end(key)
+        self.stats["stores"] += 1
+        if self.embedder is not None and key[2] == NO_CONTEXT and key[1] not in self.vectors.get(persona, {}):
+            self.vectors.setdefault(persona, {})[key[1]] = self.embedder.embed([key[1]])[0]
+            self.matrices.pop(persona, None)
+        while len(self.entries) > self.max_entries:
+            oldest = next(iter(self.entries))
+            self.remove(oldest)
+            self.stats["evictions"] += 1
+
+    def metrics(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self.entries),
+            **self.stats,
+            "latency_saved": round(self.stats["latency_saved"], 3),
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else None
+        }
+
+
+class MongoResponseStore:
+    """Exact-tier cache entries shared by every worker process.
+
+    One document per ResponseCache key in `collection`, expiring `ttl`
+    seconds after it was stored (TTL index). Workers consult it after a
+    miss in their own ResponseCache. MongoDB errors count as misses, so an
+    unavailable database only costs hit ratio.
+    """
+
+    def __init__(self, collection, ttl: float = 3600):
+        self.collection = collection
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    @staticmethod
+    def document_id(key: tuple) -> str:
+        return hashlib.blake2b("\x00".join(key).encode(), digest_size=16).hexdigest()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=0)
+
+    async def get(self, key: tuple) -> Optional[tuple]:
+        """(response, latency) stored under `key`, or None"""
+        try:
+            # The TTL monitor runs about once a minute, so expiry is checked here too
+            doc = await self.collection.find_one(
+                {"_id": self.document_id(key), "expires_at": {"$gt": datetime.utcnow()}},
+                {"response": 1, "latency": 1}
+            )
+        except Exception:
+            self.stats["errors"] += 1
+            return None
+        if doc is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return doc["response"], doc.get("latency", 0.0)
+
+    async def put(self, key: tuple, response: str, latency: float = 0.0):
+        try:
+            await self.collection.update_one(
+                {"_id": self.document_id(key)},
+                {"$set": {
+                    "response": response,
+                    "latency": latency,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)
+                }},
+                upsert=True
+            )
+        except Exception:
+            self.stats["errors"] += 1
+            return
+        self.stats["stores"] += 1
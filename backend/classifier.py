@@ -0,0 +1,86 @@
+import re
+from typing import Dict, Iterable, List
+
+# Words are runs of letters/digits; apostrophes and punctuation split them,
+# so "What's" yields "what" and "s".
+WORD = re.compile(r"[^\W_]+")
+
+# Keywords of at least PREFIX_MIN_LENGTH letters also match words that start
+# with them ("stress" -> "stressed", "stressors"; "math" -> "mathematical";
+# "teach" -> "teacher"). Shorter keywords match exactly, otherwise "hi" would
+# match "his" and "sad" "Sadat"; their other forms ("sadly") are listed as
+# keywords of their own.
+PREFIX_MIN_LENGTH = 4
+
+
+class KeywordClassifier:
+    """Single-pass keyword persona classifier.
+
+    Keyword sets are compiled once into hash tables of words and multi-word
+    phrases. Classifying a message tokenizes it once
+    and looks each word up, along with its leading letters at each prefix
+    length in use, so the cost depends on the message length only - not on
+    how many keywords exist - and keywords only match at the start of a
+    word ("hi" no longer matches "this", "cope" no longer matches
+    "telescope").
+
+    `priority` lists the personas that win whenever any of their keywords
+    match, in order; if none match, `default` is returned.
+    """
+
+    def __init__(self, keyword_sets: Dict[str, Iterable[str]], priority: List[str], default: str = "general"):
+        self.priority = list(priority)
+        self.default = default
+        self.keyword_sets = {persona: list(keywords) for persona, keywords in keyword_sets.items()}
+
+        # keyword -> personas it counts towards (a keyword may belong to several)
+        self.words: Dict[str, List[str]] = {}
+        self.phrases: Dict[str, List[str]] = {}
+        for persona, keywords in self.keyword_sets.items():
+            for keyword in keywords:
+                tokens = WORD.findall(keyword.lower())
+                if not tokens:
+                    continue
+                table = self.words if len(tokens) == 1 else self.phrases
+                owners = table.setdefault(" ".join(tokens), [])
+                if persona not in owners:
+                    owners.append(persona)
+        self.phrase_lengths = sorted({phrase.count(" ") + 1 for phrase in self.phrases})
+        # Longest first, so a word counts once, towards its longest keyword
+        self.prefix_lengths = sorted({len(word) for word in self.words if len(word) >= PREFIX_MIN_LENGTH}, reverse=True)
+
+    def owners(self, word: str):
+        """Personas of the keyword `word` is, or failing that the longest keyword it starts with"""
+        owners = self.words.get(word)
+        if owners is not None:
+            return owners
+        for length in self.prefix_lengths:
+            if length < len(word):
+                owners = self.words.get(word[:length])
+                if owners is not None:
+                    return owners
+        return None
+
+    def scores(self, message: str) -> Dict[str, int]:
+        """Number of keyword hits per persona"""
+        scores = dict.fromkeys(self.keyword_sets, 0)
+        words = WORD.findall(message.lower())
+        for word in words:
+            owners = self.owners(word)
+            if owners:
+                for persona in owners:
+                    scores[persona] += 1
+        for length in self.phrase_lengths:
+            for start in range(len(words) - length + 1):
+                owners = self.phrases.get(" ".join(words[start:start + length]))
+                if owners:
+                    for persona in owners:
+                        scores[persona] += 1
+        return scores
+
+    def classify(self, message: str) -> str:
+        scores = self.scores(message)
+        for persona in self.priority:
+            if scores.get(persona):
+                return persona
+        return self.default
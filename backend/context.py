@@ -0,0 +1,103 @@
+import math
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class ApproxTokenCounter:
+    """Fast token estimate: ~4 characters per token for English BPE vocabularies"""
+
+    name = "approx"
+
+    def count(self, text: str) -> int:
+        return max(1, math.ceil(len(text) / 4))
+
+
+class TiktokenCounter:
+    """Exact BPE counts via tiktoken (optional dependency). Llama 3's
+    tokenizer is tiktoken-based, so cl100k_base is a close stand-in.
+    """
+
+    name = "tiktoken"
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        import tiktoken
+        self.encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+class ContextBuilder:
+    """Turns session history into chat `messages` that fit a token budget.
+
+    History is a flat [user, assistant, user, assistant, ...] list. Whole
+    exchanges are taken from the newest backwards until the next one would
+    exceed `budget` tokens (or `max_exchanges` are taken), and returned
+    oldest first as user/assistant messages. A running summary of older
+    turns, if any, is prepended and counts towards the budget. Token counts
+    are cached per session, so each message is only counted once however
+    many turns it stays in the window.
+    """
+
+    def __init__(self, counter=None, budget: int = 1500, max_sessions: int = 10000,
+                 max_exchanges: Optional[int] = None):
+        self.counter = counter or ApproxTokenCounter()
+        self.budget = budget
+        self.max_sessions = max_sessions
+        self.max_exchanges = max_exchanges
+        # session_id -> {message text: token count}; least recently used first
+        self.token_counts: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self.stats = {"counted": 0, "cached": 0}
+
+    def count_tokens(self, session_id: str, texts: List[str]) -> List[int]:
+        cached = self.token_counts.pop(session_id, {})
+        counts, fresh = [], {}
+        for text in texts:
+            count = cached.get(text)
+            if count is None:
+                count = self.counter.count(text)
+                self.stats["counted"] += 1
+            else:
+                self.stats["cached"] += 1
+            fresh[text] = count
+            counts.append(count)
+        # Only keep counts for messages still in the history
+        self.token_counts[session_id] = fresh
+        while len(self.token_counts) > self.max_sessions:
+            self.token_counts.popitem(last=False)
+        return counts
+
+    def build(self, session_id: str, history: List[str], summary: str = "") -> Tuple[List[Dict[str, str]], List[str]]:
+        """(messages, evicted): the summary plus the newest exchanges that fit
+        the budget as chat messages (oldest first), and the older history
+        messages left out of the window
+        """
+        # Drop a dangling unpaired message so roles always alternate
+        if len(history) % 2:
+            history = history[1:]
+        if not history and not summary:
+            return [], []
+        counts = self.count_tokens(session_id, history + [summary] if summary else history)
+
+        used = counts[-1] if summary else 0
+        start = len(history)
+        limit = 0
+        if self.max_exchanges is not None:
+            limit = max(0, len(history) - 2 * self.max_exchanges)
+        for i in range(len(history) - 2, limit - 1, -2):
+            exchange = counts[i] + counts[i + 1]
+            if used + exchange > self.budget:
+                break
+            used += exchange
+            start = i
+
+        messages = []
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of the conversation so far:\n{summary}"})
+        for i in range(start, len(history), 2):
+            messages.append({"role": "user", "content": history[i]})
+            messages.append({"role": "assistant", "content": history[i + 1]})
+        return messages, history[:start]
+
+    def forget(self, session_id: str):
+        self.token_counts.pop(session_id, None)
@@ -0,0 +1,260 @@
+import asyncio
+import random
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 429}
+
+
+class GatewayError(Exception):
+    """No provider could answer within the deadline"""
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit breaker is refusing calls"""
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        # Timeouts, dropped connections and the like
+        return not isinstance(error, (ValueError, TypeError))
+    return status in RETRYABLE_STATUSES or status >= 500
+
+
+class CircuitBreaker:
+    """Stops sending calls to a provider after `failure_threshold`
+    consecutive failures. After `reset_timeout` seconds one trial call is
+    let through (half-open); its success closes the circuit again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    @property
+    def available(self) -> bool:
+        """Whether allow() would let a call through (without claiming the trial call)"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.trial_in_flight)
+
+    def allow(self) -> bool:
+        if not self.available:
+            return False
+        if self.state == "half_open":
+            self.trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class LatencyWindow:
+    """Latencies of the last `size` successful calls"""
+
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Provider:
+    """One OpenAI-compatible endpoint. `model` replaces the caller's model
+    when set, so a provider can also be a different model on the same API.
+    """
+
+    def __init__(self, name: str, client, model: Optional[str] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.breaker = breaker or CircuitBreaker()
+        # Full completions only: they set the hedge delay. A streamed call
+        # returns once the response starts, so it is timed on its own.
+        self.latency = LatencyWindow()
+        self.stream_latency = LatencyWindow()
+        self.stats = {"calls": 0, "failures": 0, "hedges": 0, "hedge_wins": 0}
+
+    async def create(self, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for LLM provider {self.name}")
+        if self.model:
+            kwargs["model"] = self.model
+        self.stats["calls"] += 1
+        start = time.monotonic()
+        try:
+            result = await self.client.chat.completions.create(**kwargs)
+        except asyncio.CancelledError:
+            # A cancelled hedge loser is not the provider's fault
+            self.breaker.trial_in_flight = False
+            raise
+        except Exception:
+            self.stats["failures"] += 1
+            self.breaker.record_failure()
+            raise
+        window = self.stream_latency if kwargs.get("stream") else self.latency
+        window.record(time.monotonic() - start)
+        self.breaker.record_success()
+        return result
+
+    def metrics(self) -> Dict:
+        p95 = self.latency.percentile(95)
+        stream_p95 = self.stream_latency.percentile(95)
+        return {
+            "name": self.name,
+            "model": self.model,
+            "circuit": self.breaker.state,
+            **self.stats,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "stream_open_p95_ms": round(stream_p95 * 1000, 1) if stream_p95 is not None else None
+        }
+
+
+def openai_provider(name: str, base_url: str, api_key: str, model: Optional[str] = None,
+                    pool_size: int = 100, timeout: float = 30.0,
+                    breaker: Optional[CircuitBreaker] = None, transport=None) -> Provider:
+    """Provider backed by the async OpenAI SDK over one pooled HTTP client.
+
+    SDK retries are disabled; the gateway retries across providers instead.
+    """
+    import httpx
+    from openai import AsyncOpenAI
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+        transport=transport
+    )
+    client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client)
+    return Provider(name, client, model=model, breaker=breaker)
+
+
+class LLMGateway:
+    """Chat completions across one or more providers.
+
+    Exposes the same `chat.completions.create(**kwargs)` call as the SDK
+    clients. Each call has an overall `deadline`. Retryable failures are
+    retried up to `retries` times with full-jitter exponential backoff,
+    rotating to the next provider whose circuit is closed. When `hedge` is
+    on and the primary provider hasn't answered within its recent p95
+    latency, the same request is also sent to the next provider and the
+    first answer wins. Streaming calls are retried but never hedged, since
+    a hedged stream would pay for every token twice.
+
+    For a streaming call, the deadline, retries and circuit breaker only
+    cover opening the stream: it returns once the response starts. A stall
+    while its chunks are read is bounded by the HTTP client's read timeout
+    (per chunk, `timeout` in openai_provider), not by the deadline, and
+    doesn't count against the provider's breaker.
+    """
+
+    def __init__(self, providers: List[Provider], deadline: float = 30.0, retries: int = 2,
+                 backoff: float = 0.25, hedge: bool = True, hedge_min_samples: int = 20):
+        if not providers:
+            raise ValueError("LLMGateway needs at least one provider")
+        self.providers = providers
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.stats = {"requests": 0, "retries": 0, "deadline_exceeded": 0, "rejected": 0}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def available(self, attempt: int) -> List[Provider]:
+        """Providers whose circuit allows a call, rotated by attempt number"""
+        providers = self.providers[attempt % len(self.providers):] + self.providers[:attempt % len(self.providers)]
+        return [provider for provider in providers if provider.breaker.available]
+
+    def hedge_delay(self, provider: Provider) -> Optional[float]:
+        """The primary's p95 full-completion latency, once it has enough samples"""
+        if not self.hedge or len(provider.latency.samples) < self.hedge_min_samples:
+            return None
+        return provider.latency.percentile(95)
+
+    async def create(self, **kwargs):
+        self.stats["requests"] += 1
+        deadline = time.monotonic() + self.deadline
+        last_error: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                # Full jitter so retries from many requests don't arrive together
+                pause = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+                if time.monotonic() + pause >= deadline:
+                    break
+                await asyncio.sleep(pause)
+            providers = self.available(attempt)
+            if not providers:
+                self.stats["rejected"] += 1
+                raise GatewayError("All LLM providers are unavailable (circuit open)") from last_error
+            remaining = deadline - time.monotonic()
+            try:
+                if kwargs.get("stream") or len(providers) == 1:
+                    return await asyncio.wait_for(providers[0].create(**kwargs), remaining)
+                return await asyncio.wait_for(self.hedged(providers[0], providers[1], kwargs), remaining)
+            except asyncio.TimeoutError as e:
+                self.stats["deadline_exceeded"] += 1
+                raise GatewayError(f"LLM call exceeded its {self.deadline:g}s deadline") from e
+            except Exception as e:
+                last_error = e
+                if not is_retryable(e):
+                    raise
+        raise GatewayError(f"LLM call failed after {self.retries + 1} attempts: {last_error}") from last_error
+
+    async def hedged(self, primary: Provider, secondary: Provider, kwargs: Dict):
+        delay = self.hedge_delay(primary)
+        if delay is None:
+            return await primary.create(**kwargs)
+        first = asyncio.ensure_future(primary.create(**kwargs))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return first.result()
+            secondary.stats["hedges"] += 1
+            second = asyncio.ensure_future(secondary.create(**kwargs))
+            pending.add(second)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            secondary.stats["hedge_wins"] += 1
+                        return task.result()
+            # Both failed: surface the primary's error
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def metrics(self) -> Dict:
+        return {**self.stats, "providers": [provider.metrics() for provider in self.providers]}
@@ -0,0 +1,173 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List
+
+from pymongo.errors import OperationFailure
+
+from archive import archived_turns
+
+# MongoDB's error code for an index that exists under the same name with other options
+INDEX_OPTIONS_CONFLICT = 85
+
+
+class HistoryStore:
+    """Recent conversation history per session, as a flat
+    [user, assistant, user, assistant, ...] list of at most `max_messages`.
+    """
+
+    def __init__(self, max_messages: int = 40):
+        self.max_messages = max_messages
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    async def get(self, session_id: str) -> List[str]:
+        raise NotImplementedError
+
+    async def append(self, session_id: str, message: str, response: str):
+        raise NotImplementedError
+
+    async def clear(self, session_id: str):
+        raise NotImplementedError
+
+    def metrics(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "backend": self.name,
+            **self.stats,
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else None
+        }
+
+
+class MemoryHistoryStore(HistoryStore):
+    """Per-process LRU history with a TTL and a cap on the number of sessions"""
+
+    name = "memory"
+
+    def __init__(self, max_messages: int = 40, max_sessions: int = 10000, ttl: float = 3600):
+        super().__init__(max_messages)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # session_id -> (last_touched, messages); most recently used last
+        self.sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, session_id: str):
+        return session_id in self.sessions
+
+    def lookup(self, session_id: str):
+        """Return the cached messages or None, counting hits/misses and expiring stale entries"""
+        entry = self.sessions.get(session_id)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            del self.sessions[session_id]
+            self.stats["evictions"] += 1
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self.sessions.move_to_end(session_id)
+        return entry[1]
+
+    def put(self, session_id: str, messages: List[str]):
+        self.sessions[session_id] = (time.monotonic(), messages[-self.max_messages:])
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get(self, session_id: str) -> List[str]:
+        messages = self.lookup(session_id)
+        return list(messages) if messages is not None else []
+
+    async def append(self, session_id: str, message: str, response: str):
+        entry = self.sessions.get(session_id)
+        messages = entry[1] if entry is not None else []
+        self.put(session_id, messages + [message, response])
+
+    async def clear(self, session_id: str):
+        self.sessions.pop(session_id, None)
+
+
+class MongoHistoryStore(HistoryStore):
+    """History shared by every worker, kept in a capped array per session.
+
+    Each session is one document in `collection` whose `messages` array is
+    trimmed to `max_messages` on every append. Documents expire `ttl`
+    seconds after their last update (TTL index). When a session has no
+    document - new, expired, or written before this store existed - its
+    context is rehydrated from the most recent turns in `conversations`
+    (and, for sessions idle long enough to have been archived, from
+    `archive`); a rehydration that finds turns is counted as an eviction.
+    """
+
+    name = "mongo"
+
+    def __init__(self, collection, conversations, max_messages: int = 40, ttl: float = 3600, archive=None):
+        super().__init__(max_messages)
+        self.collection = collection
+        self.conversations = conversations
+        self.archive = archive
+        self.ttl = ttl
+
+    async def ensure_indexes(self):
+        ttl = int(self.ttl)
+        try:
+            await self.collection.create_index("updated_at", name="updated_at_ttl", expireAfterSeconds=ttl)
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # The TTL changed since the index was built: update it in place
+            await self.collection.database.command(
+                "collMod", self.collection.name, index={"name": "updated_at_ttl", "expireAfterSeconds": ttl}
+            )
+
+    async def rehydrate(self, session_id: str) -> List[str]:
+        turns = await self.conversations.find(
+            {"session_id": session_id},
+            {"user_message": 1, "ai_response": 1}
+        ).sort([("timestamp", -1), ("_id", -1)]).limit(self.max_messages // 2).to_list(length=None)
+        if self.archive is not None and len(turns) < self.max_messages // 2:
+            # Archived turns all precede the hot ones
+            older = archived_turns(self.archive, session_id, descending=True)
+            async for turn in older:
+                turns.append(turn)
+                if len(turns) >= self.max_messages // 2:
+                    break
+            await older.aclose()
+        messages = []
+        for turn in reversed(turns):
+            messages.extend([turn["user_message"], turn["ai_response"]])
+        return messages
+
+    async def get(self, session_id: str) -> List[str]:
+        doc = await self.collection.find_one({"_id": session_id}, {"messages": 1})
+        if doc is not None:
+            self.stats["hits"] += 1
+            return doc["messages"]
+
+        self.stats["misses"] += 1
+        messages = await self.rehydrate(session_id)
+        if messages:
+            self.stats["evictions"] += 1
+            # $setOnInsert so a concurrent append from another worker wins
+            await self.collection.update_one(
+                {"_id": session_id},
+                {"$setOnInsert": {"messages": messages, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        return messages
+
+    async def append(self, session_id: str, message: str, response: str):
+        await self.collection.update_one(
+            {"_id": session_id},
+            {
+                "$push": {"messages": {"$each": [message, response], "$slice": -self.max_messages}},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+    async def clear(self, session_id: str):
+        await self.collection.delete_one({"_id": session_id})
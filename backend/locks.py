@@ -0,0 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable, List
+
+
+class KeyedLock:
+    """One asyncio.Lock per key, so work on the same key runs one at a time
+    (in arrival order) while different keys proceed in parallel.
+
+    Locks are created on first use and dropped once nobody holds or waits
+    for them, so memory is bounded by the number of keys in use.
+    """
+
+    def __init__(self):
+        # key -> [lock, holders + waiters]
+        self.locks: Dict[Hashable, List] = {}
+        self.stats = {"acquired": 0, "contended": 0}
+
+    def __len__(self):
+        return len(self.locks)
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable):
+        entry = self.locks.get(key)
+        if entry is None:
+            entry = self.locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        if entry[0].locked():
+            self.stats["contended"] += 1
+        try:
+            async with entry[0]:
+                self.stats["acquired"] += 1
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self.locks[key]
@@ -0,0 +1,188 @@
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Fields bound to the current request (request_id, session_id, persona, stage timings)
+request_context: ContextVar[Optional[Dict]] = ContextVar("request_context", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra`
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sample"}
+
+
+def bind(**fields):
+    """Attach fields to every record logged for the current request"""
+    context = request_context.get()
+    if context is None:
+        context = {}
+        request_context.set(context)
+    context.update(fields)
+
+
+def add_timing(stage: str, seconds: float):
+    """Record a stage duration (in ms) for the current request's log records"""
+    context = request_context.get()
+    if context is not None:
+        context.setdefault("timings_ms", {})[stage] = round(seconds * 1000, 2)
+
+
+class RequestContextMiddleware:
+    """ASGI middleware giving each HTTP request a fresh log context.
+
+    The request id comes from an incoming X-Request-ID header or is
+    generated, and is echoed back on the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_context.set({"request_id": request_id})
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-request-id", request_id.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the request context onto records, in the task that logs them.
+
+    Values are copied when the record is created: the listener thread
+    formats it later, while the request may still be adding stage timings.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = request_context.get()
+        if context:
+            for key, value in context.items():
+                if not hasattr(record, key):
+                    setattr(record, key, dict(value) if isinstance(value, dict) else value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps `rate` of the records logged with extra={"sample": True} below WARNING.
+
+    Warnings, errors and unmarked records always pass, so failures are
+    captured in full while high-volume success records are thinned out.
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not getattr(record, "sample", False):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Like QueueHandler.prepare, but the traceback is kept apart from the message
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of failing"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, extra fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(
+            f"{key}={value}" for key, value in vars(record).items() if key not in STANDARD_ATTRIBUTES
+        )
+        return f"{line} {fields}" if fields else line
+
+
+def setup_logging(name: str = "saarthi", level: str = "INFO", fmt: str = "json", sample_rate: float = 1.0,
+                  queue_size: int = 10000, stream=None) -> Tuple[DrainingQueueListener, DroppingQueueHandler]:
+    """Route the `name` logger through a bounded queue to a background writer thread.
+
+    Logging on the event loop is then a queue put; formatting and the
+    (possibly slow) write to `stream` happen on the listener thread. The
+    caller starts and stops the returned listener.
+    """
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(sample_rate))
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    listener = DrainingQueueListener(handler.queue, output)
+
+    logger = logging.getLogger(name)
+    for existing in list(logger.handlers):
+        if isinstance(existing, DroppingQueueHandler):
+            logger.removeHandler(existing)
+    logger.addHandler(handler)
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    return listener, handler
@@ -0,0 +1,265 @@
+import asyncio
+import base64
+import binascii
+import contextvars
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+logger = logging.getLogger("saarthi.persistence")
+
+
+# Fields a client may ask for with ?fields= on the conversation history endpoint
+CONVERSATION_FIELDS = ("session_id", "user_message", "ai_response", "persona_used", "persona_name", "timestamp", "error")
+
+
+def encode_cursor(doc: Dict) -> str:
+    """Opaque keyset cursor for a conversation document: its (timestamp, _id)"""
+    raw = f"{doc['timestamp'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, _id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(timestamp), _id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_filter(cursor: str, direction: str) -> Dict:
+    """Match documents strictly after ("$gt") or before ("$lt") a cursor in (timestamp, _id) order"""
+    timestamp, _id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"timestamp": {direction: timestamp}},
+            {"timestamp": timestamp, "_id": {direction: _id}}
+        ]
+    }
+
+
+async def ensure_indexes(db):
+    """Create the indexes the API's queries rely on (idempotent)"""
+    await db.conversations.create_index(
+        [("session_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)],
+        name="session_timestamp"
+    )
+    # Lets retried /api/chat requests find the turn stored under their Idempotency-Key
+    await db.conversations.create_index(
+        [("session_id", ASCENDING), ("idempotency_key", ASCENDING)],
+        name="session_idempotency_key",
+        partialFilterExpression={"idempotency_key": {"$exists": True}}
+    )
+    await db.sessions.create_index(
+        [("last_updated", DESCENDING), ("_id", ASCENDING)],
+        name="last_updated"
+    )
+
+
+async def backfill_session_summaries(db):
+    """Build the sessions collection from existing conversations.
+
+    Only runs when `sessions` is empty, so it is a one-off for databases
+    created before summaries existed. The work happens server-side.
+    """
+    if await db.sessions.estimated_document_count() > 0:
+        return False
+    if await db.conversations.estimated_document_count() == 0:
+        return False
+    pipeline = [
+        {"$sort": {"session_id": 1, "timestamp": 1}},
+        {
+            "$group": {
+                "_id": "$session_id",
+                "message_count": {"$sum": 1},
+                "created_at": {"$first": "$timestamp"},
+                "last": {"$last": "$$ROOT"}
+            }
+        },
+        {
+            "$project": {
+                "message_count": 1,
+                "created_at": 1,
+                "last_message": "$last.user_message",
+                "last_response": "$last.ai_response",
+                "persona_used": "$last.persona_used",
+                "last_updated": "$last.timestamp"
+            }
+        },
+        {"$merge": {"into": "sessions", "whenMatched": "replace"}}
+    ]
+    await db.conversations.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    return True
+
+
+def session_summary_updates(docs: List[Dict]) -> List[UpdateOne]:
+    """Upserts that fold a batch of conversation documents into session summaries"""
+    summaries = {}
+    for doc in docs:
+        summary = summaries.setdefault(doc["session_id"], {"count": 0, "last": doc})
+        summary["count"] += 1
+        if doc["timestamp"] >= summary["last"]["timestamp"]:
+            summary["last"] = doc
+
+    updates = []
+    for session_id, summary in summaries.items():
+        last = summary["last"]
+        updates.append(UpdateOne(
+            {"_id": session_id},
+            {
+                "$inc": {"message_count": summary["count"]},
+                "$set": {
+                    "last_message": last["user_message"],
+                    "last_response": last["ai_response"],
+                    "persona_used": last["persona_used"],
+                    "last_updated": last["timestamp"]
+                },
+                "$setOnInsert": {"created_at": last["timestamp"]}
+            },
+            upsert=True
+        ))
+    return updates
+
+
+class ConversationWriter:
+    """Write-behind queue for conversation documents.
+
+    Chat turns are queued instead of being inserted one by one on the request
+    path. A background task flushes them with insert_many once `batch_size`
+    documents are waiting or `flush_interval` seconds have passed since the
+    first one was queued. If a sessions collection is given, the same flush
+    upserts the per-session summaries served by /api/sessions. The backlog is bounded: when `max_backlog`
+    documents are pending, enqueue() waits for the flusher to catch up.
+    `on_insert`, if given, is called with the duration of every insert_many,
+    and `on_write` with the documents each flush stored.
+    """
+
+    def __init__(self, collection, sessions_collection=None, batch_size: int = 100,
+                 flush_interval: float = 0.2, max_backlog: int = 10000,
+                 on_insert: Optional[Callable[[float], None]] = None,
+                 on_write: Optional[Callable[[List[Dict]], None]] = None):
+        self.collection = collection
+        # When given, every flushed batch is also folded into per-session summaries
+        self.sessions_collection = sessions_collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.on_insert = on_insert
+        self.on_write = on_write
+        self.queue: Optional[asyncio.Queue] = None
+        self.flush_task: Optional[asyncio.Task] = None
+        self.flush_lock: Optional[asyncio.Lock] = None
+        # Set when new documents arrive so the flusher can top up its batch
+        self.wakeup: Optional[asyncio.Event] = None
+        # Number of flush() callers waiting; while > 0 partial batches go out immediately
+        self.flush_waiters = 0
+        self.stats = {"queued": 0, "written": 0, "failed": 0, "batches": 0}
+
+    def start(self):
+        """Start the background flusher (called at startup, or lazily on first write)"""
+        if self.flush_task is None or self.flush_task.done():
+            if self.queue is None:
+                self.queue = asyncio.Queue(maxsize=self.max_backlog)
+                self.flush_lock = asyncio.Lock()
+                self.wakeup = asyncio.Event()
+            # In a fresh context, or its records would carry the fields of the request that started it
+            self.flush_task = contextvars.Context().run(asyncio.create_task, self.run())
+
+    @property
+    def backlog(self) -> int:
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def enqueue(self, doc: Dict):
+        """Queue a document for insertion, waiting if the backlog is full"""
+        self.start()
+        await self.queue.put(doc)
+        self.stats["queued"] += 1
+        self.wakeup.set()
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.flush_waiters:
+                    break
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            await self.write(batch)
+
+    async def write(self, batch: List[Dict]):
+        async with self.flush_lock:
+            stored = batch
+            start = time.perf_counter()
+            try:
+                # ordered=False so one bad document doesn't drop the rest of the batch
+                await self.collection.insert_many(batch, ordered=False)
+                self.stats["written"] += len(batch)
+                logger.debug("Stored %d conversations in MongoDB", len(batch))
+            except Exception as db_error:
+                # BulkWriteError reports which documents failed; anything else lost the batch
+                details = getattr(db_error, "details", None)
+                if details:
+                    failed = {error["index"] for error in details.get("writeErrors", [])}
+                else:
+                    failed = set(range(len(batch)))
+                stored = [doc for index, doc in enumerate(batch) if index not in failed]
+                self.stats["written"] += len(stored)
+                self.stats["failed"] += len(failed)
+                logger.error("Failed to store %d conversations in MongoDB: %s", len(failed), db_error)
+            if self.on_insert is not None:
+                self.on_insert(time.perf_counter() - start)
+            try:
+                if self.on_write is not None and stored:
+                    self.on_write(stored)
+            except Exception as e:
+                logger.error("Conversation write hook failed: %s", e)
+            try:
+                if self.sessions_collection is not None and stored:
+                    await self.sessions_collection.bulk_write(session_summary_updates(stored), ordered=False)
+            except Exception as db_error:
+                logger.error("Failed to update session summaries in MongoDB: %s", db_error)
+            finally:
+                self.stats["batches"] += 1
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def flush(self):
+        """Write out everything queued so far"""
+        if self.queue is None:
+            return
+        if self.flush_task is None or self.flush_task.done():
+            self.start()
+        self.flush_waiters += 1
+        self.wakeup.set()
+        try:
+            await self.queue.join()
+        finally:
+            self.flush_waiters -= 1
+
+    async def close(self):
+        """Drain the backlog and stop the flusher (called on shutdown)"""
+        if self.queue is None:
+            return
+        await self.flush()
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            try:
+                await self.flush_task
+            except asyncio.CancelledError:
+                pass
+            self.flush_task = None
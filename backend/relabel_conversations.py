@@ -0,0 +1,81 @@
+"""
+Offline persona re-labeling of the conversations collection.
+
+Streams stored turns in batches, classifies each batch in one pass with the
+same classifier the API uses (plus the semantic router), and reports how the
+labels compare with the persona that was actually used. With --write the
+prediction is stored in a `persona_predicted` field; `persona_used` is never
+modified.
+
+    python relabel_conversations.py --router hashed --batch-size 2000
+    python relabel_conversations.py --router model --write
+"""
+import argparse
+import os
+import time
+from collections import Counter
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from server import SaarthiAgentSystem, create_semantic_router
+
+
+def relabel(collection, agent, batch_size, write=False, limit=0):
+    transitions = Counter()
+    processed = 0
+    start = time.perf_counter()
+
+    cursor = collection.find({}, {"user_message": 1, "persona_used": 1}).batch_size(batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+
+    def flush(batch):
+        predictions = agent.classify_batch([doc["user_message"] for doc in batch])
+        for doc, predicted in zip(batch, predictions):
+            transitions[(doc.get("persona_used"), predicted)] += 1
+        if write:
+            collection.bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": {"persona_predicted": predicted}})
+                for doc, predicted in zip(batch, predictions)
+            ], ordered=False)
+
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            flush(batch)
+            processed += len(batch)
+            batch = []
+            print(f"  {processed} turns ({processed / (time.perf_counter() - start):.0f}/s)", end="\r")
+    if batch:
+        flush(batch)
+        processed += len(batch)
+
+    return processed, time.perf_counter() - start, transitions
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="Saarthi_db2")
+    parser.add_argument("--router", choices=["off", "hashed", "model"], default="hashed")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=0, help="Only process this many turns")
+    parser.add_argument("--write", action="store_true", help="Store predictions in persona_predicted")
+    args = parser.parse_args()
+
+    agent = SaarthiAgentSystem(semantic_router=create_semantic_router(args.router))
+    collection = MongoClient(args.mongo_url)[args.database].conversations
+    processed, elapsed, transitions = relabel(collection, agent, args.batch_size, args.write, args.limit)
+
+    print(f"\n✅ Re-labeled {processed} turns in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.0f} turns/s)")
+    print(f"{'persona_used':<16} {'predicted':<16} {'count':>8}")
+    for (used, predicted), count in transitions.most_common():
+        marker = "" if used == predicted else "  *"
+        print(f"{str(used):<16} {predicted:<16} {count:>8}{marker}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,608 @@
+import asyncio
+import functools
+import heapq
+import logging
+import math
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import TEXT
+
+from archive import EPOCH, to_millis, unpack_chunk
+
+try:
+    import numpy as np
+except ImportError:
+    # Text search scores postings in pure Python instead; the vector index needs numpy
+    np = None
+
+logger = logging.getLogger("saarthi.search")
+
+WORD = re.compile(r"[^\W_]+")
+
+# Too common to say anything about a turn; dropped from documents and queries alike
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been but by can could did do does for from
+had has have he her him his how i if in into is it its just me my no not of on or our out she so some
+than that the their them then there these they this to up us was we were what when where which who
+why will with would you your
+""".split())
+
+# Stripped in this order, at most one per word, so "stressed", "stresses" and "stress" share a term
+SUFFIXES = ("ing", "ed", "es", "s")
+
+# Reciprocal rank fusion constant for hybrid ranking
+RRF_K = 60
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith("ss"):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed words of `text`, without stopwords or single letters"""
+    return [stem(word) for word in WORD.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def to_datetime(millis: int) -> datetime:
+    return EPOCH + timedelta(milliseconds=millis)
+
+
+def turn_terms(doc: Dict) -> Counter:
+    """Term frequencies of one conversation turn, over the message and the response"""
+    return Counter(tokenize(f"{doc['user_message']} {doc.get('ai_response') or ''}"))
+
+
+class InvertedIndex:
+    """BM25-ranked inverted index over conversation turns.
+
+    Turns are numbered in the order they are added; each term keeps the
+    numbers of the turns containing it and how often, in compact arrays
+    (about 6 bytes per posting). Per turn, only its id, session, persona,
+    timestamp and length are kept, not its text. Deleted turns are
+    tombstoned. With numpy installed, queries over long posting lists are
+    scored with vectorized array operations.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.sessions = array("I")
+        self.personas = array("H")
+        # Epoch milliseconds
+        self.timestamps = array("q")
+        self.lengths = array("I")
+        self.postings: Dict[str, array] = {}
+        self.frequencies: Dict[str, array] = {}
+        # Sessions and personas are stored as small integer codes
+        self.session_codes: Dict[str, int] = {}
+        self.session_names: List[str] = []
+        self.session_turns: Dict[int, array] = {}
+        self.persona_codes: Dict[str, int] = {}
+        self.deleted = set()
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.ids) - len(self.deleted)
+
+    def add(self, doc: Dict, terms: Counter) -> int:
+        """Index one turn given its term frequencies; returns its number"""
+        number = len(self.ids)
+        session = self.session_codes.get(doc["session_id"])
+        if session is None:
+            session = self.session_codes[doc["session_id"]] = len(self.session_names)
+            self.session_names.append(doc["session_id"])
+        self.ids.append(doc["_id"])
+        self.sessions.append(session)
+        self.personas.append(self.persona_codes.setdefault(doc["persona_used"], len(self.persona_codes)))
+        self.timestamps.append(to_millis(doc["timestamp"]))
+        length = sum(terms.values())
+        self.lengths.append(length)
+        self.total_length += length
+        self.session_turns.setdefault(session, array("I")).append(number)
+        for term, count in terms.items():
+            if term not in self.postings:
+                self.postings[term] = array("I")
+                self.frequencies[term] = array("H")
+            self.postings[term].append(number)
+            self.frequencies[term].append(min(count, 0xFFFF))
+        return number
+
+    def delete(self, numbers: Iterable[int]):
+        for number in numbers:
+            if number not in self.deleted:
+                self.deleted.add(number)
+                self.total_length -= self.lengths[number]
+
+    def remove_session(self, session_id: str) -> List[int]:
+        """Tombstone every turn of a session; returns their numbers"""
+        session = self.session_codes.get(session_id)
+        numbers = list(self.session_turns.pop(session, ())) if session is not None else []
+        self.delete(numbers)
+        return numbers
+
+    def allowed(self, session_id: Optional[str], persona: Optional[str]):
+        """(session code, persona code) to filter on; None for no filter, -1 for an unknown value"""
+        session = self.session_codes.get(session_id, -1) if session_id is not None else None
+        persona_code = self.persona_codes.get(persona, -1) if persona is not None else None
+        return session, persona_code
+
+    def weights(self, terms: Sequence[str]) -> List[Tuple[str, float]]:
+        """(term, idf) for each distinct query term that occurs in the index"""
+        live = len(self)
+        found = [term for term in dict.fromkeys(terms) if term in self.postings]
+        return [(term, math.log(1 + (live - len(self.postings[term]) + 0.5) / (len(self.postings[term]) + 0.5)))
+                for term in found]
+
+    def scores(self, terms: Sequence[str], session: Optional[int] = None,
+               persona: Optional[int] = None) -> Dict[int, float]:
+        """BM25 score of every live turn matching any of `terms`, given session and persona codes.
+
+        With a session filter, the session's turns are looked up in each
+        posting list (postings are in turn order) instead of walking the
+        whole list, whichever is shorter.
+        """
+        k1, b = self.k1, self.b
+        base, slope = k1 * (1 - b), k1 * b / (self.total_length / len(self) or 1.0)
+        lengths, sessions, personas = self.lengths, self.sessions, self.personas
+        candidates = self.session_turns.get(session, ()) if session is not None else None
+        scores: Dict[int, float] = defaultdict(float)
+        for term, idf in self.weights(terms):
+            numbers, counts = self.postings[term], self.frequencies[term]
+            if candidates is not None and len(candidates) < len(numbers):
+                matches = []
+                for number in candidates:
+                    position = bisect_left(numbers, number)
+                    if position < len(numbers) and numbers[position] == number:
+                        matches.append((number, counts[position]))
+            else:
+                matches = zip(numbers, counts)
+            for number, count in matches:
+                if session is not None and sessions[number] != session:
+                    continue
+                if persona is not None and personas[number] != persona:
+                    continue
+                scores[number] += idf * count * (k1 + 1) / (count + base + slope * lengths[number])
+        for number in self.deleted.intersection(scores) if self.deleted else ():
+            del scores[number]
+        return scores
+
+    def dense_search(self, terms: Sequence[str], limit: int, offset: int,
+                     persona: Optional[int] = None) -> Tuple[int, List[Tuple[int, float]]]:
+        """search() with numpy: each term's postings are scored in one vectorized pass"""
+        k1, b = self.k1, self.b
+        base, slope = k1 * (1 - b), k1 * b / (self.total_length / len(self) or 1.0)
+        lengths = np.frombuffer(self.lengths, dtype=np.uint32)
+        scores = np.zeros(len(self.ids), dtype=np.float64)
+        for term, idf in self.weights(terms):
+            numbers = np.frombuffer(self.postings[term], dtype=np.uint32)
+            counts = np.frombuffer(self.frequencies[term], dtype=np.uint16).astype(np.float64)
+            scores[numbers] += idf * counts * (k1 + 1) / (counts + base + slope * lengths[numbers])
+        if persona is not None:
+            scores[np.frombuffer(self.personas, dtype=np.uint16) != persona] = 0
+        if self.deleted:
+            scores[np.fromiter(self.deleted, dtype=np.int64)] = 0
+        matched = np.flatnonzero(scores)
+        top = matched
+        if len(matched) > offset + limit:
+            # Everything tied with the last hit of the page, so ties can go newest first
+            cutoff = -np.partition(-scores[matched], offset + limit - 1)[offset + limit - 1]
+            top = matched[scores[matched] >= cutoff]
+        top = top[np.lexsort((-top, -scores[top]))][:offset + limit]
+        return len(matched), [(int(number), float(scores[number])) for number in top[offset:]]
+
+    def search(self, terms: Sequence[str], limit: int, offset: int = 0, session_id: Optional[str] = None,
+               persona: Optional[str] = None) -> Tuple[int, List[Tuple[int, float]]]:
+        """(number of matching turns, one page of (turn number, score)), best first, newest first on ties"""
+        session, persona_code = self.allowed(session_id, persona)
+        if len(self) == 0 or session == -1 or persona_code == -1:
+            return 0, []
+        # A dense score array costs a pass over every turn; worth it once the postings to walk are many
+        if np is not None and session is None and \
+                sum(len(self.postings.get(term, ())) for term in set(terms)) * 200 > len(self.ids):
+            return self.dense_search(terms, limit, offset, persona_code)
+        scores = self.scores(terms, session, persona_code)
+        top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], item[0]))
+        return len(scores), top[offset:]
+
+
+class VectorIndex:
+    """Embeddings of the most recently indexed turns, searched by brute-force cosine similarity.
+
+    Vectors live in a preallocated float32 ring of `capacity` rows, so
+    memory is bounded and the oldest turns simply drop out of semantic
+    search (they stay in text search). Needs numpy.
+    """
+
+    def __init__(self, embedder, capacity: int = 100000):
+        if np is None:
+            raise ImportError("numpy is required for semantic search")
+        self.embedder = embedder
+        self.capacity = capacity
+        self.matrix = None
+        # Turn number per row; -1 for empty or deleted rows
+        self.numbers = np.full(capacity, -1, dtype=np.int64)
+        self.added = 0
+
+    def __len__(self):
+        return int((self.numbers >= 0).sum())
+
+    def add(self, numbers: Sequence[int], vectors):
+        if self.matrix is None:
+            self.matrix = np.zeros((self.capacity, vectors.shape[1]), dtype=np.float32)
+        numbers, vectors = list(numbers)[-self.capacity:], vectors[-self.capacity:]
+        rows = (self.added + np.arange(len(numbers))) % self.capacity
+        self.matrix[rows] = vectors
+        self.numbers[rows] = numbers
+        self.added += len(numbers)
+
+    def delete(self, numbers: Iterable[int]):
+        self.numbers[np.isin(self.numbers, np.fromiter(numbers, dtype=np.int64))] = -1
+
+    def search(self, vector, limit: int, mask=None, min_similarity: float = 0.0) -> List[Tuple[int, float]]:
+        """Up to `limit` (turn number, similarity) pairs, most similar first.
+
+        `mask`, if given, is a boolean array over turn numbers.
+        """
+        if self.matrix is None:
+            return []
+        filled = min(self.added, self.capacity)
+        numbers = self.numbers[:filled]
+        similarities = self.matrix[:filled] @ vector
+        keep = (numbers >= 0) & (similarities >= min_similarity)
+        if mask is not None:
+            keep &= mask[np.clip(numbers, 0, None)]
+        candidates = np.flatnonzero(keep)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-similarities[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-similarities[candidates], kind="stable")]
+        return [(int(numbers[row]), float(similarities[row])) for row in candidates]
+
+
+class SearchIndex:
+    """Full-text search over stored conversation turns"""
+
+    name = "none"
+    modes: Tuple[str, ...] = ("text",)
+
+    def __init__(self):
+        self.ready = True
+        self.tasks: List[asyncio.Task] = []
+        self.stats = {"queries": 0}
+
+    def metrics(self) -> Dict:
+        return {"backend": self.name, "ready": self.ready, **self.stats}
+
+    def start(self):
+        """Start any background work (called once MongoDB is connected)"""
+
+    def add(self, docs: Sequence[Dict]):
+        """Called with every batch of turns the conversation writers store"""
+
+    def remove_session(self, session_id: str):
+        pass
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.tasks = []
+
+    async def search(self, query: str, mode: str = "text", limit: int = 20, offset: int = 0,
+                     session_id: Optional[str] = None, persona: Optional[str] = None) -> Dict:
+        """One page of matching turns, best first, each with its "score":
+        {"results", "total" (None if unknown), "has_more", "complete"}
+        """
+        raise NotImplementedError
+
+
+class MemorySearchIndex(SearchIndex):
+    """Per-worker search over every stored turn, hot or archived.
+
+    Text queries are ranked with BM25 over an in-process inverted index;
+    with an `embedder`, the most recent `vector_capacity` user messages are
+    embedded too, enabling "semantic" and "hybrid" (reciprocal rank fusion)
+    queries. The index is filled in the background from MongoDB by load()
+    and kept current by add(), called with every batch of turns the
+    conversation writers store. Only turn ids are held in memory; a page of
+    hits is read back from `conversations`, or from `archive` for archived
+    turns.
+
+    Queries are ranked in a thread, so a slow one never stalls the event
+    loop. Changes to the index (new, deleted and embedded turns) are made
+    on the loop; while any query is being ranked they are held back and
+    applied once it finishes, and new queries wait for held-back changes
+    first, so writes are never starved.
+
+    Each worker only sees its own writes after startup; use the "mongo"
+    search backend when running several workers.
+    """
+
+    name = "memory"
+
+    def __init__(self, conversations, archive, embedder=None, vector_capacity: int = 100000,
+                 min_similarity: float = 0.2, max_results: int = 1000, load_batch: int = 1000):
+        super().__init__()
+        self.conversations = conversations
+        self.archive = archive
+        self.text = InvertedIndex()
+        self.vectors = VectorIndex(embedder, vector_capacity) if embedder is not None else None
+        self.embedder = embedder
+        self.min_similarity = min_similarity
+        self.max_results = max_results
+        self.load_batch = load_batch
+        # Turns stored from now on reach the index through add(); load() reads the older ones
+        self.since = datetime.utcnow()
+        # (turn number, user message) waiting to be embedded; only the newest fit in the ring anyway
+        self.pending: deque = deque(maxlen=vector_capacity)
+        self.wakeup: Optional[asyncio.Event] = None
+        # Set once load() has read every older turn
+        self.ready = False
+        # Queries being ranked in threads, index changes waiting for them, and
+        # an event set once those changes are applied (None when none wait)
+        self.ranking = 0
+        self.deferred: List[Callable[[], None]] = []
+        self.applied: Optional[asyncio.Event] = None
+        self.stats.update({"loaded": 0, "added": 0, "failures": 0})
+
+    @property
+    def modes(self) -> Tuple[str, ...]:
+        return ("text", "semantic", "hybrid") if self.vectors is not None else ("text",)
+
+    def metrics(self) -> Dict:
+        return {
+            **super().metrics(),
+            "turns": len(self.text),
+            "terms": len(self.text.postings),
+            "vectors": len(self.vectors) if self.vectors is not None else None
+        }
+
+    def start(self):
+        """Load stored turns and, with an embedder, start embedding new ones, in the background"""
+        if not self.tasks:
+            self.wakeup = asyncio.Event()
+            self.tasks = [asyncio.create_task(self.load())]
+            if self.vectors is not None:
+                self.tasks.append(asyncio.create_task(self.embed_pending()))
+
+    def change(self, apply: Callable[[], None]):
+        """Apply an index change now, or once the queries being ranked are done"""
+        if not self.ranking:
+            apply()
+            return
+        self.deferred.append(apply)
+        if self.applied is None:
+            self.applied = asyncio.Event()
+
+    def apply_deferred(self):
+        deferred, self.deferred = self.deferred, []
+        applied, self.applied = self.applied, None
+        for apply in deferred:
+            try:
+                apply()
+            except Exception as e:
+                self.stats["failures"] += 1
+                logger.error("Updating the search index failed: %s", e, extra={"error_type": type(e).__name__})
+        if applied is not None:
+            applied.set()
+
+    def index(self, docs: Sequence[Dict], terms: Sequence[Counter], embed: bool = True):
+        for doc, counts in zip(docs, terms):
+            number = self.text.add(doc, counts)
+            if self.vectors is not None and embed:
+                self.pending.append((number, doc["user_message"]))
+        if self.vectors is not None and self.pending and self.wakeup is not None:
+            self.wakeup.set()
+
+    def add(self, docs: Sequence[Dict]):
+        terms = [turn_terms(doc) for doc in docs]
+        self.change(lambda: self.index(docs, terms))
+        self.stats["added"] += len(docs)
+
+    async def load(self):
+        """Index every turn stored before this index was created.
+
+        Hot turns are read before archived ones, so a turn the archiver
+        moves meanwhile is still seen (at worst twice; search results are
+        de-duplicated). Archived turns are left out of the vector index,
+        which only keeps the most recent ones. Tokenizing runs in a thread,
+        one batch at a time.
+        """
+        async def index_batch(docs: List[Dict], embed: bool = True):
+            terms = await asyncio.to_thread(lambda: [turn_terms(doc) for doc in docs])
+            self.change(lambda: self.index(docs, terms, embed))
+            self.stats["loaded"] += len(docs)
+
+        projection = {"session_id": 1, "user_message": 1, "ai_response": 1, "persona_used": 1, "timestamp": 1}
+        try:
+            batch = []
+            async for doc in self.conversations.find({"timestamp": {"$lt": self.since}}, projection):
+                batch.append(doc)
+                if len(batch) >= self.load_batch:
+                    await index_batch(batch)
+                    batch = []
+            if batch:
+                await index_batch(batch)
+                batch = []
+            async for chunk in self.archive.find({"start": {"$lt": self.since}}):
+                batch.extend(turn for turn in unpack_chunk(chunk) if turn["timestamp"] < self.since)
+                if len(batch) >= self.load_batch:
+                    await index_batch(batch, embed=False)
+                    batch = []
+            if batch:
+                await index_batch(batch, embed=False)
+            self.ready = True
+            logger.info("Search index loaded", extra={"turns": self.stats["loaded"]})
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.error("Loading the search index failed: %s", e, extra={"error_type": type(e).__name__})
+
+    async def embed_pending(self, batch_size: int = 256):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.pending:
+                batch = [self.pending.popleft() for _ in range(min(batch_size, len(self.pending)))]
+                try:
+                    vectors = await asyncio.to_thread(self.embedder.embed, [text for _, text in batch])
+                except Exception as e:
+                    self.stats["failures"] += 1
+                    logger.error("Embedding turns for search failed: %s", e, extra={"error_type": type(e).__name__})
+                    continue
+                self.change(functools.partial(self.vectors.add, [number for number, _ in batch], vectors))
+
+    def remove_session(self, session_id: str):
+        def remove():
+            numbers = self.text.remove_session(session_id)
+            if self.vectors is not None and numbers:
+                self.vectors.delete(numbers)
+        self.change(remove)
+
+    def mask(self, session_id: Optional[str], persona: Optional[str]):
+        """Boolean array over turn numbers for the vector search filters, or None if unfiltered"""
+        session, persona_code = self.text.allowed(session_id, persona)
+        if session is None and persona_code is None:
+            return None
+        mask = np.ones(len(self.text.ids), dtype=bool)
+        if session is not None:
+            mask &= np.frombuffer(self.text.sessions, dtype=np.uint32) == session
+        if persona_code is not None:
+            mask &= np.frombuffer(self.text.personas, dtype=np.uint16) == persona_code
+        return mask
+
+    def rank(self, query: str, mode: str, limit: int, offset: int, session_id: Optional[str],
+             persona: Optional[str]) -> Tuple[int, List[Tuple[int, float]]]:
+        if mode == "text":
+            return self.text.search(tokenize(query), limit, offset, session_id, persona)
+        vector = self.embedder.embed([query])[0]
+        similar = self.vectors.search(vector, self.max_results, self.mask(session_id, persona), self.min_similarity)
+        if mode == "semantic":
+            return len(similar), similar[offset:offset + limit]
+        # Hybrid: fuse the two rankings by reciprocal rank
+        _, lexical = self.text.search(tokenize(query), self.max_results, 0, session_id, persona)
+        fused: Dict[int, float] = defaultdict(float)
+        for ranking in (lexical, similar):
+            for rank, (number, _) in enumerate(ranking):
+                fused[number] += 1 / (RRF_K + rank + 1)
+        ranked = sorted(fused.items(), key=lambda item: (item[1], item[0]), reverse=True)
+        return len(ranked), ranked[offset:offset + limit]
+
+    async def fetch(self, hits: List[Tuple[int, float]]) -> List[Dict]:
+        """The stored turns for a page of hits, in hit order; turns deleted since are dropped from the index"""
+        ids = {self.text.ids[number] for number, _ in hits}
+        found = {
+            doc["_id"]: doc
+            async for doc in self.conversations.find({"_id": {"$in": list(ids)}}, {"idempotency_key": 0})
+        }
+        archived = defaultdict(list)
+        for number, _ in hits:
+            if self.text.ids[number] not in found:
+                archived[self.text.sessions[number]].append(self.text.timestamps[number])
+        for session, timestamps in archived.items():
+            query = {
+                "session_id": self.text.session_names[session],
+                "start": {"$lte": to_datetime(max(timestamps))},
+                "end": {"$gte": to_datetime(min(timestamps))}
+            }
+            async for chunk in self.archive.find(query):
+                found.update((turn["_id"], turn) for turn in unpack_chunk(chunk) if turn["_id"] in ids)
+        results, seen, missing = [], set(), []
+        for number, score in hits:
+            doc_id = self.text.ids[number]
+            if doc_id not in found:
+                missing.append(number)
+            elif doc_id not in seen:
+                seen.add(doc_id)
+                results.append({**found[doc_id], "score": score})
+        if missing:
+            self.change(lambda: self.delete(missing))
+        return results
+
+    def delete(self, numbers: List[int]):
+        self.text.delete(numbers)
+        if self.vectors is not None:
+            self.vectors.delete(numbers)
+
+    async def search(self, query: str, mode: str = "text", limit: int = 20, offset: int = 0,
+                     session_id: Optional[str] = None, persona: Optional[str] = None) -> Dict:
+        """"total" counts every text match; semantic and hybrid rankings stop at `max_results`.
+        "complete" is False while older turns are still being loaded.
+        """
+        self.stats["queries"] += 1
+        # Let held-back changes in before ranking another query
+        while self.applied is not None:
+            await self.applied.wait()
+        self.ranking += 1
+        try:
+            total, hits = await asyncio.to_thread(self.rank, query, mode, limit, offset, session_id, persona)
+        finally:
+            self.ranking -= 1
+            if not self.ranking:
+                self.apply_deferred()
+        return {
+            "results": await self.fetch(hits),
+            "total": total,
+            "has_more": offset + len(hits) < total,
+            "complete": self.ready
+        }
+
+
+class MongoTextSearch(SearchIndex):
+    """Search through a MongoDB text index on the conversations collection.
+
+    Shared by every worker and always current, but limited to hot turns
+    (archived ones are compressed), ranked by MongoDB's own text score,
+    and without a total count, which would mean scoring every match. The
+    index is built in the background; until it exists, queries come back
+    empty and incomplete.
+    """
+
+    name = "mongo"
+
+    def __init__(self, conversations):
+        super().__init__()
+        self.conversations = conversations
+        self.ready = False
+
+    def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self.ensure_indexes())]
+
+    async def ensure_indexes(self):
+        try:
+            await self.conversations.create_index(
+                [("user_message", TEXT), ("ai_response", TEXT)],
+                name="conversation_text",
+                weights={"user_message": 2, "ai_response": 1}
+            )
+            self.ready = True
+        except Exception as e:
+            logger.error("Creating the conversation text index failed: %s", e, extra={"error_type": type(e).__name__})
+
+    async def search(self, query: str, mode: str = "text", limit: int = 20, offset: int = 0,
+                     session_id: Optional[str] = None, persona: Optional[str] = None) -> Dict:
+        self.stats["queries"] += 1
+        if not self.ready:
+            return {"results": [], "total": None, "has_more": False, "complete": False}
+        match = {"$text": {"$search": query}}
+        if session_id is not None:
+            match["session_id"] = session_id
+        if persona is not None:
+            match["persona_used"] = persona
+        score = {"$meta": "textScore"}
+        # One extra document tells us whether another page exists
+        docs = await self.conversations.find(match, {"idempotency_key": 0, "score": score}).sort(
+            [("score", score)]
+        ).skip(offset).limit(limit + 1).to_list(length=None)
+        return {"results": docs[:limit], "total": None, "has_more": len(docs) > limit, "complete": True}
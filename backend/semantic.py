@@ -0,0 +1,150 @@
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+WORD = re.compile(r"[^\W_]+")
+
+# Example utterances per persona. Their embeddings are averaged into one
+# centroid per persona, so these should read like real user messages.
+PERSONA_EXAMPLES = {
+    "general": [
+        "Hello, how are you today?",
+        "Tell me a joke",
+        "What's the weather like?",
+        "What time is it?",
+        "Can you recommend a good movie?",
+        "What should I cook for dinner tonight?",
+        "Who won the cricket match yesterday?",
+        "Give me some ideas for a birthday gift",
+        "What can you do?",
+        "Tell me something interesting",
+    ],
+    "education": [
+        "Can you explain photosynthesis?",
+        "Help me with my math homework",
+        "How do I solve quadratic equations?",
+        "Teach me about quantum physics",
+        "What caused the first world war?",
+        "I have an exam tomorrow, help me revise chemistry",
+        "Explain how the heart pumps blood",
+        "What is the difference between a noun and a verb?",
+        "How should I prepare for my university entrance test?",
+        "Can you quiz me on the periodic table?",
+    ],
+    "mental_health": [
+        "I can't sleep and everything feels heavy",
+        "I feel hopeless and tired all the time",
+        "I'm so anxious I can't focus on anything",
+        "Nobody understands me and I feel alone",
+        "I've been crying a lot lately",
+        "Everything feels pointless",
+        "I'm stressed out and overwhelmed",
+        "I feel lonely and empty inside",
+        "My heart races and I panic for no reason",
+        "I don't have the energy to get out of bed",
+    ],
+}
+
+
+class HashedEmbedder:
+    """Dependency-free embedding: hashed bag of words and character trigrams.
+
+    It only captures lexical overlap, but trigrams make it tolerant of
+    inflections ("feel"/"feels"/"feeling"), and it needs no model download.
+    crc32 is used instead of hash() so vectors are identical across workers.
+    """
+
+    name = "hashed"
+
+    def __init__(self, dim: int = 4096):
+        self.dim = dim
+
+    def features(self, text: str) -> List[int]:
+        buckets = []
+        for word in WORD.findall(text.lower()):
+            buckets.append(zlib.crc32(word.encode()) % self.dim)
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                buckets.append(zlib.crc32(padded[i:i + 3].encode()) % self.dim)
+        return buckets
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            buckets = self.features(text)
+            rows.extend([row] * len(buckets))
+            cols.extend(buckets)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1.0)
+        return normalize(matrix)
+
+
+class SentenceTransformerEmbedder:
+    """Small local CPU model via sentence-transformers (optional dependency)"""
+
+    name = "model"
+
+    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(
+            list(texts), normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SemanticRouter:
+    """Routes messages to the persona whose example centroid is most similar.
+
+    Centroids are stored as one (personas x dim) matrix, so scoring any
+    number of messages is a single matmul. A route is only returned when
+    the best cosine similarity reaches `threshold` and beats the runner-up
+    by `margin`; otherwise the caller should fall back to keywords.
+    """
+
+    def __init__(self, embedder, examples: Dict[str, List[str]] = PERSONA_EXAMPLES,
+                 threshold: float = 0.3, margin: float = 0.03):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.margin = margin
+        self.personas = list(examples)
+        centroids = [self.embedder.embed(examples[persona]).mean(axis=0) for persona in self.personas]
+        # Transposed once so scoring is embeddings @ centroids_t
+        self.centroids_t = np.ascontiguousarray(normalize(np.stack(centroids)).T)
+
+    def similarities(self, messages: Sequence[str]) -> np.ndarray:
+        """(messages x personas) cosine similarity matrix"""
+        return self.embedder.embed(messages) @ self.centroids_t
+
+    def scores(self, message: str) -> Dict[str, float]:
+        row = self.similarities([message])[0]
+        return {persona: float(score) for persona, score in zip(self.personas, row)}
+
+    def route_batch(self, messages: Sequence[str]) -> List[Tuple[Optional[str], float]]:
+        """(persona or None, best similarity) for each message"""
+        if not messages:
+            return []
+        sims = self.similarities(messages)
+        if sims.shape[1] > 1:
+            top2 = np.partition(sims, -2, axis=1)[:, -2:]
+            best, runner_up = top2[:, 1], top2[:, 0]
+        else:
+            best, runner_up = sims[:, 0], np.zeros(len(messages), dtype=sims.dtype)
+        winners = sims.argmax(axis=1)
+        confident = (best >= self.threshold) & (best - runner_up >= self.margin)
+        return [
+            (self.personas[winner] if ok else None, float(score))
+            for winner, ok, score in zip(winners, confident, best)
+        ]
+
+    def route(self, message: str) -> Tuple[Optional[str], float]:
+        return self.route_batch([message])[0]
@@ -0,0 +1,62 @@
+"""
+Production entry point: WEB_CONCURRENCY uvicorn worker processes sharing one port.
+
+    cd backend && python serve.py
+
+With more than one worker, state a request may need from another worker
+(session history, rate limits, cached responses, the search index)
+defaults to MongoDB; set HISTORY_STORE, RATE_LIMIT_STORE,
+RESPONSE_CACHE_STORE or SEARCH_INDEX explicitly to override. On SIGTERM/SIGINT each worker stops accepting connections,
+waits up to SHUTDOWN_GRACE_SECONDS for open requests and background chat
+turns to finish, then flushes queued conversation writes and exits.
+"""
+import os
+
+import uvicorn
+from dotenv import load_dotenv
+
+# Load .env first, so its values win over the multi-worker defaults below
+load_dotenv()
+
+HOST = os.getenv('HOST', '0.0.0.0')
+PORT = int(os.getenv('PORT', '8001'))
+# 0 means one worker per CPU
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '0'))
+SHUTDOWN_GRACE_SECONDS = float(os.getenv('SHUTDOWN_GRACE_SECONDS', '30'))
+
+# Stores that must be shared once requests for one session can reach different workers
+SHARED_STATE_DEFAULTS = {
+    "HISTORY_STORE": "mongo",
+    "RATE_LIMIT_STORE": "mongo",
+    "RESPONSE_CACHE_STORE": "mongo",
+    "SEARCH_INDEX": "mongo",
+}
+
+
+def worker_count(configured: int = WEB_CONCURRENCY) -> int:
+    return configured if configured > 0 else (os.cpu_count() or 1)
+
+
+def configure_shared_state(workers: int, environ=os.environ):
+    """Default the per-process stores to MongoDB when running several workers"""
+    if workers > 1:
+        for name, value in SHARED_STATE_DEFAULTS.items():
+            environ.setdefault(name, value)
+
+
+def main():
+    workers = worker_count()
+    # Workers are spawned with this environment and read it when they import server.py
+    configure_shared_state(workers)
+    uvicorn.run(
+        "server:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        timeout_graceful_shutdown=SHUTDOWN_GRACE_SECONDS,
+        log_level=os.getenv('LOG_LEVEL', 'INFO').lower()
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,575 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, validator
-from pymongo import MongoClient
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError, validator
+from starlette.requests import HTTPConnection
+from motor.motor_asyncio import AsyncIOMotorClient
 import os
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, AsyncIterator, Callable
+from collections import Counter
 import uuid
 from datetime import datetime
 import json
+import time
+import asyncio
+import functools
+import hmac
+import ipaddress
+import atexit
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 from dotenv import load_dotenv
-try:
-    from groq import Groq
-except ImportError:
-    pass
-try:
-    from openai import OpenAI
-except ImportError:
-    pass
+from admission import AdmissionController, MongoRateLimiter, Overloaded, RateLimiter
+from archive import ConversationArchiver, archived_turns, ensure_archive_indexes, expand_conversation
+from batch import BatchRow, group_rows, parse_rows, run_groups
+from cache import MongoResponseStore, ResponseCache
+from classifier import KeywordClassifier
+from context import ApproxTokenCounter, ContextBuilder, TiktokenCounter
+from gateway import CircuitBreaker, LLMGateway, Provider, openai_provider
+from history import HistoryStore, MemoryHistoryStore, MongoHistoryStore
+from locks import KeyedLock
+from logs import RequestContextMiddleware, add_timing, bind, setup_logging
+from metrics import Registry
+from persistence import (
+    CONVERSATION_FIELDS,
+    ConversationWriter,
+    backfill_session_summaries,
+    decode_cursor,
+    encode_cursor,
+    ensure_indexes,
+    keyset_filter,
+)
+from search import MemorySearchIndex, MongoTextSearch, SearchIndex
+from singleflight import IdempotencyStore, SingleFlight, StreamFlight
+from streaming import SentenceChunker, sse_event
+from summarizer import MemorySummaryStore, MongoSummaryStore, RollingSummarizer
+from voice import (
+    OPUS_SAMPLE_RATES,
+    EndpointDetector,
+    OpusDecoder,
+    PiperSynthesizer,
+    SpeechRecognizer,
+    SpeechSynthesizer,
+    VoiceInput,
+    VoskRecognizer,
+)
 
 # Load environment variables
 load_dotenv()
 
+# Structured logs: "json" or "text", and the share of routine success records kept
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+# Records are written by a background thread; beyond this many pending ones they are dropped
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+log_listener, log_handler = setup_logging(
+    level=LOG_LEVEL,
+    fmt=LOG_FORMAT,
+    sample_rate=LOG_SAMPLE_RATE,
+    queue_size=LOG_QUEUE_SIZE
+)
+log_listener.start()
+atexit.register(log_listener.stop)
+logger = logging.getLogger("saarthi")
+
 # Get API key from environment variable
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 
-# Initialize Groq client with provided API key
-# Handling compatibility issues with the Groq client
-groq_client = None
+# LLM SDK: "openai" (any OpenAI-compatible endpoint, Groq by default) or "groq" (the Groq SDK).
+# Only the selected SDK is imported, in the background after startup.
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'openai')
+# LLM endpoint settings (the base URL can point at any OpenAI-compatible server)
+LLM_BASE_URL = os.getenv('LLM_BASE_URL', 'https://api.groq.com/openai/v1')
+LLM_MODEL = os.getenv('LLM_MODEL', 'llama3-8b-8192')
+# Maximum number of LLM calls in flight per worker
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '32'))
 
-try:
-    from openai import OpenAI
-    # Use OpenAI client as a fallback with Groq API base
-    client = OpenAI(
-        api_key=GROQ_API_KEY,
-        base_url="https://api.groq.com/openai/v1"
+# Optional JSON file overriding persona keyword sets (reloadable via /api/personas/reload)
+PERSONA_KEYWORDS_FILE = os.getenv('PERSONA_KEYWORDS_FILE')
+# Optional JSON {"persona": {"model": ..., "temperature": ..., "max_tokens": ...}} LLM settings per persona
+PERSONA_SETTINGS_FILE = os.getenv('PERSONA_SETTINGS_FILE')
+
+# Optional embedding-based persona routing: "off", "hashed" (no download) or "model"
+SEMANTIC_ROUTER = os.getenv('SEMANTIC_ROUTER', 'off')
+SEMANTIC_MODEL = os.getenv('SEMANTIC_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+# Below this cosine similarity the keyword classifier decides instead
+SEMANTIC_THRESHOLD = float(os.getenv('SEMANTIC_THRESHOLD', '0.3'))
+
+# LLM gateway: per-call deadline (seconds), jittered retries and circuit breaking
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))
+LLM_RETRIES = int(os.getenv('LLM_RETRIES', '2'))
+LLM_RETRY_BACKOFF = float(os.getenv('LLM_RETRY_BACKOFF', '0.25'))
+# A provider is skipped for LLM_BREAKER_RESET seconds after this many consecutive failures
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))
+# Pooled HTTP connections per provider
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', str(LLM_MAX_CONCURRENCY)))
+# Optional secondary provider and/or model, used for failover and hedged requests
+LLM_FALLBACK_BASE_URL = os.getenv('LLM_FALLBACK_BASE_URL')
+LLM_FALLBACK_MODEL = os.getenv('LLM_FALLBACK_MODEL')
+LLM_FALLBACK_API_KEY = os.getenv('LLM_FALLBACK_API_KEY', GROQ_API_KEY)
+# Send a hedged request to the secondary once the primary is slower than its p95 ("on"/"off")
+LLM_HEDGE = os.getenv('LLM_HEDGE', 'on')
+
+def create_llm_gateway() -> LLMGateway:
+    """Primary (and optional fallback) OpenAI-compatible providers behind one gateway"""
+    def breaker():
+        return CircuitBreaker(failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET)
+    providers = [openai_provider(
+        "primary", LLM_BASE_URL, GROQ_API_KEY,
+        pool_size=LLM_POOL_SIZE, timeout=LLM_TIMEOUT, breaker=breaker()
+    )]
+    if LLM_FALLBACK_BASE_URL or LLM_FALLBACK_MODEL:
+        providers.append(openai_provider(
+            "fallback", LLM_FALLBACK_BASE_URL or LLM_BASE_URL, LLM_FALLBACK_API_KEY,
+            model=LLM_FALLBACK_MODEL, pool_size=LLM_POOL_SIZE, timeout=LLM_TIMEOUT, breaker=breaker()
+        ))
+    return LLMGateway(
+        providers,
+        deadline=LLM_TIMEOUT,
+        retries=LLM_RETRIES,
+        backoff=LLM_RETRY_BACKOFF,
+        hedge=LLM_HEDGE == "on"
     )
-    groq_client = client
-    print("✅ Using OpenAI client with Groq API")
-except ImportError:
-    print("⚠️ OpenAI client not available")
-except Exception as e:
-    print(f"⚠️ Error with OpenAI client: {e}")
-
-# If OpenAI client failed, try with Groq directly
-if groq_client is None:
+
+def create_llm_client():
+    """Build the client for LLM_PROVIDER; returns (client, is_async), client None if unavailable.
+
+    Prefers async clients so LLM round-trips don't block the event loop; a
+    sync client is still accepted and gets offloaded to a thread pool. The
+    Groq SDK is only imported if selected, or if the OpenAI SDK is missing.
+    """
+    if LLM_PROVIDER == "openai":
+        try:
+            client = create_llm_gateway()
+            logger.info("Using LLM gateway with Groq API", extra={"providers": len(client.providers)})
+            return client, True
+        except ImportError:
+            logger.warning("OpenAI client not available - trying the Groq SDK")
+        except Exception as e:
+            logger.warning("Error with OpenAI client: %s", e)
+    elif LLM_PROVIDER != "groq":
+        logger.warning("Unknown LLM_PROVIDER '%s', using the Groq SDK", LLM_PROVIDER)
     try:
-        from groq import Groq
-        groq_client = Groq(api_key=GROQ_API_KEY)
-        print("✅ Using Groq client directly")
+        from groq import AsyncGroq
+        client = LLMGateway(
+            [Provider("groq", AsyncGroq(api_key=GROQ_API_KEY, max_retries=0))],
+            deadline=LLM_TIMEOUT,
+            retries=LLM_RETRIES,
+            backoff=LLM_RETRY_BACKOFF
+        )
+        logger.info("Using async Groq client directly")
+        return client, True
     except ImportError:
-        print("⚠️ Groq client not available")
+        try:
+            from groq import Groq
+            client = Groq(api_key=GROQ_API_KEY, timeout=LLM_TIMEOUT)
+            logger.info("Using Groq client directly (thread pool offload)")
+            return client, False
+        except ImportError:
+            logger.warning("Groq client not available")
+        except Exception as e:
+            logger.error("Error initializing Groq client: %s", e)
+    except Exception as e:
+        logger.error("Error initializing Groq client: %s", e)
+    logger.error("No AI client available - API will not function properly")
+    return None, False
+
+# Created by init_llm_client() after startup; tests may assign a fake directly
+groq_client = None
+groq_client_is_async = False
+# Task building the LLM client, awaited by the first request that needs it
+llm_client_ready: Optional[asyncio.Task] = None
+
+async def init_llm_client():
+    """Import the SDK and build the LLM client off the event loop"""
+    global groq_client, groq_client_is_async
+    start = time.perf_counter()
+    client, is_async = await asyncio.to_thread(create_llm_client)
+    if groq_client is None:
+        groq_client, groq_client_is_async = client, is_async
+    logger.info("LLM client initialized", extra={"seconds": round(time.perf_counter() - start, 3)})
+
+async def ensure_llm_client():
+    """Wait for the LLM client if it is still being built"""
+    if groq_client is None and llm_client_ready is not None:
+        await asyncio.shield(llm_client_ready)
+
+# Server-side voice (/api/voice): local speech-to-text "off" or "vosk", text-to-speech "off" or "piper"
+VOICE_STT = os.getenv('VOICE_STT', 'off')
+VOICE_STT_MODEL = os.getenv('VOICE_STT_MODEL', 'models/vosk')
+VOICE_TTS = os.getenv('VOICE_TTS', 'off')
+VOICE_TTS_MODEL = os.getenv('VOICE_TTS_MODEL', 'models/piper.onnx')
+VOICE_SAMPLE_RATE = int(os.getenv('VOICE_SAMPLE_RATE', '16000'))
+# End of speech: this much audio below the energy threshold after speech was heard
+VOICE_SILENCE_MS = int(os.getenv('VOICE_SILENCE_MS', '600'))
+VOICE_ENERGY_THRESHOLD = float(os.getenv('VOICE_ENERGY_THRESHOLD', '500'))
+# Audio buffered per connection while recognition catches up (e.g. during a reply)
+VOICE_BUFFER_SECONDS = float(os.getenv('VOICE_BUFFER_SECONDS', '10'))
+
+def create_voice_models():
+    """Load the configured speech models; returns (recognizer, synthesizer), either None if off or unavailable"""
+    recognizer = synthesizer = None
+    if VOICE_STT == "vosk":
+        try:
+            recognizer = VoskRecognizer(VOICE_STT_MODEL)
+        except ImportError as e:
+            logger.warning("Speech recognition not available (%s)", e)
+        except Exception as e:
+            logger.error("Could not load speech recognition model %s: %s", VOICE_STT_MODEL, e)
+    elif VOICE_STT != "off":
+        logger.warning("Unknown VOICE_STT '%s', server-side voice disabled", VOICE_STT)
+    if VOICE_TTS == "piper":
+        try:
+            synthesizer = PiperSynthesizer(VOICE_TTS_MODEL)
+        except ImportError as e:
+            logger.warning("Speech synthesis not available (%s)", e)
+        except Exception as e:
+            logger.error("Could not load speech synthesis voice %s: %s", VOICE_TTS_MODEL, e)
+    elif VOICE_TTS != "off":
+        logger.warning("Unknown VOICE_TTS '%s', replies are sent as text only", VOICE_TTS)
+    return recognizer, synthesizer
+
+# Loaded by init_voice_models() after startup; tests may assign fakes directly
+speech_recognizer: Optional[SpeechRecognizer] = None
+speech_synthesizer: Optional[SpeechSynthesizer] = None
+voice_models_ready: Optional[asyncio.Task] = None
+
+async def init_voice_models():
+    """Load the speech models off the event loop"""
+    global speech_recognizer, speech_synthesizer
+    start = time.perf_counter()
+    recognizer, synthesizer = await asyncio.to_thread(create_voice_models)
+    speech_recognizer = speech_recognizer or recognizer
+    speech_synthesizer = speech_synthesizer or synthesizer
+    logger.info("Voice models loaded", extra={"seconds": round(time.perf_counter() - start, 3)})
+
+async def ensure_voice_models():
+    """Wait for the speech models if they are still loading"""
+    if voice_models_ready is not None:
+        await asyncio.shield(voice_models_ready)
+
+# MongoDB connection (motor, so database I/O never blocks the event loop)
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+# Conversation inserts are batched: flushed when this many are queued...
+MONGO_WRITE_BATCH_SIZE = int(os.getenv('MONGO_WRITE_BATCH_SIZE', '100'))
+# ...or after this many seconds, whichever comes first
+MONGO_WRITE_FLUSH_INTERVAL = float(os.getenv('MONGO_WRITE_FLUSH_INTERVAL', '0.2'))
+# Requests wait for the writer once this many inserts are pending
+MONGO_WRITE_MAX_BACKLOG = int(os.getenv('MONGO_WRITE_MAX_BACKLOG', '10000'))
+# Startup waits this long for MongoDB, then serves without it and keeps retrying in the
+# background, every MONGO_RETRY_INTERVAL seconds at first and backing off to MONGO_RETRY_MAX
+MONGO_CONNECT_TIMEOUT = float(os.getenv('MONGO_CONNECT_TIMEOUT', '2'))
+MONGO_RETRY_INTERVAL = float(os.getenv('MONGO_RETRY_INTERVAL', '5'))
+MONGO_RETRY_MAX = float(os.getenv('MONGO_RETRY_MAX', '60'))
+
+# Page size for /api/conversations/{session_id} when no limit is given, and its cap
+CONVERSATION_PAGE_SIZE = int(os.getenv('CONVERSATION_PAGE_SIZE', '100'))
+CONVERSATION_PAGE_MAX = int(os.getenv('CONVERSATION_PAGE_MAX', '1000'))
+
+# Retention: turns older than CONVERSATION_ARCHIVE_DAYS move into compressed per-session
+# archive chunks (0 keeps everything hot); anything older than CONVERSATION_RETENTION_DAYS
+# is deleted from both tiers (0 keeps it forever). The job runs every ARCHIVE_INTERVAL seconds.
+CONVERSATION_ARCHIVE_DAYS = float(os.getenv('CONVERSATION_ARCHIVE_DAYS', '0'))
+CONVERSATION_RETENTION_DAYS = float(os.getenv('CONVERSATION_RETENTION_DAYS', '0'))
+ARCHIVE_INTERVAL = float(os.getenv('ARCHIVE_INTERVAL', '3600'))
+ARCHIVE_CHUNK_TURNS = int(os.getenv('ARCHIVE_CHUNK_TURNS', '500'))
+
+# Conversation search: "memory" (in-process BM25 index, per worker), "mongo" (MongoDB text index) or "off"
+SEARCH_INDEX = os.getenv('SEARCH_INDEX', 'memory')
+# Semantic and hybrid queries on the memory index: "off", "hashed" or "model" (SEMANTIC_MODEL); needs numpy
+SEARCH_SEMANTIC = os.getenv('SEARCH_SEMANTIC', 'off')
+# Most recent turns kept in the vector index, and the minimum cosine similarity of a semantic hit
+SEARCH_VECTOR_CAPACITY = int(os.getenv('SEARCH_VECTOR_CAPACITY', '100000'))
+SEARCH_SEMANTIC_THRESHOLD = float(os.getenv('SEARCH_SEMANTIC_THRESHOLD', '0.2'))
+SEARCH_PAGE_MAX = int(os.getenv('SEARCH_PAGE_MAX', '100'))
+# How deep semantic and hybrid rankings (and any query's pagination) go
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '1000'))
+
+# Session history used as LLM context: "memory" (per worker) or "mongo" (shared by all workers)
+HISTORY_STORE = os.getenv('HISTORY_STORE', 'memory')
+MAX_CONVERSATION_HISTORY = int(os.getenv('MAX_CONVERSATION_HISTORY', '20'))
+HISTORY_MAX_SESSIONS = int(os.getenv('HISTORY_MAX_SESSIONS', '10000'))
+HISTORY_TTL_SECONDS = float(os.getenv('HISTORY_TTL_SECONDS', '3600'))
+# Prompt tokens allowed for prior exchanges, and how they are counted ("approx" or "tiktoken")
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1500'))
+CONTEXT_TOKENIZER = os.getenv('CONTEXT_TOKENIZER', 'approx')
+# Turns that fall out of the context window are folded into a running summary ("on"/"off")
+ROLLING_SUMMARY = os.getenv('ROLLING_SUMMARY', 'on')
+# The summarizer folds at most SUMMARY_BATCH_SIZE sessions every SUMMARY_INTERVAL seconds,
+# SUMMARY_CONCURRENCY at a time, and skips a tick while every LLM slot is busy with chat
+SUMMARY_INTERVAL = float(os.getenv('SUMMARY_INTERVAL', '1.0'))
+SUMMARY_BATCH_SIZE = int(os.getenv('SUMMARY_BATCH_SIZE', '8'))
+SUMMARY_CONCURRENCY = int(os.getenv('SUMMARY_CONCURRENCY', '2'))
+SUMMARY_MAX_TOKENS = int(os.getenv('SUMMARY_MAX_TOKENS', '200'))
+
+# Opt-in LLM response cache: "off", "exact" or "semantic" (also near-duplicate first turns, needs numpy)
+RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', 'off')
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '1000'))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+# Min cosine similarity for a semantic (near-duplicate) hit
+RESPONSE_CACHE_THRESHOLD = float(os.getenv('RESPONSE_CACHE_THRESHOLD', '0.9'))
+# Comma-separated personas whose turns are never cached
+RESPONSE_CACHE_EXCLUDE = os.getenv('RESPONSE_CACHE_EXCLUDE', 'mental_health')
+# "mongo" shares exact-match cache entries between workers, behind each worker's own cache
+RESPONSE_CACHE_STORE = os.getenv('RESPONSE_CACHE_STORE', 'memory')
+
+# How long a completed /api/chat result is replayed for retries with the same Idempotency-Key
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400'))
+
+# Admission control for /api/chat: turns generated at once per worker, and how many
+# more may wait (for at most CHAT_QUEUE_TIMEOUT seconds) before requests get a 429
+CHAT_MAX_CONCURRENT = int(os.getenv('CHAT_MAX_CONCURRENT', str(LLM_MAX_CONCURRENCY)))
+CHAT_MAX_QUEUE = int(os.getenv('CHAT_MAX_QUEUE', '256'))
+CHAT_QUEUE_TIMEOUT = float(os.getenv('CHAT_QUEUE_TIMEOUT', '10'))
+# Comma-separated personas whose requests are served first from the queue
+CHAT_PRIORITY_PERSONAS = os.getenv('CHAT_PRIORITY_PERSONAS', 'mental_health')
+# Token-bucket rate limits (requests per second and burst) per session and per client IP; 0 disables
+CHAT_RATE_PER_SESSION = float(os.getenv('CHAT_RATE_PER_SESSION', '1'))
+CHAT_BURST_PER_SESSION = float(os.getenv('CHAT_BURST_PER_SESSION', '5'))
+CHAT_RATE_PER_IP = float(os.getenv('CHAT_RATE_PER_IP', '10'))
+CHAT_BURST_PER_IP = float(os.getenv('CHAT_BURST_PER_IP', '50'))
+# "mongo" counts rate limits across all workers instead of per worker
+RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', 'memory')
+# Comma-separated proxy IPs or CIDRs (e.g. the ingress) whose X-Forwarded-For is trusted for the
+# client IP; behind a proxy that isn't listed, every client shares the proxy's per-IP limit
+TRUSTED_PROXIES = os.getenv('TRUSTED_PROXIES', '')
+
+# Batch chat (/api/chat/batch, batch_chat.py): sessions answered at once (rows of one session
+# always run in order), rows accepted per request, and conversations per bulk insert
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))
+BATCH_MAX_ROWS = int(os.getenv('BATCH_MAX_ROWS', '10000'))
+BATCH_WRITE_SIZE = int(os.getenv('BATCH_WRITE_SIZE', '500'))
+# Key callers of /api/chat/batch must send in X-Batch-Key; unset disables the endpoint (batch_chat.py still works)
+BATCH_API_KEY = os.getenv('BATCH_API_KEY')
+
+# On shutdown, how long chat turns still running in the background may take to finish
+SHUTDOWN_GRACE_SECONDS = float(os.getenv('SHUTDOWN_GRACE_SECONDS', '30'))
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and Saarthi, an AI assistant. Update the summary with the new turns. Keep the facts, names, goals, preferences and feelings the user shared and anything Saarthi promised or recommended. Write at most a short paragraph in the third person, with no preamble."""
+
+# Prometheus metrics served on /metrics
+metrics_registry = Registry()
+CHAT_STAGE_SECONDS = metrics_registry.histogram(
+    "saarthi_chat_stage_seconds", "Time spent in each stage of a chat turn", ["stage"]
+)
+CHAT_TURN_SECONDS = metrics_registry.histogram(
+    "saarthi_chat_turn_seconds", "Chat turn latency from persona selection to recorded history", ["persona", "source"]
+)
+LLM_REQUEST_SECONDS = metrics_registry.histogram(
+    "saarthi_llm_request_seconds", "Chat completion latency, retries and failover included", ["persona", "model"]
+)
+LLM_TOKENS = metrics_registry.counter(
+    "saarthi_llm_tokens_total", "Tokens reported in completion usage", ["persona", "model", "kind"]
+)
+CHAT_ERRORS = metrics_registry.counter(
+    "saarthi_chat_errors_total", "Errors in the chat pipeline", ["stage", "type"]
+)
+BATCH_ROWS = metrics_registry.counter(
+    "saarthi_batch_rows_total", "Batch chat rows by outcome", ["result"]
+)
+SEARCH_SECONDS = metrics_registry.histogram(
+    "saarthi_search_seconds", "Conversation search latency", ["backend", "mode"]
+)
+
+def observe_stage(stage: str, seconds: float):
+    """Record a chat stage duration in metrics and in the request's log context"""
+    CHAT_STAGE_SECONDS.observe(seconds, stage=stage)
+    add_timing(stage, seconds)
+
+@contextmanager
+def chat_stage(stage: str):
+    """Time the `with` block as one stage of a chat turn"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+# Set once MongoDB answers a ping (see connect_database); None means memory-only mode
+mongo_client = None
+db = None
+# Started once MongoDB connects, if archival or retention is configured
+conversation_archiver: Optional[ConversationArchiver] = None
+# Built once MongoDB connects, unless SEARCH_INDEX is "off"
+search_index: Optional[SearchIndex] = None
+
+def index_conversations(docs: List[Dict]):
+    """Add turns the conversation writers just stored to the search index"""
+    if search_index is not None:
+        search_index.add(docs)
+
+# Collections are attached when the database connects
+conversation_writer = ConversationWriter(
+    None,
+    batch_size=MONGO_WRITE_BATCH_SIZE,
+    flush_interval=MONGO_WRITE_FLUSH_INTERVAL,
+    max_backlog=MONGO_WRITE_MAX_BACKLOG,
+    on_insert=lambda seconds: CHAT_STAGE_SECONDS.observe(seconds, stage="mongo_insert"),
+    on_write=index_conversations
+)
+
+def create_history_store(backend: str = HISTORY_STORE) -> HistoryStore:
+    """Build the configured session history store"""
+    max_messages = MAX_CONVERSATION_HISTORY * 2
+    if backend == "mongo" and db is not None:
+        return MongoHistoryStore(
+            db.session_history,
+            db.conversations,
+            max_messages=max_messages,
+            ttl=HISTORY_TTL_SECONDS,
+            archive=db.conversation_archive
+        )
+    if backend not in ("memory", "mongo"):
+        logger.warning("Unknown HISTORY_STORE '%s', using in-memory history", backend)
+    return MemoryHistoryStore(
+        max_messages=max_messages,
+        max_sessions=HISTORY_MAX_SESSIONS,
+        ttl=HISTORY_TTL_SECONDS
+    )
+
+def create_summary_store(mode: str = ROLLING_SUMMARY):
+    """Build the running summary store (on the sessions collection when MongoDB is up), or None if disabled"""
+    if mode == "off":
+        return None
+    if db is not None:
+        return MongoSummaryStore(db.sessions)
+    return MemorySummaryStore(max_sessions=HISTORY_MAX_SESSIONS)
+
+def create_search_index(backend: str = SEARCH_INDEX) -> Optional[SearchIndex]:
+    """Build the conversation search index (needs MongoDB), or None if disabled"""
+    if backend == "off" or db is None:
+        return None
+    if backend == "mongo":
+        return MongoTextSearch(db.conversations)
+    if backend != "memory":
+        logger.warning("Unknown SEARCH_INDEX '%s', using the in-memory search index", backend)
+    embedder = None
+    if SEARCH_SEMANTIC != "off":
+        try:
+            from semantic import HashedEmbedder, SentenceTransformerEmbedder
+            # 512 hashed dimensions keep the vector index at 2 KB per turn
+            embedder = SentenceTransformerEmbedder(SEMANTIC_MODEL) if SEARCH_SEMANTIC == "model" else HashedEmbedder(dim=512)
+        except ImportError as e:
+            logger.warning("Semantic search not available (%s) - text search only", e)
+    return MemorySearchIndex(
+        db.conversations,
+        db.conversation_archive,
+        embedder=embedder,
+        vector_capacity=SEARCH_VECTOR_CAPACITY,
+        min_similarity=SEARCH_SEMANTIC_THRESHOLD,
+        max_results=SEARCH_MAX_RESULTS
+    )
+
+async def ensure_store_indexes(store):
+    """Build a shared store's indexes; a failure is logged and the store is used anyway"""
+    try:
+        await store.ensure_indexes()
     except Exception as e:
-        print(f"❌ Error initializing Groq client: {e}")
-        groq_client = None
+        logger.error("Could not build indexes for %s: %s", type(store).__name__, e,
+                     extra={"error_type": type(e).__name__})
 
-if groq_client is None:
-    print("❌ No AI client available - API will not function properly")
+async def attach_database(client) -> bool:
+    """Ping MongoDB and, if it answers, switch storage from memory to the database"""
+    global mongo_client, db, conversation_archiver, search_index
+    try:
+        await asyncio.wait_for(client.admin.command('ping'), MONGO_CONNECT_TIMEOUT)
+        database = client.Saarthi_db2
+        await ensure_indexes(database)
+        await ensure_archive_indexes(database.conversation_archive)
+        if await backfill_session_summaries(database):
+            logger.info("Built session summaries from existing conversations")
+    except Exception as e:
+        logger.warning("MongoDB not reachable: %s", e, extra={"error_type": type(e).__name__})
+        return False
+    mongo_client, db = client, database
+    # Before the writer starts, so every turn stored from here on reaches the index
+    search_index = create_search_index()
+    if search_index is not None:
+        search_index.start()
+    conversation_writer.collection = db.conversations
+    conversation_writer.sessions_collection = db.sessions
+    conversation_writer.start()
+    if CONVERSATION_ARCHIVE_DAYS > 0 or CONVERSATION_RETENTION_DAYS > 0:
+        conversation_archiver = ConversationArchiver(
+            db,
+            archive_after=CONVERSATION_ARCHIVE_DAYS,
+            retain_days=CONVERSATION_RETENTION_DAYS,
+            interval=ARCHIVE_INTERVAL,
+            chunk_turns=ARCHIVE_CHUNK_TURNS
+        )
+        conversation_archiver.start()
+    if HISTORY_STORE == "mongo":
+        # Sessions served from memory so far are rebuilt from stored conversations on their next turn
+        Saarthi_system.history_store = create_history_store()
+        await ensure_store_indexes(Saarthi_system.history_store)
+    if Saarthi_system.summarizer is not None:
+        Saarthi_system.summarizer.store = create_summary_store()
+    if RESPONSE_CACHE_STORE == "mongo" and Saarthi_system.response_cache is not None:
+        Saarthi_system.shared_cache = MongoResponseStore(db.response_cache, ttl=RESPONSE_CACHE_TTL)
+        await ensure_store_indexes(Saarthi_system.shared_cache)
+    shared_limiters = [limiter for limiter in (session_limiter, ip_limiter) if isinstance(limiter, MongoRateLimiter)]
+    for limiter in shared_limiters:
+        limiter.collection = db.rate_limits
+    if shared_limiters:
+        await ensure_store_indexes(shared_limiters[0])
+    logger.info("MongoDB connection successful")
+    return True
+
+async def reconnect_database(client):
+    """Keep probing MongoDB in the background until it answers"""
+    delay = MONGO_RETRY_INTERVAL
+    while True:
+        await asyncio.sleep(delay)
+        if await attach_database(client):
+            return
+        delay = min(delay * 2, MONGO_RETRY_MAX)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global llm_client_ready, voice_models_ready
+    start = time.perf_counter()
+    # The SDK import and client setup run in a thread while MongoDB is probed
+    llm_client_ready = asyncio.create_task(init_llm_client())
+    if VOICE_STT != "off" or VOICE_TTS != "off":
+        voice_models_ready = asyncio.create_task(init_voice_models())
+    reconnect = None
+    client = AsyncIOMotorClient(MONGO_URL)
+    if not await attach_database(client):
+        logger.warning("Serving without MongoDB; retrying in the background")
+        reconnect = asyncio.create_task(reconnect_database(client))
+    if Saarthi_system.summarizer is not None:
+        Saarthi_system.summarizer.start()
+    logger.info("Startup complete", extra={"seconds": round(time.perf_counter() - start, 3)})
+    yield
+    if reconnect is not None:
+        reconnect.cancel()
+    if conversation_archiver is not None:
+        await conversation_archiver.close()
+    # By now the server has stopped accepting requests and finished the open ones
+    await drain_in_flight(SHUTDOWN_GRACE_SECONDS)
+    # Drain queued conversation writes before the worker exits
+    if Saarthi_system.summarizer is not None:
+        await Saarthi_system.summarizer.close()
+    await conversation_writer.close()
+    if search_index is not None:
+        await search_index.close()
+    client.close()
+    logger.info("Shutdown complete")
 
 app = FastAPI(
     title="Saarthi AI Assistant API",
     description="Multi-agent voice-based AI assistant with specialized personas",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Request ids and per-request log fields
+app.add_middleware(RequestContextMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -72,18 +579,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# MongoDB connection
-MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
-try:
-    client = MongoClient(MONGO_URL)
-    # Test the connection
-    client.admin.command('ping')
-    db = client.Saarthi_db2
-    print("✅ MongoDB connection successful")
-except Exception as e:
-    print(f"❌ MongoDB connection failed: {e}")
-    db = None
-
 # Pydantic models
 class ConversationRequest(BaseModel):
     message: str
@@ -110,6 +605,39 @@ class ConversationRequest(BaseModel):
                 raise ValueError(f'Invalid persona preference. Must be one of: {valid_personas}')
         return v
 
+class VoiceStart(BaseModel):
+    """First message on /api/voice"""
+    session_id: str
+    persona_preference: Optional[str] = None
+    encoding: str = "pcm16"
+    sample_rate: int = VOICE_SAMPLE_RATE
+
+    @validator('session_id')
+    def session_id_not_empty(cls, v):
+        if not v or not v.strip():
+            raise ValueError('Session ID cannot be empty')
+        return v.strip()
+
+    @validator('persona_preference')
+    def validate_persona_preference(cls, v):
+        if v is not None and v not in ('general', 'education', 'mental_health'):
+            raise ValueError('Invalid persona preference')
+        return v
+
+    @validator('encoding')
+    def validate_encoding(cls, v):
+        if v not in ('pcm16', 'opus'):
+            raise ValueError('Encoding must be pcm16 or opus')
+        return v
+
+    @validator('sample_rate')
+    def validate_sample_rate(cls, v, values):
+        if values.get('encoding') == 'opus' and v not in OPUS_SAMPLE_RATES:
+            raise ValueError(f'Opus sample rate must be one of {", ".join(map(str, OPUS_SAMPLE_RATES))}')
+        if not 8000 <= v <= 48000:
+            raise ValueError('Sample rate must be between 8000 and 48000')
+        return v
+
 class ConversationResponse(BaseModel):
     response: str
     persona_used: str
@@ -118,13 +646,36 @@ class ConversationResponse(BaseModel):
 
 # Saarthi Agent System
 class SaarthiPersona:
-    def __init__(self, name: str, prompt: str, keywords: List[str]):
+    """A persona's instructions, routing keywords and LLM settings.
+
+    The system message and the completion settings are built once, and every
+    turn's messages start with that same dict, so the prompt prefix sent for
+    a persona is byte-identical from turn to turn (which is what provider
+    prompt caches match on) and only the per-turn delta is allocated.
+    """
+
+    def __init__(self, name: str, prompt: str, keywords: List[str], model: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: int = 500):
         self.name = name
         self.prompt = prompt
         self.keywords = keywords
+        self.system_message = {"role": "system", "content": prompt}
+        self.configure(model, temperature, max_tokens)
+
+    def configure(self, model: Optional[str] = None, temperature: float = 0.7, max_tokens: int = 500):
+        """Set the model (LLM_MODEL if unset), temperature and max_tokens used for this persona's turns"""
+        self.model = model or LLM_MODEL
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def messages(self, context: List[Dict[str, str]], message: str) -> List[Dict[str, str]]:
+        """The prompt for one turn: the shared system message, prior context, then the new message"""
+        return [self.system_message, *context, {"role": "user", "content": message}]
 
 class SaarthiAgentSystem:
-    def __init__(self):
+    def __init__(self, history_store: Optional[HistoryStore] = None, semantic_router=None,
+                 context_builder: Optional[ContextBuilder] = None, summary_store=None,
+                 response_cache: Optional[ResponseCache] = None):
         self.personas = {
             "general": SaarthiPersona(
                 name="General Assistant",
@@ -134,70 +685,207 @@ class SaarthiAgentSystem:
             "education": SaarthiPersona(
                 name="Education Specialist",
                 prompt="""You are Saarthi's Education Specialist persona. You help with learning, studying, academic questions, homework, explanations of concepts, and educational guidance. You're encouraging, patient, and adapt your explanations to different learning levels. Use examples and analogies to make complex topics easier to understand.""",
-                keywords=["study", "learn", "school", "homework", "math", "science", "history", "explain", "teach", "education", "academic", "university", "college", "lesson"]
+                keywords=["study", "learn", "school", "coursework", "classwork", "homework", "math", "science", "history", "explain", "teach", "education", "academic", "university", "college", "lesson"]
             ),
             "mental_health": SaarthiPersona(
                 name="Mental Health Support",
                 prompt="""You are Saarthi's Mental Health Support persona. You provide compassionate, supportive responses for emotional well-being, stress management, and mental health topics. You're empathetic, non-judgmental, and encourage professional help when appropriate. Focus on active listening, validation, and helpful coping strategies. Always remind users to seek professional help for serious mental health concerns.""",
-                keywords=["stress", "anxiety", "depression", "mental", "emotional", "feeling", "mood", "therapy", "counseling", "support", "wellness", "cope", "overwhelmed", "sad", "worried"]
+                keywords=["stress", "anxiety", "depression", "mental", "emotional", "feeling", "mood", "therapy", "counseling", "support", "wellness", "cope", "coping", "overwhelmed", "sad", "sadly", "sadness", "worried"]
             ),
         }
-        self.conversation_history = {}
+        self.history_store = history_store or MemoryHistoryStore()
+        self.context_builder = context_builder or ContextBuilder()
+        self.classifier = self.build_classifier()
+        self.semantic_router = semantic_router
+        # Bounds concurrent LLM calls; the executor is only used for sync clients
+        self.llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self.llm_executor = ThreadPoolExecutor(
+            max_workers=LLM_MAX_CONCURRENCY,
+            thread_name_prefix="saarthi-llm"
+        )
+        self.response_cache = response_cache
+        # Entries shared with other workers (RESPONSE_CACHE_STORE=mongo), set once MongoDB connects
+        self.shared_cache: Optional[MongoResponseStore] = None
+        # Serializes turns within a session (prompt build -> LLM -> history append)
+        self.session_locks = KeyedLock()
+        # Folds turns that leave the context window into a running summary
+        self.summarizer = None
+        if summary_store is not None:
+            self.summarizer = RollingSummarizer(
+                summary_store,
+                self.summarize,
+                batch_size=SUMMARY_BATCH_SIZE,
+                interval=SUMMARY_INTERVAL,
+                concurrency=SUMMARY_CONCURRENCY,
+                is_busy=lambda: self.llm_semaphore.locked()
+            )
+
+    def build_classifier(self) -> KeywordClassifier:
+        """Compile every persona's keywords into one classifier"""
+        # Mental health keywords take priority, then education; general is the default
+        return KeywordClassifier(
+            {key: persona.keywords for key, persona in self.personas.items()},
+            priority=["mental_health", "education"],
+            default="general"
+        )
+
+    def reload_keywords(self, keyword_sets: Dict[str, List[str]]):
+        """Replace keyword sets for existing personas and recompile the classifier.
+
+        The new classifier is built before being swapped in, so in-flight
+        classifications never see a half-updated keyword set.
+        """
+        unknown = [key for key in keyword_sets if key not in self.personas]
+        if unknown:
+            raise ValueError(f"Unknown personas: {unknown}")
+        for key, keywords in keyword_sets.items():
+            self.personas[key].keywords = list(keywords)
+        self.classifier = self.build_classifier()
+
+    def configure_personas(self, settings: Dict[str, Dict]):
+        """Set the model, temperature and max_tokens of existing personas; unset fields keep their defaults"""
+        unknown = [key for key in settings if key not in self.personas]
+        if unknown:
+            raise ValueError(f"Unknown personas: {unknown}")
+        for key, values in settings.items():
+            self.personas[key].configure(**values)
+
+    def persona_scores(self, message: str) -> Dict[str, int]:
+        """Keyword hits per persona for a message"""
+        return self.classifier.scores(message)
 
     def classify_persona(self, message: str, session_id: str) -> str:
-        """Simple rule-based persona classification"""
-        message_lower = message.lower()
-        
-        # Check for mental health keywords first (priority)
-        for keyword in self.personas["mental_health"].keywords:
-            if keyword in message_lower:
-                return "mental_health"
-        
-        # Check for education keywords
-        for keyword in self.personas["education"].keywords:
-            if keyword in message_lower:
-                return "education"
-        
-        # Default to general
-        return "general"
+        """Persona classification: keywords, refined by the semantic router if enabled"""
+        persona = self.classifier.classify(message)
+        # Mental health keywords always win; otherwise a confident semantic
+        # match (e.g. a paraphrase with no keywords) overrides the keyword result
+        if persona == "mental_health" or self.semantic_router is None:
+            return persona
+        semantic_persona, _ = self.semantic_router.route(message)
+        return semantic_persona or persona
 
-    def get_context_prompt(self, session_id: str, persona_name: str) -> str:
-        """Get conversation context for the session"""
-        if session_id not in self.conversation_history:
-            return ""
-        
-        history = self.conversation_history[session_id]
-        if len(history) == 0:
-            return ""
-        
-        # Include last 3 exchanges for context
-        recent_history = history[-6:]  # Last 3 user messages and 3 responses
-        context = "Previous conversation context:\n"
-        for i in range(0, len(recent_history), 2):
-            if i + 1 < len(recent_history):
-                context += f"User: {recent_history[i]}\nSaarthi: {recent_history[i+1]}\n"
-        
-        return context
+    def classify_batch(self, messages: List[str]) -> List[str]:
+        """Classify many messages at once (one matmul when the semantic router is enabled)"""
+        keyword_personas = [self.classifier.classify(message) for message in messages]
+        if self.semantic_router is None:
+            return keyword_personas
+        routes = self.semantic_router.route_batch(messages)
+        return [
+            persona if persona == "mental_health" else (semantic_persona or persona)
+            for persona, (semantic_persona, _) in zip(keyword_personas, routes)
+        ]
 
-    def generate_response(self, message: str, session_id: str, persona_preference: Optional[str] = None) -> Dict:
-        """Generate AI response using selected persona"""
-        
+    async def get_context_messages(self, session_id: str, history: List[str]) -> List[Dict[str, str]]:
+        """The running summary plus recent exchanges that fit CONTEXT_TOKEN_BUDGET, as chat messages"""
+        if self.summarizer is None or not history:
+            return self.context_builder.build(session_id, history)[0]
+        try:
+            record = await self.summarizer.get(session_id)
+        except Exception as e:
+            # The summary only adds context; answer without it rather than fail the turn
+            logger.warning("Could not load summary for session: %s", e, extra={"error_type": type(e).__name__})
+            CHAT_ERRORS.inc(stage="context", type=type(e).__name__)
+            return self.context_builder.build(session_id, history)[0]
+        messages, evicted = self.context_builder.build(session_id, history, record["summary"])
+        # Exchanges that no longer fit are summarized in the background
+        self.summarizer.schedule(session_id, evicted, record)
+        return messages
+
+    async def summarize(self, summary: str, exchanges: List[tuple]) -> str:
+        """Fold exchanges into a session's running summary with one LLM call"""
+        await ensure_llm_client()
+        if groq_client is None:
+            raise RuntimeError("AI client not available")
+        turns = "\n\n".join(f"User: {user}\nAssistant: {assistant}" for user, assistant in exchanges)
+        content = f"Current summary:\n{summary}\n\nNew turns:\n{turns}" if summary else f"New turns:\n{turns}"
+        chat_completion = await self.create_completion(
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": content}
+            ],
+            model=LLM_MODEL,
+            temperature=0.3,
+            max_tokens=SUMMARY_MAX_TOKENS
+        )
+        return chat_completion.choices[0].message.content.strip()
+
+    async def create_completion(self, **kwargs):
+        """Run a chat completion without blocking the event loop"""
+        async with self.llm_semaphore:
+            if groq_client_is_async:
+                return await groq_client.chat.completions.create(**kwargs)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.llm_executor,
+                functools.partial(groq_client.chat.completions.create, **kwargs)
+            )
+
+    async def prepare_turn(self, message: str, session_id: str, persona_preference: Optional[str] = None):
+        """Select the persona and build the chat messages for one turn"""
         # Select persona
         if persona_preference and persona_preference in self.personas:
             selected_persona = persona_preference
         else:
-            selected_persona = self.classify_persona(message, session_id)
+            with chat_stage("classify"):
+                selected_persona = self.classify_persona(message, session_id)
         
         persona = self.personas[selected_persona]
         
-        # Get conversation context
-        context = self.get_context_prompt(session_id, selected_persona)
-        
-        # Prepare the prompt
-        system_prompt = f"{persona.prompt}\n\n{context}"
+        with chat_stage("context"):
+            # Get conversation context
+            history = await self.history_store.get(session_id)
+            
+            # Prepare the prompt: persona instructions, prior exchanges, then the new message
+            messages = persona.messages(await self.get_context_messages(session_id, history), message)
+        return selected_persona, persona, messages
+
+    async def record_turn(self, session_id: str, message: str, response: str):
+        """Append a completed exchange to the session history"""
+        # The store keeps only the last MAX_CONVERSATION_HISTORY exchanges per session
+        await self.history_store.append(session_id, message, response)
+
+    async def cached_response(self, persona: str, message: str, context: List[Dict[str, str]]) -> Optional[str]:
+        """Cached response for this turn: from this worker's cache, else from the shared tier"""
+        if self.response_cache is None:
+            return None
+        cached = self.response_cache.get(persona, message, context)
+        if cached is not None or self.shared_cache is None or not self.response_cache.cacheable(persona):
+            return cached
+        entry = await self.shared_cache.get(self.response_cache.key(persona, message, context))
+        if entry is None:
+            return None
+        response, latency = entry
+        self.response_cache.put(persona, message, context, response, latency)
+        return response
+
+    async def cache_response(self, persona: str, message: str, context: List[Dict[str, str]],
+                             response: str, latency: float):
+        """Cache a fresh LLM response locally and, if enabled, for the other workers"""
+        if self.response_cache is None:
+            return
+        self.response_cache.put(persona, message, context, response, latency)
+        if self.shared_cache is not None and self.response_cache.cacheable(persona):
+            await self.shared_cache.put(self.response_cache.key(persona, message, context), response, latency)
+
+    async def generate_response(self, message: str, session_id: str, persona_preference: Optional[str] = None) -> Dict:
+        """Generate AI response using selected persona.
+
+        Turns on the same session run one at a time in arrival order, so each
+        one sees the history left by the previous; other sessions don't wait.
+        """
+        await ensure_llm_client()
+        async with self.session_locks.hold(session_id):
+            return await self.generate_turn(message, session_id, persona_preference)
+
+    async def generate_turn(self, message: str, session_id: str, persona_preference: Optional[str] = None) -> Dict:
+        """One turn: build the prompt from history, call the LLM, record the exchange"""
+        turn_start = time.perf_counter()
+        selected_persona, persona, messages = await self.prepare_turn(message, session_id, persona_preference)
+        bind(persona=selected_persona)
         
         # Check if AI client is available
         if groq_client is None:
+            CHAT_ERRORS.inc(stage="llm", type="ClientUnavailable")
             return {
                 "response": "I'm currently experiencing technical difficulties with my AI service. Please try again later or contact support if the issue persists.",
                 "persona_used": selected_persona,
@@ -205,42 +893,36 @@ class SaarthiAgentSystem:
                 "error": "AI client not available"
             }
         
+        # Everything between the persona prompt and the new message
+        context = messages[1:-1]
+        cached = await self.cached_response(selected_persona, message, context)
+        if cached is not None:
+            await self.record_turn(session_id, message, cached)
+            CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_start, persona=selected_persona, source="cache")
+            return {
+                "response": cached,
+                "persona_used": selected_persona,
+                "persona_name": persona.name,
+                "cached": True
+            }
+        
         try:
-            # Generate response using Groq or OpenAI client
-            if hasattr(groq_client, 'chat'):
-                # Using Groq client
-                chat_completion = groq_client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": message}
-                    ],
-                    model="llama3-8b-8192",
-                    temperature=0.7,
-                    max_tokens=500
-                )
-                response = chat_completion.choices[0].message.content
-            else:
-                # Using OpenAI client with Groq base URL
-                chat_completion = groq_client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": message}
-                    ],
-                    model="llama3-8b-8192",
-                    temperature=0.7,
-                    max_tokens=500
-                )
-                response = chat_completion.choices[0].message.content
-            
-            # Store conversation history
-            if session_id not in self.conversation_history:
-                self.conversation_history[session_id] = []
+            start = time.perf_counter()
+            chat_completion = await self.create_completion(
+                messages=messages,
+                model=persona.model,
+                temperature=persona.temperature,
+                max_tokens=persona.max_tokens
+            )
+            response = chat_completion.choices[0].message.content
             
-            self.conversation_history[session_id].extend([message, response])
+            llm_seconds = time.perf_counter() - start
+            self.observe_completion(selected_persona, chat_completion, llm_seconds, persona.model)
+            await self.cache_response(selected_persona, message, context, response, llm_seconds)
             
-            # Keep only last 20 exchanges per session
-            if len(self.conversation_history[session_id]) > 40:
-                self.conversation_history[session_id] = self.conversation_history[session_id][-40:]
+            # Store conversation history
+            await self.record_turn(session_id, message, response)
+            CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_start, persona=selected_persona, source="llm")
             
             return {
                 "response": response,
@@ -249,6 +931,9 @@ class SaarthiAgentSystem:
             }
             
         except Exception as e:
+            CHAT_ERRORS.inc(stage="llm", type=type(e).__name__)
+            CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_start, persona=selected_persona, source="error")
+            logger.error("LLM call failed: %s", e, extra={"error_type": type(e).__name__})
             return {
                 "response": "I'm having trouble processing your request right now. Could you please try again?",
                 "persona_used": "general",
@@ -256,8 +941,223 @@ class SaarthiAgentSystem:
                 "error": str(e)
             }
 
+    def observe_completion(self, persona: str, chat_completion, seconds: float, requested_model: str = LLM_MODEL):
+        """Record LLM latency and token usage for a completion, labelled by persona and model"""
+        # The response names the model that answered, which differs from the requested one after failover
+        model = getattr(chat_completion, "model", None) or requested_model
+        observe_stage("llm", seconds)
+        LLM_REQUEST_SECONDS.observe(seconds, persona=persona, model=model)
+        usage = getattr(chat_completion, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, persona=persona, model=model, kind="prompt")
+            LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, persona=persona, model=model, kind="completion")
+
+    async def stream_completion(self, **kwargs) -> AsyncIterator[str]:
+        """Yield completion text deltas as they arrive from the LLM"""
+        if not groq_client_is_async:
+            # Sync SDKs can't be iterated without blocking the loop, so fall
+            # back to a single offloaded completion delivered in one piece
+            chat_completion = await self.create_completion(**kwargs)
+            yield chat_completion.choices[0].message.content
+            return
+        async with self.llm_semaphore:
+            stream = await groq_client.chat.completions.create(stream=True, **kwargs)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def stream_response(self, message: str, session_id: str, persona_preference: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Stream an AI response sentence by sentence.
+
+        Yields a "persona" event, then one "chunk" event per complete
+        sentence, then a "done" event carrying the same fields as
+        generate_response. History is only updated once the stream finishes,
+        and like generate_response, turns on one session are serialized.
+        """
+        await ensure_llm_client()
+        async with self.session_locks.hold(session_id):
+            async for event in self.stream_turn(message, session_id, persona_preference):
+                yield event
+
+    async def stream_turn(self, message: str, session_id: str, persona_preference: Optional[str] = None) -> AsyncIterator[Dict]:
+        """One streamed turn; see stream_response"""
+        turn_start = time.perf_counter()
+        selected_persona, persona, messages = await self.prepare_turn(message, session_id, persona_preference)
+        bind(persona=selected_persona)
+        yield {"type": "persona", "persona_used": selected_persona, "persona_name": persona.name}
+        
+        if groq_client is None:
+            CHAT_ERRORS.inc(stage="llm", type="ClientUnavailable")
+            response = "I'm currently experiencing technical difficulties with my AI service. Please try again later or contact support if the issue persists."
+            yield {"type": "chunk", "text": response}
+            yield {
+                "type": "done",
+                "response": response,
+                "persona_used": selected_persona,
+                "persona_name": persona.name,
+                "error": "AI client not available"
+            }
+            return
+        
+        context = messages[1:-1]
+        cached = await self.cached_response(selected_persona, message, context)
+        if cached is not None:
+            chunker = SentenceChunker()
+            for sentence in chunker.feed(cached) + chunker.flush():
+                yield {"type": "chunk", "text": sentence}
+            await self.record_turn(session_id, message, cached)
+            CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_start, persona=selected_persona, source="cache")
+            yield {
+                "type": "done",
+                "response": cached,
+                "persona_used": selected_persona,
+                "persona_name": persona.name,
+                "cached": True
+            }
+            return
+        
+        chunker = SentenceChunker()
+        parts = []
+        start = time.perf_counter()
+        try:
+            async for delta in self.stream_completion(
+                messages=messages,
+                model=persona.model,
+                temperature=persona.temperature,
+                max_tokens=persona.max_tokens
+            ):
+                parts.append(delta)
+                for sentence in chunker.feed(delta):
+                    yield {"type": "chunk", "text": sentence}
+            for sentence in chunker.flush():
+                yield {"type": "chunk", "text": sentence}
+        except Exception as e:
+            CHAT_ERRORS.inc(stage="llm", type=type(e).__name__)
+            CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_start, persona=selected_persona, source="error")
+            logger.error("LLM stream failed: %s", e, extra={"error_type": type(e).__name__})
+            response = "I'm having trouble processing your request right now. Could you please try again?"
+            yield {"type": "chunk", "text": response}
+            yield {
+                "type": "done",
+                "response": response,
+                "persona_used": "general",
+                "persona_name": "General Assistant",
+                "error": str(e)
+            }
+            return
+        
+        response = "".join(parts)
+        llm_seconds = time.perf_counter() - start
+        # Streamed chunks carry no usage, so only latency is recorded
+        observe_stage("llm", llm_seconds)
+        LLM_REQUEST_SECONDS.observe(llm_seconds, persona=selected_persona, model=persona.model)
+        await self.cache_response(selected_persona, message, context, response, llm_seconds)
+        await self.record_turn(session_id, message, response)
+        CHAT_TURN_SECONDS.observe(time.perf_counter() - turn_start, persona=selected_persona, source="llm")
+        yield {
+            "type": "done",
+            "response": response,
+            "persona_used": selected_persona,
+            "persona_name": persona.name
+        }
+
+def load_keyword_sets(path: str) -> Dict[str, List[str]]:
+    """Read {"persona": ["keyword", ...]} overrides from a JSON file"""
+    with open(path) as f:
+        keyword_sets = json.load(f)
+    if not isinstance(keyword_sets, dict) or not all(
+        isinstance(keywords, list) and all(isinstance(k, str) for k in keywords)
+        for keywords in keyword_sets.values()
+    ):
+        raise ValueError("Expected an object mapping persona names to lists of keywords")
+    return keyword_sets
+
+def load_persona_settings(path: str) -> Dict[str, Dict]:
+    """Read {"persona": {"model": ..., "temperature": ..., "max_tokens": ...}} from a JSON file"""
+    with open(path) as f:
+        settings = json.load(f)
+    if not isinstance(settings, dict) or not all(
+        isinstance(values, dict) and set(values) <= {"model", "temperature", "max_tokens"}
+        for values in settings.values()
+    ):
+        raise ValueError("Expected an object mapping persona names to model, temperature and max_tokens")
+    return settings
+
+def create_context_builder(tokenizer: str = CONTEXT_TOKENIZER) -> ContextBuilder:
+    """Build the token-budgeted context builder with the configured token counter"""
+    counter = ApproxTokenCounter()
+    if tokenizer == "tiktoken":
+        try:
+            counter = TiktokenCounter()
+        except Exception as e:
+            logger.warning("tiktoken not available (%s) - using approximate token counts", e)
+    # One stored exchange is always left out so it gets summarized before the store drops it
+    return ContextBuilder(
+        counter,
+        budget=CONTEXT_TOKEN_BUDGET,
+        max_sessions=HISTORY_MAX_SESSIONS,
+        max_exchanges=MAX_CONVERSATION_HISTORY - 1
+    )
+
+def create_response_cache(mode: str = RESPONSE_CACHE) -> Optional[ResponseCache]:
+    """Build the opt-in LLM response cache, or None if disabled"""
+    if mode == "off":
+        return None
+    embedder = None
+    if mode == "semantic":
+        try:
+            from semantic import HashedEmbedder
+            embedder = HashedEmbedder()
+        except ImportError as e:
+            logger.warning("Semantic response cache unavailable (%s) - caching exact matches only", e)
+    elif mode != "exact":
+        logger.warning("Unknown RESPONSE_CACHE '%s', caching exact matches only", mode)
+    excluded = [persona.strip() for persona in RESPONSE_CACHE_EXCLUDE.split(",") if persona.strip()]
+    logger.info("Response cache enabled", extra={"mode": "semantic" if embedder is not None else "exact"})
+    return ResponseCache(
+        max_entries=RESPONSE_CACHE_SIZE,
+        ttl=RESPONSE_CACHE_TTL,
+        excluded=excluded,
+        embedder=embedder,
+        threshold=RESPONSE_CACHE_THRESHOLD
+    )
+
+def create_semantic_router(mode: str = SEMANTIC_ROUTER):
+    """Build the optional semantic persona router, or None if disabled/unavailable"""
+    if mode == "off":
+        return None
+    try:
+        from semantic import HashedEmbedder, SemanticRouter, SentenceTransformerEmbedder
+        embedder = SentenceTransformerEmbedder(SEMANTIC_MODEL) if mode == "model" else HashedEmbedder()
+        router = SemanticRouter(embedder, threshold=SEMANTIC_THRESHOLD)
+        logger.info("Semantic persona router enabled", extra={"embedder": embedder.name})
+        return router
+    except ImportError as e:
+        logger.warning("Semantic persona router not available (%s) - using keywords only", e)
+    except Exception as e:
+        logger.exception("Error initializing semantic persona router")
+    return None
+
 # Initialize the agent system
-Saarthi_system = SaarthiAgentSystem()
+Saarthi_system = SaarthiAgentSystem(
+    history_store=create_history_store(),
+    semantic_router=create_semantic_router(),
+    context_builder=create_context_builder(),
+    summary_store=create_summary_store(),
+    response_cache=create_response_cache()
+)
+if PERSONA_KEYWORDS_FILE:
+    try:
+        Saarthi_system.reload_keywords(load_keyword_sets(PERSONA_KEYWORDS_FILE))
+        logger.info("Loaded persona keywords from %s", PERSONA_KEYWORDS_FILE)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not load persona keywords from %s: %s", PERSONA_KEYWORDS_FILE, e)
+if PERSONA_SETTINGS_FILE:
+    try:
+        Saarthi_system.configure_personas(load_persona_settings(PERSONA_SETTINGS_FILE))
+        logger.info("Loaded persona settings from %s", PERSONA_SETTINGS_FILE)
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning("Could not load persona settings from %s: %s", PERSONA_SETTINGS_FILE, e)
 
 @app.get("/")
 async def root():
@@ -265,7 +1165,75 @@ async def root():
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "service": "Saarthi AI Assistant"}
+    return {
+        "status": "healthy",
+        "service": "Saarthi AI Assistant",
+        "worker": os.getpid(),
+        "database": "connected" if db is not None else "unavailable",
+        "llm_client": "ready" if groq_client is not None else (
+            "initializing" if llm_client_ready is not None and not llm_client_ready.done() else "unavailable"
+        ),
+        "history": Saarthi_system.history_store.metrics(),
+        "summaries": Saarthi_system.summarizer.stats if Saarthi_system.summarizer is not None else None,
+        "response_cache": {
+            **Saarthi_system.response_cache.metrics(),
+            "shared": Saarthi_system.shared_cache.stats if Saarthi_system.shared_cache is not None else None
+        } if Saarthi_system.response_cache is not None else None,
+        "llm": groq_client.metrics() if isinstance(groq_client, LLMGateway) else None,
+        "chat_coalescing": {**chat_flight.stats, **idempotent_results.stats, "streams": chat_stream_flight.stats},
+        "admission": {
+            **chat_admission.metrics(),
+            "rate_limited_sessions": session_limiter.stats["limited"],
+            "rate_limited_ips": ip_limiter.stats["limited"]
+        },
+        "session_locks": {"active": len(Saarthi_system.session_locks), **Saarthi_system.session_locks.stats},
+        "archive": conversation_archiver.stats if conversation_archiver is not None else None,
+        "search": search_index.metrics() if search_index is not None else None
+    }
+
+@metrics_registry.collector
+def collect_component_metrics():
+    """Counters and gauges the chat components already keep, read at scrape time"""
+    history = Saarthi_system.history_store
+    yield ("saarthi_history_lookups_total", "counter", "Session history lookups by result", [
+        ({"store": history.name, "result": "hit"}, history.stats["hits"]),
+        ({"store": history.name, "result": "miss"}, history.stats["misses"])
+    ])
+    cache = Saarthi_system.response_cache
+    if cache is not None:
+        yield ("saarthi_response_cache_lookups_total", "counter", "Response cache lookups by result", [
+            ({"result": "hit"}, cache.stats["hits"]),
+            ({"result": "miss"}, cache.stats["misses"]),
+            ({"result": "skipped"}, cache.stats["skipped"])
+        ])
+    yield ("saarthi_chat_in_flight", "gauge", "Chat turns being generated", [({}, chat_admission.active)])
+    yield ("saarthi_chat_queued", "gauge", "Chat requests waiting for admission", [({}, chat_admission.waiting)])
+    yield ("saarthi_chat_rejected_total", "counter", "Chat requests refused with a 429, by reason", [
+        ({"reason": "session_rate"}, session_limiter.stats["limited"]),
+        ({"reason": "ip_rate"}, ip_limiter.stats["limited"]),
+        ({"reason": "queue_full"}, chat_admission.stats["shed_queue_full"]),
+        ({"reason": "queue_timeout"}, chat_admission.stats["shed_timeout"]),
+        ({"reason": "displaced"}, chat_admission.stats["displaced"])
+    ])
+    yield ("saarthi_conversation_writes_total", "counter", "Conversation documents written to MongoDB, by result", [
+        ({"result": "written"}, conversation_writer.stats["written"]),
+        ({"result": "failed"}, conversation_writer.stats["failed"])
+    ])
+    yield ("saarthi_log_records_dropped_total", "counter", "Log records dropped because the log queue was full",
+           [({}, log_handler.dropped)])
+    yield ("saarthi_conversation_write_backlog", "gauge", "Conversation documents waiting to be written",
+           [({}, conversation_writer.backlog)])
+    if isinstance(groq_client, LLMGateway):
+        providers = groq_client.providers
+        yield ("saarthi_llm_provider_calls_total", "counter", "LLM calls per provider",
+               [({"provider": provider.name}, provider.stats["calls"]) for provider in providers])
+        yield ("saarthi_llm_provider_failures_total", "counter", "Failed LLM calls per provider",
+               [({"provider": provider.name}, provider.stats["failures"]) for provider in providers])
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/api/debug/request")
 async def debug_request(request: dict):
@@ -278,10 +1246,236 @@ async def debug_request(request: dict):
         "persona_preference_value": request.get("persona_preference")
     }
 
+def conversation_document(message_id: str, request: ConversationRequest, result: Dict,
+                          idempotency_key: Optional[str] = None) -> Dict:
+    """The MongoDB document for one chat turn.
+
+    persona_name is derived from persona_used and error is left out when
+    there was none; readers fill both back in with expand_conversation().
+    Failed turns don't keep the Idempotency-Key, so a retry gets a fresh answer.
+    """
+    conversation_doc = {
+        "_id": message_id,
+        "session_id": request.session_id,
+        "user_message": request.message,
+        "ai_response": result["response"],
+        "persona_used": result["persona_used"],
+        "timestamp": datetime.utcnow()
+    }
+    if result.get("error") is not None:
+        conversation_doc["error"] = result["error"]
+    if idempotency_key and "error" not in result:
+        conversation_doc["idempotency_key"] = idempotency_key
+    return conversation_doc
+
+async def store_conversation(message_id: str, request: ConversationRequest, result: Dict,
+                             idempotency_key: Optional[str] = None):
+    """Queue one chat turn for MongoDB, if available"""
+    if db is not None:
+        try:
+            conversation_doc = conversation_document(message_id, request, result, idempotency_key)
+            
+            # Write-behind: the insert happens in the next batch flush
+            with chat_stage("store"):
+                await conversation_writer.enqueue(conversation_doc)
+        except Exception as db_error:
+            logger.error("Failed to queue conversation for MongoDB: %s", db_error)
+            CHAT_ERRORS.inc(stage="store", type=type(db_error).__name__)
+            # Continue without database storage
+    else:
+        logger.debug("MongoDB not available - skipping conversation storage")
+
+# Concurrent identical chat requests share one LLM call and one stored document
+chat_flight = SingleFlight()
+# The same for /api/chat/stream: duplicates read the one stream's events
+chat_stream_flight = StreamFlight()
+# Completed chat results by (session_id, Idempotency-Key), for retries after completion
+idempotent_results = IdempotencyStore(ttl=IDEMPOTENCY_TTL_SECONDS)
+
+async def drain_in_flight(timeout: float):
+    """Wait up to `timeout` seconds for chat turns still generating, e.g. for clients that disconnected"""
+    tasks = list(chat_flight.calls.values()) + [stream.task for stream in chat_stream_flight.streams.values()]
+    if not tasks:
+        return
+    logger.info("Draining in-flight chat turns", extra={"turns": len(tasks)})
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        logger.warning("Shutdown grace period over, abandoning chat turns", extra={"turns": len(pending)})
+
+async def find_idempotent_response(session_id: str, idempotency_key: str) -> Optional[ConversationResponse]:
+    """Result of an earlier request with this key: from this worker, else from MongoDB"""
+    key = (session_id, idempotency_key)
+    response = idempotent_results.get(key)
+    if response is not None or db is None:
+        return response
+    try:
+        doc = await db.conversations.find_one(
+            # Failed turns stored with a key before they stopped keeping it are not replayed
+            {"session_id": session_id, "idempotency_key": idempotency_key, "error": None},
+            {"ai_response": 1, "persona_used": 1, "persona_name": 1}
+        )
+    except Exception as db_error:
+        logger.warning("Failed to look up idempotency key in MongoDB: %s", db_error)
+        return None
+    if doc is None:
+        return None
+    expand_conversation(doc, persona_names())
+    response = ConversationResponse(
+        response=doc["ai_response"],
+        persona_used=doc["persona_name"],
+        session_id=session_id,
+        message_id=doc["_id"]
+    )
+    idempotent_results.put(key, response)
+    return response
+
+# Caps concurrent chat turns, queueing the excess by persona priority
+chat_admission = AdmissionController(
+    max_concurrent=CHAT_MAX_CONCURRENT,
+    max_queue=CHAT_MAX_QUEUE,
+    queue_timeout=CHAT_QUEUE_TIMEOUT
+)
+
+def create_rate_limiter(scope: str, rate: float, burst: float, store: str = RATE_LIMIT_STORE) -> RateLimiter:
+    """Build a per-worker limiter, or one shared through MongoDB once it connects"""
+    if store == "mongo":
+        return MongoRateLimiter(None, scope, rate, burst)
+    if store != "memory":
+        logger.warning("Unknown RATE_LIMIT_STORE '%s', limiting per worker", store)
+    return RateLimiter(rate, burst)
+
+def parse_networks(value: str) -> List:
+    """IP networks from a comma-separated list of addresses and CIDRs; invalid entries are skipped"""
+    networks = []
+    for item in value.split(","):
+        if item.strip():
+            try:
+                networks.append(ipaddress.ip_network(item.strip(), strict=False))
+            except ValueError:
+                logger.warning("Ignoring invalid TRUSTED_PROXIES entry '%s'", item.strip())
+    return networks
+
+trusted_proxies = parse_networks(TRUSTED_PROXIES)
+
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in trusted_proxies)
+
+def client_ip(connection: HTTPConnection) -> str:
+    """The client's address: the connecting peer, or, when that is a trusted
+    proxy, the nearest X-Forwarded-For hop that isn't one (earlier hops can
+    be forged by the client)
+    """
+    peer = connection.client.host if connection.client else "unknown"
+    if not trusted_proxies or not is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for header in connection.headers.getlist("x-forwarded-for") for hop in header.split(",")]
+    hops = [hop for hop in hops if hop]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+session_limiter = create_rate_limiter("session", CHAT_RATE_PER_SESSION, CHAT_BURST_PER_SESSION)
+ip_limiter = create_rate_limiter("ip", CHAT_RATE_PER_IP, CHAT_BURST_PER_IP)
+PRIORITY_PERSONAS = {persona.strip() for persona in CHAT_PRIORITY_PERSONAS.split(",") if persona.strip()}
+
+async def check_rate_limits(request: ConversationRequest, http_request: HTTPConnection):
+    """Raise a 429 if this session or client IP is over its rate limit"""
+    try:
+        for limiter, key in ((session_limiter, request.session_id), (ip_limiter, client_ip(http_request))):
+            if isinstance(limiter, MongoRateLimiter):
+                await limiter.check_shared(key)
+            else:
+                limiter.check(key)
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": e.retry_after_header})
+
+# Admission priority of batch rows: behind every interactive turn
+BATCH_PRIORITY = 2
+
+def chat_priority(request: ConversationRequest) -> int:
+    """Queue priority for a chat turn: 0 for priority personas, else 1"""
+    persona = request.persona_preference
+    if persona not in Saarthi_system.personas:
+        # Keywords alone decide mental_health, so the semantic router isn't needed here
+        persona = Saarthi_system.classifier.classify(request.message)
+    return 0 if persona in PRIORITY_PERSONAS else 1
+
+async def admit_chat(request: ConversationRequest) -> Callable[[], None]:
+    """Take an admission slot for a streamed turn; returns its release.
+
+    A full queue or a queue timeout raises a 429 HTTPException.
+    """
+    try:
+        with chat_stage("queue"):
+            admitted_at = await chat_admission.acquire(chat_priority(request))
+    except Overloaded as e:
+        raise HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": e.retry_after_header})
+    return lambda: chat_admission.release(admitted_at)
+
+async def run_admitted_chat(request: ConversationRequest, idempotency_key: Optional[str] = None) -> ConversationResponse:
+    """run_chat once the admission controller grants a slot"""
+    with chat_stage("queue"):
+        admitted_at = await chat_admission.acquire(chat_priority(request))
+    try:
+        return await run_chat(request, idempotency_key)
+    finally:
+        chat_admission.release(admitted_at)
+
+def log_turn(message_id: str, result: Dict):
+    """One record per chat turn: every failed turn, and LOG_SAMPLE_RATE of the rest"""
+    if "error" in result:
+        logger.warning("Chat turn failed", extra={"message_id": message_id, "error": result["error"]})
+    else:
+        logger.info("Chat turn completed", extra={
+            "message_id": message_id, "cached": result.get("cached", False), "sample": True
+        })
+
+async def run_chat(request: ConversationRequest, idempotency_key: Optional[str] = None) -> ConversationResponse:
+    """Generate, store and return one chat turn"""
+    # Generate response using Saarthi system
+    result = await Saarthi_system.generate_response(
+        message=request.message,
+        session_id=request.session_id,
+        persona_preference=request.persona_preference
+    )
+    
+    # Create message ID
+    message_id = str(uuid.uuid4())
+    
+    # Store conversation in database if MongoDB is available
+    await store_conversation(message_id, request, result, idempotency_key)
+    log_turn(message_id, result)
+    
+    response = ConversationResponse(
+        response=result["response"],
+        persona_used=result["persona_name"],
+        session_id=request.session_id,
+        message_id=message_id
+    )
+    if idempotency_key and "error" not in result:
+        idempotent_results.put((request.session_id, idempotency_key), response)
+    return response
+
 @app.post("/api/chat")
-async def chat(request: ConversationRequest):
-    """Main chat endpoint for voice and text conversations"""
+async def chat(request: ConversationRequest, http_request: Request, idempotency_key: Optional[str] = Header(None)):
+    """Main chat endpoint for voice and text conversations.
+
+    Identical requests (same session, message and persona preference) that
+    arrive while one is in flight share its response. Clients may send an
+    Idempotency-Key header; a retry with the same key returns the stored
+    result instead of generating a new one.
+
+    Requests over the per-session or per-IP rate limit, or that find the
+    admission queue full, get a 429 with a Retry-After header.
+    """
     try:
+        validation_start = time.perf_counter()
+        bind(session_id=request.session_id)
         # Validate input
         if not request.message.strip():
             raise HTTPException(status_code=400, detail="Message cannot be empty")
@@ -290,6 +1484,7 @@ async def chat(request: ConversationRequest):
             raise HTTPException(status_code=400, detail="Session ID cannot be empty")
         
         # Check if Groq client is available
+        await ensure_llm_client()
         if groq_client is None:
             # Return a graceful error response instead of raising an exception
             return ConversationResponse(
@@ -299,52 +1494,418 @@ async def chat(request: ConversationRequest):
                 message_id=str(uuid.uuid4())
             )
         
-        # Generate response using Saarthi system
-        result = Saarthi_system.generate_response(
-            message=request.message,
-            session_id=request.session_id,
-            persona_preference=request.persona_preference
-        )
+        # A retry of a completed request gets its stored result without spending rate tokens
+        if idempotency_key:
+            stored = await find_idempotent_response(request.session_id, idempotency_key)
+            if stored is not None:
+                return stored
         
-        # Create message ID
-        message_id = str(uuid.uuid4())
+        await check_rate_limits(request, http_request)
+        observe_stage("validation", time.perf_counter() - validation_start)
         
-        # Store conversation in database if MongoDB is available
-        if db is not None:
-            try:
-                conversation_doc = {
-                    "_id": message_id,
-                    "session_id": request.session_id,
-                    "user_message": request.message,
-                    "ai_response": result["response"],
-                    "persona_used": result["persona_used"],
-                    "persona_name": result["persona_name"],
-                    "timestamp": datetime.utcnow(),
-                    "error": result.get("error")
-                }
-                
-                db.conversations.insert_one(conversation_doc)
-                print(f"✅ Conversation stored in MongoDB: {message_id}")
-            except Exception as db_error:
-                print(f"⚠️ Failed to store conversation in MongoDB: {db_error}")
-                # Continue without database storage
+        if idempotency_key:
+            flight_key = ("idempotency_key", request.session_id, idempotency_key)
         else:
-            print("⚠️ MongoDB not available - skipping conversation storage")
+            flight_key = (request.session_id, request.message, request.persona_preference)
         
-        return ConversationResponse(
-            response=result["response"],
-            persona_used=result["persona_name"],
-            session_id=request.session_id,
-            message_id=message_id
-        )
+        return await chat_flight.do(flight_key, lambda: run_admitted_chat(request, idempotency_key))
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
+    except Overloaded as e:
+        # Shed load fast instead of letting the request time out
+        raise HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": e.retry_after_header})
     except Exception as e:
-        print(f"❌ Error in chat endpoint: {e}")
+        logger.exception("Error in chat endpoint")
+        CHAT_ERRORS.inc(stage="chat", type=type(e).__name__)
         raise HTTPException(status_code=500, detail=f"Error processing conversation: {str(e)}")
 
+def event_stream_response(events) -> StreamingResponse:
+    """Send SSE-formatted `events` unbuffered"""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def replay_events(response: ConversationResponse) -> List[str]:
+    """A completed turn as the events /api/chat/stream sent for it"""
+    chunker = SentenceChunker()
+    return [
+        sse_event("persona", {"persona_used": response.persona_used}),
+        *(sse_event("chunk", {"text": sentence}) for sentence in chunker.feed(response.response) + chunker.flush()),
+        sse_event("done", response.model_dump())
+    ]
+
+async def stream_turn(request: ConversationRequest, idempotency_key: Optional[str],
+                      release: Callable[[], None]) -> AsyncIterator[str]:
+    """Generate, store and stream one chat turn as SSE events, then free its admission slot"""
+    try:
+        message_id = str(uuid.uuid4())
+        async for event in Saarthi_system.stream_response(
+            message=request.message,
+            session_id=request.session_id,
+            persona_preference=request.persona_preference
+        ):
+            if event["type"] == "done":
+                await store_conversation(message_id, request, event, idempotency_key)
+                log_turn(message_id, event)
+                response = ConversationResponse(
+                    response=event["response"],
+                    persona_used=event["persona_name"],
+                    session_id=request.session_id,
+                    message_id=message_id
+                )
+                if idempotency_key and "error" not in event:
+                    idempotent_results.put((request.session_id, idempotency_key), response)
+                yield sse_event("done", response.model_dump())
+            elif event["type"] == "chunk":
+                yield sse_event("chunk", {"text": event["text"]})
+            else:
+                yield sse_event("persona", {"persona_used": event["persona_name"]})
+    finally:
+        release()
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ConversationRequest, http_request: Request, idempotency_key: Optional[str] = Header(None)):
+    """Streaming chat endpoint (server-sent events).
+
+    Emits a "persona" event, one "chunk" event per sentence as soon as it is
+    complete, and a final "done" event with the message_id once the turn has
+    been stored. Subject to the same rate limits and admission control as
+    /api/chat: the turn holds an admission slot until it is generated.
+
+    Duplicates work as on /api/chat: identical requests (or ones with the
+    same Idempotency-Key) that arrive while a turn is streaming read that
+    turn's events from the start, and a retry of a completed key gets its
+    stored result replayed as persona, chunk and done events.
+    """
+    bind(session_id=request.session_id)
+    if idempotency_key:
+        stored = await find_idempotent_response(request.session_id, idempotency_key)
+        if stored is not None:
+            return event_stream_response(iter(replay_events(stored)))
+    
+    await check_rate_limits(request, http_request)
+    if idempotency_key:
+        flight_key = ("idempotency_key", request.session_id, idempotency_key)
+    else:
+        flight_key = (request.session_id, request.message, request.persona_preference)
+    
+    stream = chat_stream_flight.join(flight_key)
+    if stream is None:
+        release = await admit_chat(request)
+        # Another request may have started the same turn while this one queued
+        stream = chat_stream_flight.join(flight_key)
+        if stream is not None:
+            release()
+        else:
+            stream = chat_stream_flight.start(flight_key, lambda: stream_turn(request, idempotency_key, release))
+    return event_stream_response(stream.subscribe())
+
+async def admit_batch_row() -> float:
+    """An admission slot for one batch row, taken behind all live chat.
+
+    Rows wait instead of failing: if the queue is full, or live traffic
+    displaces them, they try again after the suggested delay.
+    """
+    while True:
+        try:
+            return await chat_admission.acquire(BATCH_PRIORITY)
+        except Overloaded as e:
+            await asyncio.sleep(e.retry_after)
+
+def parse_batch(lines: List[str]) -> List[BatchRow]:
+    """Batch input rows, validated like /api/chat requests"""
+    return parse_rows(lines, lambda data: ConversationRequest(**data))
+
+async def run_batch(rows: List[BatchRow], concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[Dict]:
+    """Answer a batch of chat rows: one "result" per row, in completion order, then a "summary".
+
+    Every message is classified in a single pass up front. Sessions are then
+    answered `concurrency` at a time through the same pipeline as /api/chat
+    (history, response cache, LLM gateway), each session's rows in input
+    order. Each row takes an admission slot at BATCH_PRIORITY, so live chat
+    is always served first. Turns are stored with bulk inserts by a writer
+    of their own, so a large batch doesn't queue ahead of live chat writes;
+    the summary is sent once they are all in MongoDB.
+    """
+    start = time.perf_counter()
+    await ensure_llm_client()
+    valid = [row for row in rows if row.request is not None]
+    # One vectorized pass (a single matmul with the semantic router), off the event loop
+    personas = await asyncio.to_thread(Saarthi_system.classify_batch, [row.request.message for row in valid])
+    for row, persona in zip(valid, personas):
+        preference = row.request.persona_preference
+        row.persona = preference if preference in Saarthi_system.personas else persona
+
+    writer = None
+    if db is not None:
+        writer = ConversationWriter(
+            db.conversations,
+            db.sessions,
+            batch_size=BATCH_WRITE_SIZE,
+            flush_interval=1.0,
+            max_backlog=max(BATCH_WRITE_SIZE * 4, MONGO_WRITE_MAX_BACKLOG),
+            on_insert=lambda seconds: CHAT_STAGE_SECONDS.observe(seconds, stage="mongo_insert"),
+            on_write=index_conversations
+        )
+    counts = Counter()
+    persona_counts = Counter()
+
+    async def run_row(row: BatchRow) -> Dict:
+        request = row.request
+        admitted_at = await admit_batch_row()
+        try:
+            result = await Saarthi_system.generate_response(request.message, request.session_id, row.persona)
+        except Exception as e:
+            logger.error("Batch row failed: %s", e, extra={"error_type": type(e).__name__, "line": row.line})
+            CHAT_ERRORS.inc(stage="batch", type=type(e).__name__)
+            result = {
+                "response": None,
+                "persona_used": row.persona,
+                "persona_name": Saarthi_system.personas[row.persona].name,
+                "error": str(e)
+            }
+        finally:
+            chat_admission.release(admitted_at)
+        message_id = str(uuid.uuid4())
+        if writer is not None and result["response"] is not None:
+            await writer.enqueue(conversation_document(message_id, request, result))
+        outcome = "error" if "error" in result else "cached" if result.get("cached") else "ok"
+        counts[outcome] += 1
+        persona_counts[result["persona_used"]] += 1
+        BATCH_ROWS.inc(result=outcome)
+        return {
+            "type": "result",
+            "line": row.line,
+            "session_id": request.session_id,
+            "message_id": message_id,
+            "response": result["response"],
+            "persona_used": result["persona_used"],
+            "persona_name": result["persona_name"],
+            "error": result.get("error")
+        }
+
+    answers = run_groups(group_rows(valid), run_row, concurrency)
+    try:
+        for row in rows:
+            if row.request is None:
+                counts["invalid"] += 1
+                BATCH_ROWS.inc(result="invalid")
+                yield {"type": "result", "line": row.line, "error": row.error}
+        async for result in answers:
+            yield result
+    finally:
+        # If the client went away mid-batch, stop answering but keep what was generated
+        await answers.aclose()
+        if writer is not None:
+            await writer.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "type": "summary",
+        "rows": len(rows),
+        "succeeded": counts["ok"] + counts["cached"],
+        "cached": counts["cached"],
+        "failed": counts["error"] + counts["invalid"],
+        "invalid": counts["invalid"],
+        "stored": writer.stats["written"] if writer is not None else 0,
+        "personas": dict(persona_counts),
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(len(rows) / elapsed, 1) if elapsed > 0 else None
+    }
+    logger.info("Batch finished", extra={key: value for key, value in summary.items() if key != "type"})
+    yield summary
+
+@app.post("/api/chat/batch")
+async def chat_batch(http_request: Request, concurrency: Optional[int] = Query(None, ge=1, le=LLM_MAX_CONCURRENCY),
+                     x_batch_key: Optional[str] = Header(None)):
+    """Batch chat for evaluation and back-fills.
+
+    The body is JSONL, one {"session_id", "message", "persona_preference"}
+    object per line (at most BATCH_MAX_ROWS). The response streams NDJSON:
+    a "result" line per input row, tagged with its `line` number and in
+    completion order, then a "summary" line with counts and rows per second.
+    Callers authenticate with the BATCH_API_KEY in an X-Batch-Key header;
+    without one configured the endpoint is off. Rows skip per-request rate
+    limits but go through the admission queue behind all live chat.
+    """
+    if not BATCH_API_KEY:
+        raise HTTPException(status_code=404, detail="Batch chat is disabled; set BATCH_API_KEY to enable it")
+    if not x_batch_key or not hmac.compare_digest(x_batch_key.encode(), BATCH_API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Batch-Key")
+    try:
+        lines = (await http_request.body()).decode("utf-8").splitlines()
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Batch body must be UTF-8 JSONL")
+    rows = parse_batch(lines)
+    if not rows:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(rows) > BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch has {len(rows)} rows; at most {BATCH_MAX_ROWS} are accepted")
+    await ensure_llm_client()
+    if groq_client is None:
+        raise HTTPException(status_code=503, detail="AI service is currently unavailable")
+
+    async def results():
+        async for item in run_batch(rows, concurrency or BATCH_CONCURRENCY):
+            yield json.dumps(item, default=str) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+async def synthesize_sentence(text: str) -> bytes:
+    """Speech for one reply sentence, or b"" if synthesis fails"""
+    try:
+        with chat_stage("tts"):
+            return await asyncio.to_thread(speech_synthesizer.synthesize, text)
+    except Exception as e:
+        logger.warning("Speech synthesis failed: %s", e, extra={"error_type": type(e).__name__})
+        CHAT_ERRORS.inc(stage="tts", type=type(e).__name__)
+        return b""
+
+async def run_voice_turn(websocket: WebSocket, request: ConversationRequest):
+    """Answer one transcribed utterance: chat events as JSON, each sentence's speech as binary.
+
+    Sentences are synthesized as soon as the LLM completes them, while later
+    ones are still being generated; a single sender keeps the messages in
+    order.
+    """
+    outbox: asyncio.Queue = asyncio.Queue()
+
+    async def send_in_order():
+        while (item := await outbox.get()) is not None:
+            if isinstance(item, dict):
+                await websocket.send_json(item)
+                continue
+            pcm = await item
+            if pcm:
+                await websocket.send_json({"type": "audio", "bytes": len(pcm), "sample_rate": speech_synthesizer.sample_rate})
+                await websocket.send_bytes(pcm)
+
+    sender = asyncio.create_task(send_in_order())
+    try:
+        message_id = str(uuid.uuid4())
+        async for event in Saarthi_system.stream_response(
+            message=request.message,
+            session_id=request.session_id,
+            persona_preference=request.persona_preference
+        ):
+            if event["type"] == "done":
+                await store_conversation(message_id, request, event)
+                log_turn(message_id, event)
+                outbox.put_nowait({
+                    "type": "done",
+                    "response": event["response"],
+                    "persona_used": event["persona_name"],
+                    "session_id": request.session_id,
+                    "message_id": message_id
+                })
+            elif event["type"] == "chunk":
+                outbox.put_nowait({"type": "chunk", "text": event["text"]})
+                if speech_synthesizer is not None:
+                    outbox.put_nowait(asyncio.ensure_future(synthesize_sentence(event["text"])))
+            else:
+                outbox.put_nowait({"type": "persona", "persona_used": event["persona_name"]})
+    finally:
+        outbox.put_nowait(None)
+        await sender
+
+@app.websocket("/api/voice")
+async def voice_chat(websocket: WebSocket):
+    """Voice conversation over a WebSocket.
+
+    The client opens with a JSON "start" message (session_id, optional
+    persona_preference, encoding "pcm16" or "opus", sample_rate), then
+    streams audio as binary messages: 16-bit little-endian mono PCM, or one
+    Opus packet per message. Partial transcripts come back as "partial"
+    events. After VOICE_SILENCE_MS of silence, or a JSON {"type": "end"},
+    the "transcript" goes through the same pipeline as /api/chat/stream,
+    and the reply streams back as "persona", "chunk" and "done" events.
+    With speech synthesis enabled, each "chunk" is followed by an "audio"
+    event and a binary message with that sentence's PCM.
+    """
+    await websocket.accept()
+    await ensure_voice_models()
+    if speech_recognizer is None:
+        await websocket.send_json({"type": "error", "detail": "Server-side speech recognition is not enabled"})
+        await websocket.close(code=1011)
+        return
+    try:
+        start = VoiceStart(**await websocket.receive_json())
+        decoder = OpusDecoder(start.sample_rate) if start.encoding == "opus" else None
+    except (ValidationError, ValueError, TypeError, ImportError) as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1008)
+        return
+    except WebSocketDisconnect:
+        return
+    bind(session_id=start.session_id)
+    voice_input = VoiceInput(
+        speech_recognizer,
+        EndpointDetector(start.sample_rate, threshold=VOICE_ENERGY_THRESHOLD, silence_ms=VOICE_SILENCE_MS),
+        start.sample_rate,
+        buffer_seconds=VOICE_BUFFER_SECONDS,
+        on_finish=lambda seconds: observe_stage("stt", seconds)
+    )
+    await websocket.send_json({
+        "type": "ready",
+        "sample_rate": start.sample_rate,
+        "tts_sample_rate": speech_synthesizer.sample_rate if speech_synthesizer is not None else None
+    })
+
+    async def receive_audio():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                try:
+                    if message.get("bytes") is not None:
+                        voice_input.write(decoder.decode(message["bytes"]) if decoder is not None else message["bytes"])
+                    elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                        voice_input.end()
+                except (ValueError, AttributeError) as e:
+                    # A corrupt packet or malformed control message is dropped, not fatal
+                    await websocket.send_json({"type": "error", "detail": f"Ignored invalid message: {e}"})
+        finally:
+            voice_input.close()
+
+    async def send_partial(text: str):
+        await websocket.send_json({"type": "partial", "text": text})
+
+    receiver = asyncio.create_task(receive_audio())
+    try:
+        while (transcript := await voice_input.next_utterance(send_partial)) is not None:
+            if not transcript.strip():
+                continue
+            await websocket.send_json({"type": "transcript", "text": transcript})
+            request = ConversationRequest(
+                message=transcript,
+                session_id=start.session_id,
+                persona_preference=start.persona_preference
+            )
+            try:
+                await check_rate_limits(request, websocket)
+                release = await admit_chat(request)
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "status": e.status_code, "detail": e.detail,
+                                           "retry_after": int((e.headers or {}).get("Retry-After", 1))})
+                continue
+            try:
+                await run_voice_turn(websocket, request)
+            finally:
+                release()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.exception("Error in voice endpoint")
+        CHAT_ERRORS.inc(stage="voice", type=type(e).__name__)
+    finally:
+        receiver.cancel()
+        logger.info("Voice session closed", extra={"dropped_audio_bytes": voice_input.audio.dropped})
+
 @app.get("/api/personas")
 async def get_personas():
     """Get available personas"""
@@ -356,9 +1917,46 @@ async def get_personas():
         }
     return personas_info
 
+def persona_names() -> Dict[str, str]:
+    """Display name per persona key, for conversation documents stored without one"""
+    return {key: persona.name for key, persona in Saarthi_system.personas.items()}
+
+def conversation_to_json(doc: Dict) -> str:
+    """Serialize one conversation document as an NDJSON line"""
+    return json.dumps(doc, default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value)) + "\n"
+
+@app.post("/api/personas/reload")
+async def reload_persona_keywords():
+    """Reload persona keyword sets from PERSONA_KEYWORDS_FILE without a restart"""
+    if not PERSONA_KEYWORDS_FILE:
+        raise HTTPException(status_code=404, detail="PERSONA_KEYWORDS_FILE is not configured")
+    try:
+        Saarthi_system.reload_keywords(load_keyword_sets(PERSONA_KEYWORDS_FILE))
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not reload keywords: {str(e)}")
+    return {
+        key: persona.keywords for key, persona in Saarthi_system.personas.items()
+    }
+
 @app.get("/api/conversations/{session_id}")
-async def get_conversation_history(session_id: str):
-    """Get conversation history for a session"""
+async def get_conversation_history(
+    session_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=CONVERSATION_PAGE_MAX),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """Get conversation history for a session, oldest first.
+
+    Pages are keyset-paginated: pass `after=next_cursor` to continue forwards
+    or `before=prev_cursor` to go backwards. `fields` is a comma-separated
+    projection. `format=ndjson` streams every matching turn (or up to
+    `limit`) straight from the database cursor. Archived turns (see
+    CONVERSATION_ARCHIVE_DAYS) are read transparently: they always precede
+    the session's hot turns, so each page reads from one tier and then, if
+    it isn't full yet, the next.
+    """
     try:
         if not session_id.strip():
             raise HTTPException(status_code=400, detail="Session ID cannot be empty")
@@ -366,68 +1964,200 @@ async def get_conversation_history(session_id: str):
         if db is None:
             raise HTTPException(status_code=503, detail="Database service is currently unavailable")
         
-        conversations = list(db.conversations.find(
-            {"session_id": session_id},
-            {"_id": 0}
-        ).sort("timestamp", 1))
+        projection = None
+        requested = None
+        if fields:
+            requested = [field.strip() for field in fields.split(",") if field.strip()]
+            unknown = [field for field in requested if field not in CONVERSATION_FIELDS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}. Must be among: {list(CONVERSATION_FIELDS)}")
+            # timestamp and _id are always fetched so cursors can be built,
+            # persona_used so persona_name can be derived for compact documents
+            projection = {field: 1 for field in requested}
+            projection["timestamp"] = 1
+            if "persona_name" in projection:
+                projection["persona_used"] = 1
+        
+        query = {"session_id": session_id}
+        try:
+            filters = []
+            lower = upper = None
+            if after:
+                filters.append(keyset_filter(after, "$gt"))
+                lower = decode_cursor(after)
+            if before:
+                filters.append(keyset_filter(before, "$lt"))
+                upper = decode_cursor(before)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if filters:
+            query["$and"] = filters
+        
+        names = persona_names()
+        
+        def shape(doc: Dict) -> Dict:
+            expand_conversation(doc, names)
+            if requested is None:
+                doc.pop("_id", None)
+                return doc
+            return {field: doc[field] for field in requested if field in doc}
+        
+        async def read_turns(descending: bool, limit: Optional[int]) -> AsyncIterator[Dict]:
+            """Archived then hot turns within the cursor bounds (hot first when descending)"""
+            order = -1 if descending else 1
+            hot = db.conversations.find(query, projection).sort([("timestamp", order), ("_id", order)])
+            if limit:
+                hot = hot.limit(limit)
+            archived = archived_turns(db.conversation_archive, session_id, lower, upper, descending)
+            count = 0
+            try:
+                for tier in ((hot, archived) if descending else (archived, hot)):
+                    async for doc in tier:
+                        yield doc
+                        count += 1
+                        if limit and count >= limit:
+                            return
+            finally:
+                await archived.aclose()
+        
+        if format == "ndjson":
+            async def export():
+                async for doc in read_turns(False, limit):
+                    yield conversation_to_json(shape(doc))
+            
+            return StreamingResponse(export(), media_type="application/x-ndjson")
+        
+        limit = limit or CONVERSATION_PAGE_SIZE
+        # Going backwards reads newest-first, then flips the page
+        backwards = before is not None and after is None
+        # One extra document tells us whether another page exists
+        page = [doc async for doc in read_turns(backwards, limit + 1)]
+        has_more = len(page) > limit
+        page = page[:limit]
+        if backwards:
+            page.reverse()
         
+        # A `before` bound means newer turns exist; an `after` bound means older ones do
+        more_after = True if backwards else has_more
+        more_before = has_more if backwards else after is not None
+        next_cursor = encode_cursor(page[-1]) if page and more_after else None
+        prev_cursor = encode_cursor(page[0]) if page and more_before else None
+        
+        conversations = [shape(doc) for doc in page]
         return {
             "session_id": session_id,
             "conversations": conversations,
-            "count": len(conversations)
+            "count": len(conversations),
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor
         }
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        print(f"❌ Error fetching conversations: {e}")
+        logger.exception("Error fetching conversations")
         raise HTTPException(status_code=500, detail=f"Error fetching conversations: {str(e)}")
 
 @app.get("/api/sessions")
-async def get_all_sessions():
-    """Get all unique sessions"""
+async def get_all_sessions(
+    limit: int = Query(50, ge=1, le=500),
+    skip: int = Query(0, ge=0)
+):
+    """Get sessions, most recently active first"""
     try:
         if db is None:
             raise HTTPException(status_code=503, detail="Database service is currently unavailable")
         
-        # Get unique session IDs with their latest conversation
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$session_id",
-                    "last_message": {"$last": "$$ROOT"},
-                    "message_count": {"$sum": 1}
-                }
-            },
-            {
-                "$sort": {"last_message.timestamp": -1}
-            }
-        ]
-        
-        sessions = list(db.conversations.aggregate(pipeline))
+        # Served from the per-session summaries kept up to date on every write
+        sessions = await db.sessions.find({}).sort(
+            [("last_updated", -1), ("_id", 1)]
+        ).skip(skip).limit(limit).to_list(length=limit)
+        total_sessions = await db.sessions.estimated_document_count()
         
         # Format the response
         formatted_sessions = []
         for session in sessions:
             formatted_sessions.append({
                 "session_id": session["_id"],
-                "last_message": session["last_message"]["user_message"],
-                "last_response": session["last_message"]["ai_response"],
+                "last_message": session["last_message"],
+                "last_response": session["last_response"],
                 "message_count": session["message_count"],
-                "last_updated": session["last_message"]["timestamp"],
-                "persona_used": session["last_message"]["persona_used"]
+                "last_updated": session["last_updated"],
+                "persona_used": session["persona_used"]
             })
         
         return {
             "sessions": formatted_sessions,
-            "total_sessions": len(formatted_sessions)
+            "total_sessions": total_sessions,
+            "limit": limit,
+            "skip": skip,
+            "has_more": skip + len(formatted_sessions) < total_sessions
         }
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error fetching sessions: {e}")
+        logger.exception("Error fetching sessions")
         raise HTTPException(status_code=500, detail=f"Error fetching sessions: {str(e)}")
 
+@app.get("/api/search")
+async def search_conversations(
+    q: str = Query(..., max_length=500),
+    session_id: Optional[str] = None,
+    persona: Optional[str] = None,
+    mode: Optional[str] = Query(None, pattern="^(text|semantic|hybrid)$"),
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_RESULTS)
+):
+    """Search stored conversation turns, best match first.
+
+    `mode` is "text" (keyword ranking), "semantic" or "hybrid"; the last
+    two need SEARCH_SEMANTIC, and hybrid is the default when it is on.
+    Results can be narrowed to one session or persona and are paginated
+    with `offset`. With the memory index, "complete" is false while turns
+    stored before startup are still being indexed.
+    """
+    try:
+        if not q.strip():
+            raise HTTPException(status_code=400, detail="Query cannot be empty")
+        
+        if db is None:
+            raise HTTPException(status_code=503, detail="Database service is currently unavailable")
+        
+        if search_index is None:
+            raise HTTPException(status_code=404, detail="Conversation search is disabled (SEARCH_INDEX=off)")
+        
+        mode = mode or search_index.modes[-1]
+        if mode not in search_index.modes:
+            raise HTTPException(status_code=400, detail=f"Search mode '{mode}' needs SEARCH_SEMANTIC and SEARCH_INDEX=memory")
+        
+        start = time.perf_counter()
+        page = await search_index.search(q, mode, limit, offset, session_id, persona)
+        SEARCH_SECONDS.observe(time.perf_counter() - start, backend=search_index.name, mode=mode)
+        
+        names = persona_names()
+        results = []
+        for doc in page["results"]:
+            expand_conversation(doc, names)
+            doc["message_id"] = doc.pop("_id")
+            doc["score"] = round(doc["score"], 4)
+            results.append(doc)
+        return {
+            "query": q,
+            "mode": mode,
+            "results": results,
+            "count": len(results),
+            "total": page["total"],
+            "offset": offset,
+            "limit": limit,
+            "has_more": page["has_more"],
+            "complete": page["complete"]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error searching conversations")
+        raise HTTPException(status_code=500, detail=f"Error searching conversations: {str(e)}")
+
 @app.delete("/api/conversations/{session_id}")
 async def clear_conversation_history(session_id: str):
     """Clear conversation history for a specific session"""
@@ -438,22 +2168,35 @@ async def clear_conversation_history(session_id: str):
         if db is None:
             raise HTTPException(status_code=503, detail="Database service is currently unavailable")
         
-        # Delete all conversations for the session
-        result = db.conversations.delete_many({"session_id": session_id})
+        # Flush queued writes first so none of them land after the delete
+        await conversation_writer.flush()
+        
+        # Delete all conversations for the session, hot and archived
+        result = await db.conversations.delete_many({"session_id": session_id})
+        archived = await db.conversation_archive.find(
+            {"session_id": session_id}, {"count": 1}
+        ).to_list(length=None)
+        await db.conversation_archive.delete_many({"session_id": session_id})
+        deleted_count = result.deleted_count + sum(chunk["count"] for chunk in archived)
+        await db.sessions.delete_one({"_id": session_id})
+        if search_index is not None:
+            search_index.remove_session(session_id)
         
-        # Also clear from memory if it exists
-        if hasattr(Saarthi_system, 'conversation_history') and session_id in Saarthi_system.conversation_history:
-            del Saarthi_system.conversation_history[session_id]
+        # Also clear the session's LLM context
+        await Saarthi_system.history_store.clear(session_id)
+        Saarthi_system.context_builder.forget(session_id)
+        if Saarthi_system.summarizer is not None:
+            await Saarthi_system.summarizer.clear(session_id)
         
         return {
             "session_id": session_id,
-            "deleted_count": result.deleted_count,
-            "message": f"Successfully cleared {result.deleted_count} conversations for session {session_id}"
+            "deleted_count": deleted_count,
+            "message": f"Successfully cleared {deleted_count} conversations for session {session_id}"
         }
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error clearing conversations: {e}")
+        logger.exception("Error clearing conversations")
         raise HTTPException(status_code=500, detail=f"Error clearing conversations: {str(e)}")
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key starts `fn()` as its own task; callers that
+    arrive while it is running await the same task and get the same result
+    (or exception). The task is shielded, so a caller that disconnects
+    doesn't cancel the work the others are waiting for.
+    """
+
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    def __len__(self):
+        return len(self.calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]):
+        task = self.calls.get(key)
+        if task is not None:
+            self.stats["shared"] += 1
+        else:
+            self.stats["calls"] += 1
+            task = asyncio.ensure_future(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class SharedStream:
+    """One async iterator's events, read by any number of subscribers.
+
+    The iterator runs in a task of its own, so a subscriber that goes away
+    doesn't stop it for the others. Events are kept until it ends, so a
+    subscriber that joins late still gets every event from the first.
+    """
+
+    def __init__(self, events: AsyncIterator):
+        self.events: List[Any] = []
+        self.finished = False
+        self.error: Optional[Exception] = None
+        # Replaced on every change; subscribers wait on the one current when they ran out
+        self.changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self.run(events))
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    async def run(self, events: AsyncIterator):
+        try:
+            async for event in events:
+                self.events.append(event)
+                self.notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self.notify()
+
+    async def subscribe(self) -> AsyncIterator:
+        sent = 0
+        while True:
+            if sent < len(self.events):
+                yield self.events[sent]
+                sent += 1
+            elif self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self.changed.wait()
+
+
+class StreamFlight:
+    """SingleFlight for streams: concurrent callers with the same key read
+    one SharedStream instead of each starting their own.
+    """
+
+    def __init__(self):
+        self.streams: Dict[Hashable, SharedStream] = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    def __len__(self):
+        return len(self.streams)
+
+    def join(self, key: Hashable) -> Optional[SharedStream]:
+        """The stream in flight for `key`, if there is one"""
+        stream = self.streams.get(key)
+        if stream is not None:
+            self.stats["shared"] += 1
+        return stream
+
+    def start(self, key: Hashable, fn: Callable[[], AsyncIterator]) -> SharedStream:
+        """Run `fn()` as the stream for `key` until it ends"""
+        self.stats["calls"] += 1
+        stream = self.streams[key] = SharedStream(fn())
+        stream.task.add_done_callback(lambda _: self.streams.pop(key, None))
+        return stream
+
+
+class IdempotencyStore:
+    """Recent results by idempotency key (LRU with a TTL), so a retry that
+    arrives after the original request finished gets the same result
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, result); most recently used last
+        self.results: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.stats = {"replayed": 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self.results[key]
+            return None
+        self.results.move_to_end(key)
+        self.stats["replayed"] += 1
+        return entry[1]
+
+    def put(self, key: Hashable, result: Any):
+        self.results[key] = (time.monotonic() + self.ttl, result)
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
@@ -0,0 +1,45 @@
+import json
+import re
+from typing import Dict, List
+
+# A sentence ends at ., ! or ? (optionally followed by closing quotes/brackets)
+# and is followed by whitespace, or at a newline.
+SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n+')
+
+
+class SentenceChunker:
+    """Accumulates streamed tokens and releases complete sentences"""
+
+    def __init__(self, min_chars: int = 20):
+        # Very short fragments ("Hi!", "1.") sound choppy when spoken on
+        # their own, so they are merged into the following sentence.
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, token: str) -> List[str]:
+        """Add a token and return any sentences that are now complete"""
+        if not token:
+            return []
+        self.buffer += token
+
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            end = match.end()
+            candidate = self.buffer[start:end].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = end
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever is left once the stream has finished"""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return [remainder] if remainder else []
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,199 @@
+import asyncio
+import contextvars
+import logging
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("saarthi.summarizer")
+
+Exchange = Tuple[str, str]
+
+# What a session with no summary yet looks like
+EMPTY_SUMMARY = {"summary": "", "through": None}
+
+
+def fingerprint(exchange: Exchange) -> str:
+    """Stable id for a (user, assistant) exchange, identical across workers"""
+    return format(zlib.crc32("\0".join(exchange).encode()), "08x")
+
+
+def pair_exchanges(messages: List[str]) -> List[Exchange]:
+    return [(messages[i], messages[i + 1]) for i in range(0, len(messages) - 1, 2)]
+
+
+def unfolded(evicted: List[str], record: Dict) -> List[Exchange]:
+    """Evicted exchanges that come after the last one folded into `record`"""
+    exchanges = pair_exchanges(evicted)
+    through = record.get("through")
+    if through is None:
+        return exchanges
+    # Search from the newest end: the folded exchange is usually near the end
+    for i in range(len(exchanges) - 1, -1, -1):
+        if fingerprint(exchanges[i]) == through:
+            return exchanges[i + 1:]
+    # The folded exchange has left the history, so everything evicted is newer
+    return exchanges
+
+
+class MemorySummaryStore:
+    """Per-process running summaries, capped at `max_sessions` (LRU)"""
+
+    name = "memory"
+
+    def __init__(self, max_sessions: int = 10000):
+        self.max_sessions = max_sessions
+        self.records: "OrderedDict[str, Dict]" = OrderedDict()
+
+    async def get(self, session_id: str) -> Dict:
+        record = self.records.get(session_id)
+        if record is None:
+            return EMPTY_SUMMARY
+        self.records.move_to_end(session_id)
+        return record
+
+    async def put(self, session_id: str, summary: str, through: str):
+        self.records[session_id] = {"summary": summary, "through": through}
+        self.records.move_to_end(session_id)
+        while len(self.records) > self.max_sessions:
+            self.records.popitem(last=False)
+
+    async def clear(self, session_id: str):
+        self.records.pop(session_id, None)
+
+
+class MongoSummaryStore:
+    """Running summaries kept on the session's document in `sessions`.
+
+    Only existing session documents are updated, so a summary never creates
+    a half-filled session entry; deleting the session deletes its summary.
+    """
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, session_id: str) -> Dict:
+        doc = await self.collection.find_one(
+            {"_id": session_id}, {"summary": 1, "summary_through": 1}
+        )
+        if doc is None or "summary" not in doc:
+            return EMPTY_SUMMARY
+        return {"summary": doc["summary"], "through": doc.get("summary_through")}
+
+    async def put(self, session_id: str, summary: str, through: str):
+        await self.collection.update_one(
+            {"_id": session_id},
+            {"$set": {
+                "summary": summary,
+                "summary_through": through,
+                "summary_updated_at": datetime.utcnow()
+            }}
+        )
+
+    async def clear(self, session_id: str):
+        await self.collection.update_one(
+            {"_id": session_id},
+            {"$unset": {"summary": "", "summary_through": "", "summary_updated_at": ""}}
+        )
+
+
+class RollingSummarizer:
+    """Folds turns that fell out of the context window into a running
+    per-session summary, in the background.
+
+    The request path only calls schedule(), which records the session's
+    evicted messages (newer calls replace older ones). Every `interval`
+    seconds a background task takes up to `batch_size` sessions, oldest
+    first, and folds each one's new exchanges into its summary with a single
+    `summarize(previous_summary, exchanges)` call, at most `concurrency` at
+    a time. While `is_busy()` is true (live chat is using every LLM slot)
+    the batch is deferred to the next tick.
+    """
+
+    def __init__(self, store, summarize: Callable[[str, List[Exchange]], Awaitable[str]],
+                 batch_size: int = 8, interval: float = 1.0, concurrency: int = 2,
+                 is_busy: Optional[Callable[[], bool]] = None):
+        self.store = store
+        self.summarize = summarize
+        self.batch_size = batch_size
+        self.interval = interval
+        self.concurrency = concurrency
+        self.is_busy = is_busy
+        # session_id -> evicted messages waiting to be folded; oldest first
+        self.pending: "OrderedDict[str, List[str]]" = OrderedDict()
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.stats = {"scheduled": 0, "summarized": 0, "exchanges": 0, "deferred": 0, "failed": 0}
+
+    def start(self):
+        """Start the background task (called at startup, or lazily on first schedule)"""
+        if self.task is None or self.task.done():
+            if self.wakeup is None:
+                self.wakeup = asyncio.Event()
+            # In a fresh context, or its records would carry the fields of the request that started it
+            self.task = contextvars.Context().run(asyncio.create_task, self.run())
+
+    async def get(self, session_id: str) -> Dict:
+        return await self.store.get(session_id)
+
+    def schedule(self, session_id: str, evicted: List[str], record: Dict = EMPTY_SUMMARY):
+        """Queue `evicted` for folding if it holds exchanges `record` doesn't cover yet"""
+        if not unfolded(evicted, record):
+            return
+        self.start()
+        self.pending.pop(session_id, None)
+        self.pending[session_id] = evicted
+        self.stats["scheduled"] += 1
+        self.wakeup.set()
+
+    async def run(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(session_id, evicted):
+            async with semaphore:
+                await self.fold(session_id, evicted)
+
+        while True:
+            await self.wakeup.wait()
+            # At most one batch per interval, so summaries trail live traffic
+            await asyncio.sleep(self.interval)
+            if self.is_busy is not None and self.is_busy():
+                self.stats["deferred"] += 1
+                continue
+            batch = []
+            while self.pending and len(batch) < self.batch_size:
+                batch.append(self.pending.popitem(last=False))
+            if not self.pending:
+                self.wakeup.clear()
+            await asyncio.gather(*(limited(session_id, evicted) for session_id, evicted in batch))
+
+    async def fold(self, session_id: str, evicted: List[str]):
+        try:
+            record = await self.store.get(session_id)
+            exchanges = unfolded(evicted, record)
+            if not exchanges:
+                return
+            summary = await self.summarize(record["summary"], exchanges)
+            await self.store.put(session_id, summary, fingerprint(exchanges[-1]))
+            self.stats["summarized"] += 1
+            self.stats["exchanges"] += len(exchanges)
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning("Failed to summarize session %s: %s", session_id, e)
+
+    async def clear(self, session_id: str):
+        self.pending.pop(session_id, None)
+        await self.store.clear(session_id)
+
+    async def close(self):
+        """Stop the background task; pending summaries are dropped (called on shutdown)"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
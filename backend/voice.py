@@ -0,0 +1,312 @@
+import asyncio
+import json
+import time
+from typing import Awaitable, Callable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    # Frame energy falls back to a pure-Python sum over the samples
+    np = None
+
+# 16-bit signed little-endian mono PCM throughout
+SAMPLE_WIDTH = 2
+# The only rates an Opus decoder can output
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+class AudioRingBuffer:
+    """Fixed-size FIFO of audio bytes in one preallocated bytearray.
+
+    The WebSocket receiver writes incoming chunks and the recognizer reads
+    them back as memoryviews of the buffer itself, so audio is copied once
+    on the way in and never again. Data handed out by peek() stays valid
+    until it is consume()d: a write that doesn't fit in the free space is
+    truncated (and counted in `dropped`) rather than overwriting it.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.size = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.size
+
+    def write(self, data) -> int:
+        """Append as much of `data` (any bytes-like object) as fits; returns bytes written"""
+        data = memoryview(data).cast("B")
+        count = min(len(data), self.capacity - self.size)
+        self.dropped += len(data) - count
+        end = (self.start + self.size) % self.capacity
+        first = min(count, self.capacity - end)
+        self.view[end:end + first] = data[:first]
+        if count > first:
+            self.view[:count - first] = data[first:count]
+        self.size += count
+        return count
+
+    def peek(self, limit: int) -> memoryview:
+        """Up to `limit` of the oldest bytes, without copying.
+
+        Only the contiguous run up to the end of the buffer is returned; the
+        wrapped-around rest comes back from the next call after consume().
+        """
+        count = min(limit, self.size, self.capacity - self.start)
+        return self.view[self.start:self.start + count]
+
+    def consume(self, count: int):
+        """Release the oldest `count` bytes"""
+        count = min(count, self.size)
+        self.start = (self.start + count) % self.capacity
+        self.size -= count
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+
+def mean_square(pcm: memoryview) -> float:
+    """Mean squared amplitude of 16-bit PCM samples"""
+    if len(pcm) < SAMPLE_WIDTH:
+        return 0.0
+    pcm = pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH]
+    if np is not None:
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+        return float(np.dot(samples, samples)) / len(samples)
+    samples = pcm.cast("h")
+    return sum(sample * sample for sample in samples) / len(samples)
+
+
+class EndpointDetector:
+    """Energy-based end-of-speech detection.
+
+    Audio is judged in `frame_ms` frames: a frame whose RMS amplitude
+    reaches `threshold` is speech. An utterance ends once speech has been
+    heard and is followed by `silence_ms` of non-speech frames.
+    """
+
+    def __init__(self, sample_rate: int = 16000, threshold: float = 500, silence_ms: int = 600, frame_ms: int = 20):
+        self.frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+        self.threshold_squared = threshold * threshold
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.reset()
+
+    def reset(self):
+        self.heard_speech = False
+        self.silent = 0
+
+    def feed(self, pcm: memoryview) -> bool:
+        """Judge the complete frames in `pcm`; True once the utterance has ended.
+
+        Callers should pass whole frames; a trailing partial frame is judged
+        on its own.
+        """
+        for offset in range(0, len(pcm), self.frame_bytes):
+            if mean_square(pcm[offset:offset + self.frame_bytes]) >= self.threshold_squared:
+                self.heard_speech = True
+                self.silent = 0
+            elif self.heard_speech:
+                self.silent += 1
+        return self.heard_speech and self.silent >= self.silence_frames
+
+
+class RecognitionStream:
+    """Incremental speech-to-text for one utterance"""
+
+    def accept(self, pcm: memoryview) -> Optional[str]:
+        """Feed audio; returns the updated partial transcript, if it changed"""
+        raise NotImplementedError
+
+    def finish(self) -> str:
+        """Final transcript of everything accepted"""
+        raise NotImplementedError
+
+
+class SpeechRecognizer:
+    """Loads a speech-to-text model once and opens a RecognitionStream per
+    utterance. Both run on worker threads, so implementations may block.
+    """
+
+    name = "base"
+
+    def stream(self, sample_rate: int) -> RecognitionStream:
+        raise NotImplementedError
+
+
+class VoskStream(RecognitionStream):
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.segments: List[str] = []
+        self.partial = ""
+
+    def accept(self, pcm: memoryview) -> Optional[str]:
+        # The cffi binding takes bytes, so this is the one copy out of the ring buffer
+        if self.recognizer.AcceptWaveform(bytes(pcm)):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            if text:
+                self.segments.append(text)
+            partial = ""
+        else:
+            partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        current = " ".join(self.segments + ([partial] if partial else []))
+        if current == self.partial:
+            return None
+        self.partial = current
+        return current
+
+    def finish(self) -> str:
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        return " ".join(self.segments + ([text] if text else []))
+
+
+class VoskRecognizer(SpeechRecognizer):
+    """Offline streaming recognition on the CPU with a Vosk/Kaldi model (optional dependency)"""
+
+    name = "vosk"
+
+    def __init__(self, model_path: str):
+        from vosk import KaldiRecognizer, Model, SetLogLevel
+        SetLogLevel(-1)
+        self.model = Model(model_path)
+        self.recognizer_class = KaldiRecognizer
+
+    def stream(self, sample_rate: int) -> RecognitionStream:
+        return VoskStream(self.recognizer_class(self.model, sample_rate))
+
+
+class VoiceInput:
+    """Incoming audio of one voice connection, split into utterances.
+
+    The receiver write()s audio as it arrives; next_utterance() feeds the
+    buffered audio, chunk by chunk and straight from the ring buffer, to
+    the endpoint detector and to an incremental recognition stream on a
+    worker thread. Audio that arrives while an earlier utterance is being
+    answered waits in the buffer (up to `buffer_seconds`).
+    """
+
+    def __init__(self, recognizer: SpeechRecognizer, detector: EndpointDetector, sample_rate: int = 16000,
+                 buffer_seconds: float = 10.0, chunk_frames: int = 5,
+                 on_finish: Optional[Callable[[float], None]] = None):
+        self.recognizer = recognizer
+        self.detector = detector
+        self.sample_rate = sample_rate
+        frame = detector.frame_bytes
+        # Whole frames, so reads from the ring buffer stay frame-aligned when it wraps
+        self.audio = AudioRingBuffer(max(1, int(sample_rate * buffer_seconds * SAMPLE_WIDTH) // frame) * frame)
+        self.chunk_bytes = chunk_frames * frame
+        self.on_finish = on_finish
+        self.stream: Optional[RecognitionStream] = None
+        self.arrived = asyncio.Event()
+        self.end_requested = False
+        self.closed = False
+
+    def write(self, pcm):
+        self.audio.write(pcm)
+        self.arrived.set()
+
+    def end(self):
+        """The client signalled the end of the utterance"""
+        self.end_requested = True
+        self.arrived.set()
+
+    def close(self):
+        self.closed = True
+        self.arrived.set()
+
+    async def finish(self) -> str:
+        stream, self.stream = self.stream, None
+        self.detector.reset()
+        if stream is None:
+            return ""
+        start = time.perf_counter()
+        text = await asyncio.to_thread(stream.finish)
+        if self.on_finish is not None:
+            self.on_finish(time.perf_counter() - start)
+        return text
+
+    async def next_utterance(self, on_partial: Callable[[str], Awaitable[None]]) -> Optional[str]:
+        """Transcribe buffered audio until an utterance ends and return its
+        transcript (possibly empty), or None once the connection has closed
+        """
+        frame = self.detector.frame_bytes
+        while True:
+            while len(self.audio) >= frame or (self.end_requested and len(self.audio)):
+                available = len(self.audio) if self.end_requested else len(self.audio) - len(self.audio) % frame
+                chunk = self.audio.peek(min(available, self.chunk_bytes))
+                ended = self.detector.feed(chunk)
+                if self.stream is None:
+                    self.stream = self.recognizer.stream(self.sample_rate)
+                # The view stays valid while the recognizer reads it: writes never touch unconsumed bytes
+                partial = await asyncio.to_thread(self.stream.accept, chunk)
+                self.audio.consume(len(chunk))
+                chunk.release()
+                if partial:
+                    await on_partial(partial)
+                if ended:
+                    return await self.finish()
+            if self.end_requested:
+                self.end_requested = False
+                if self.stream is not None:
+                    return await self.finish()
+            if self.closed:
+                return None
+            self.arrived.clear()
+            await self.arrived.wait()
+
+
+class SpeechSynthesizer:
+    """Text-to-speech producing 16-bit mono PCM at `sample_rate`. Called on
+    worker threads, one sentence at a time.
+    """
+
+    name = "base"
+    sample_rate = 16000
+
+    def synthesize(self, text: str) -> bytes:
+        raise NotImplementedError
+
+
+class PiperSynthesizer(SpeechSynthesizer):
+    """Local neural TTS on the CPU with a Piper ONNX voice (optional dependency)"""
+
+    name = "piper"
+
+    def __init__(self, model_path: str):
+        from piper import PiperVoice
+        self.voice = PiperVoice.load(model_path)
+        self.sample_rate = self.voice.config.sample_rate
+
+    def synthesize(self, text: str) -> bytes:
+        if hasattr(self.voice, "synthesize_stream_raw"):
+            return b"".join(self.voice.synthesize_stream_raw(text))
+        # piper-tts >= 1.3 yields AudioChunk objects instead
+        return b"".join(chunk.audio_int16_bytes for chunk in self.voice.synthesize(text))
+
+
+class OpusDecoder:
+    """Decodes one Opus packet per WebSocket message to PCM via opuslib (optional dependency).
+
+    Unsupported sample rates and corrupt packets raise ValueError.
+    """
+
+    def __init__(self, sample_rate: int):
+        import opuslib
+        if sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"Opus audio must be sampled at one of {OPUS_SAMPLE_RATES} Hz")
+        self.error = opuslib.OpusError
+        try:
+            self.decoder = opuslib.Decoder(sample_rate, 1)
+        except self.error as e:
+            raise ValueError(f"Could not create an Opus decoder: {e}") from e
+        # Largest Opus frame is 120 ms
+        self.max_frame = sample_rate * 120 // 1000
+
+    def decode(self, packet: bytes) -> bytes:
+        try:
+            return self.decoder.decode(packet, self.max_frame)
+        except self.error as e:
+            raise ValueError(f"Invalid Opus packet: {e}") from e
@@ -0,0 +1,82 @@
+"""
+Overload behaviour of /api/chat under a burst, against a local stub LLM.
+
+Fires `--requests` chat turns at once (a `--mental-health-share` of them
+phrased so they route to the mental_health persona) at a backend whose
+admission controller allows CHAT_MAX_CONCURRENT turns and CHAT_MAX_QUEUE
+waiters. Reports how many were served and shed per class, and latency
+percentiles: refused requests should come back almost immediately with a
+429, and mental_health requests should be served ahead of general ones.
+
+    python -m benchmarks.bench_admission --latency 0.25 --requests 500 --max-concurrent 16 --max-queue 64
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from benchmarks.utils import free_port, percentile, start_backend, start_fake_llm, stop
+
+
+async def fire(base_url: str, total: int, mental_health_share: float, seed: int):
+    rng = random.Random(seed)
+    kinds = ["mental_health" if rng.random() < mental_health_share else "general" for _ in range(total)]
+
+    async def one(client, index, kind):
+        message = "I feel anxious and overwhelmed" if kind == "mental_health" else "tell me a fun fact"
+        start = time.perf_counter()
+        response = await client.post("/api/chat", json={
+            "message": f"{message} ({index})",
+            "session_id": f"burst-{index}",
+        })
+        return kind, response.status_code, time.perf_counter() - start
+
+    limits = httpx.Limits(max_connections=total, max_keepalive_connections=total)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        return await asyncio.gather(*[one(client, i, kind) for i, kind in enumerate(kinds)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.25, help="Stub LLM latency in seconds")
+    parser.add_argument("--requests", type=int, default=500, help="Requests in the burst")
+    parser.add_argument("--mental-health-share", type=float, default=0.1)
+    parser.add_argument("--max-concurrent", type=int, default=16, help="CHAT_MAX_CONCURRENT for the backend")
+    parser.add_argument("--max-queue", type=int, default=64, help="CHAT_MAX_QUEUE for the backend")
+    parser.add_argument("--queue-timeout", type=float, default=10.0, help="CHAT_QUEUE_TIMEOUT for the backend")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    llm_port, api_port = free_port(), free_port()
+    llm = backend = None
+    try:
+        llm = start_fake_llm(llm_port, args.latency)
+        backend = start_backend(api_port, llm_port, {
+            "CHAT_MAX_CONCURRENT": str(args.max_concurrent),
+            "CHAT_MAX_QUEUE": str(args.max_queue),
+            "CHAT_QUEUE_TIMEOUT": str(args.queue_timeout),
+            # Every request comes from 127.0.0.1, so only the global limits apply
+            "CHAT_RATE_PER_IP": "0",
+        })
+        base_url = f"http://127.0.0.1:{api_port}"
+
+        results = asyncio.run(fire(base_url, args.requests, args.mental_health_share, args.seed))
+
+        print(f"Burst of {args.requests} requests, {args.max_concurrent} concurrent + {args.max_queue} queued, "
+              f"stub LLM latency {args.latency:.3f}s")
+        print(f"{'class':>14} {'status':>6} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for kind in ("mental_health", "general"):
+            for status in sorted({status for k, status, _ in results if k == kind}):
+                latencies = [elapsed for k, s, elapsed in results if k == kind and s == status]
+                print(f"{kind:>14} {status:>6} {len(latencies):>6} "
+                      f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+                      f"{max(latencies) * 1000:>8.1f}")
+        print(httpx.get(f"{base_url}/api/health").json()["admission"])
+    finally:
+        stop(backend, llm)
+
+
+if __name__ == "__main__":
+    main()
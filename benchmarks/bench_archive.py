@@ -0,0 +1,183 @@
+"""
+Conversation storage size and history query latency, before and after archival.
+
+Seeds a scratch database with N full-format conversations (persona_name and
+a null error on every turn, as written before compact documents) spread
+over M sessions and 90 days. It then measures collection size and
+/api/conversations latency (the first page, a page deep into the
+history, and a full NDJSON export) for a sample of sessions. After that it
+archives every turn older than --archive-days into compressed per-session
+chunks and measures again.
+
+Needs a real mongod for storage numbers (collStats); with --standin it runs
+on mongomock-motor and reports the BSON size of the documents instead.
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_archive --conversations 500000
+    python -m benchmarks.bench_archive --standin --conversations 20000 --sessions 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import bson
+import httpx
+
+from benchmarks.utils import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+import server  # noqa: E402
+from archive import archive_conversations, ensure_archive_indexes  # noqa: E402
+from persistence import ensure_indexes  # noqa: E402
+
+REPLIES = (
+    "Here are a few things that can help when exams feel overwhelming. Start with a realistic plan, "
+    "break the syllabus into small pieces, and schedule short breaks. Sleep matters more than one more hour of revision.",
+    "Photosynthesis is how plants turn light, water and carbon dioxide into sugar and oxygen. "
+    "The light reactions happen in the thylakoids and the Calvin cycle in the stroma.",
+    "That sounds like a lovely plan for the weekend. If the weather holds, a short hike followed by a picnic "
+    "is a great way to recharge. Would you like a few trail suggestions nearby?",
+)
+NAMES = {"general": "General Assistant", "education": "Education Specialist", "mental_health": "Mental Health Support"}
+
+
+async def seed(db, conversations, sessions, batch_size=10000):
+    session_ids = [f"bench-{uuid.uuid4().hex[:12]}" for _ in range(sessions)]
+    start = datetime.utcnow() - timedelta(days=90)
+    step = timedelta(days=90) / conversations
+    written = 0
+    while written < conversations:
+        batch = []
+        for i in range(min(batch_size, conversations - written)):
+            persona = random.choice(list(NAMES))
+            batch.append({
+                "_id": str(uuid.uuid4()),
+                "session_id": random.choice(session_ids),
+                "user_message": f"Can you help me with question number {written + i}?",
+                "ai_response": random.choice(REPLIES),
+                "persona_used": persona,
+                "persona_name": NAMES[persona],
+                "timestamp": start + step * (written + i),
+                "error": None
+            })
+        await db.conversations.insert_many(batch, ordered=False)
+        written += len(batch)
+        print(f"  seeded {written}/{conversations}", end="\r")
+    print()
+    return session_ids
+
+
+async def storage(db, standin):
+    """Data and index bytes per collection"""
+    sizes = {}
+    for name in ("conversations", "conversation_archive"):
+        if standin:
+            docs = await db[name].find({}).to_list(None)
+            sizes[name] = (sum(len(bson.encode(doc)) for doc in docs), 0, len(docs))
+        else:
+            stats = await db.command("collStats", name)
+            sizes[name] = (stats.get("storageSize", 0), stats.get("totalIndexSize", 0), stats.get("count", 0))
+    return sizes
+
+
+async def time_history(sessions, runs):
+    """Median latency of the first page, a page 200 turns in, and a full export"""
+    transport = httpx.ASGITransport(app=server.app)
+    samples = {"first page": [], "deep page": [], "full export": []}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for _ in range(runs):
+            for session_id in sessions:
+                url = f"/api/conversations/{session_id}"
+                start = time.perf_counter()
+                page = (await client.get(url, params={"limit": 50})).json()
+                samples["first page"].append(time.perf_counter() - start)
+                # Walk 200 turns in, then time the next page
+                for _ in range(4):
+                    if not page["next_cursor"]:
+                        break
+                    page = (await client.get(url, params={"limit": 50, "after": page["next_cursor"]})).json()
+                if page["next_cursor"]:
+                    start = time.perf_counter()
+                    await client.get(url, params={"limit": 50, "after": page["next_cursor"]})
+                    samples["deep page"].append(time.perf_counter() - start)
+                start = time.perf_counter()
+                await client.get(url, params={"format": "ndjson"})
+                samples["full export"].append(time.perf_counter() - start)
+    return {label: statistics.median(values) * 1000 if values else 0.0 for label, values in samples.items()}
+
+
+def report(label, sizes, latencies):
+    print(f"\n{label}")
+    for name, (data, index, count) in sizes.items():
+        print(f"  {name:<22} {count:>9} docs {data / 1e6:>9.2f} MB data {index / 1e6:>8.2f} MB indexes")
+    total = sum(data + index for data, index, _ in sizes.values())
+    print(f"  {'total':<22} {'':>14} {total / 1e6:>9.2f} MB")
+    for name, ms in latencies.items():
+        print(f"  {name:<22} median {ms:>8.2f} ms")
+    return total
+
+
+async def run(args):
+    if args.standin:
+        import mongomock_motor
+        client = mongomock_motor.AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_url)
+        await client.drop_database(args.database)
+    db = client[args.database]
+    server.db = db
+    try:
+        print(f"Seeding {args.conversations} conversations over {args.sessions} sessions...")
+        session_ids = await seed(db, args.conversations, args.sessions)
+        await ensure_indexes(db)
+        await ensure_archive_indexes(db.conversation_archive)
+        sample = random.sample(session_ids, min(args.sample, len(session_ids)))
+
+        before = report("Before (all turns hot, full documents)", await storage(db, args.standin),
+                        await time_history(sample, args.runs))
+
+        start = time.perf_counter()
+        stats = await archive_conversations(db.conversations, db.conversation_archive,
+                                            datetime.utcnow() - timedelta(days=args.archive_days),
+                                            chunk_turns=args.chunk_turns)
+        print(f"\nArchived {stats['turns']} turns into {stats['chunks']} chunks "
+              f"({stats['bytes'] / 1e6:.2f} MB compressed) in {time.perf_counter() - start:.1f}s")
+
+        after = report(f"After (turns older than {args.archive_days:g} days archived)", await storage(db, args.standin),
+                       await time_history(sample, args.runs))
+        print(f"\nStorage: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({after / before:.0%})")
+
+        legacy = {"_id": str(uuid.uuid4()), "session_id": "bench-0123456789ab", "user_message": "Hi there",
+                  "ai_response": REPLIES[0], "persona_used": "education", "persona_name": "Education Specialist",
+                  "timestamp": datetime.utcnow(), "error": None}
+        compact = {key: value for key, value in legacy.items() if key not in ("persona_name", "error")}
+        print(f"New hot documents: {len(bson.encode(compact))} bytes vs {len(bson.encode(legacy))} in the full format")
+    finally:
+        if not args.standin and not args.keep:
+            await client.drop_database(args.database)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.getenv("BENCH_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="saarthi_bench_archive")
+    parser.add_argument("--standin", action="store_true", help="Use mongomock-motor instead of a real mongod")
+    parser.add_argument("--conversations", type=int, default=500_000)
+    parser.add_argument("--sessions", type=int, default=5_000)
+    parser.add_argument("--archive-days", type=float, default=30)
+    parser.add_argument("--chunk-turns", type=int, default=500)
+    parser.add_argument("--sample", type=int, default=20, help="Sessions whose history is timed")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded database afterwards")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
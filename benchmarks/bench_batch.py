@@ -0,0 +1,119 @@
+"""
+Batch chat vs. one /api/chat request per row.
+
+Builds a JSONL workload of mixed-persona prompts spread over sessions and
+answers it twice against a local stub LLM: as individual /api/chat calls
+(`--concurrency` sessions in flight, each session's rows in order, the way
+a QA replay script would) and as a single POST /api/chat/batch with the
+same concurrency. Reports rows per second for both.
+
+    python -m benchmarks.bench_batch --rows 2000 --sessions 200 --concurrency 16 --latency 0.05
+    python -m benchmarks.bench_batch --mongo-standin    # include MongoDB writes (mongomock-motor)
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.utils import free_port, start_backend, start_fake_llm, stop
+
+PROMPTS = (
+    "I feel stressed and anxious about my exams",
+    "Can you explain photosynthesis for my science homework?",
+    "What is a good recipe for dinner tonight?",
+    "How do I cope with feeling overwhelmed at work?",
+    "Teach me the basics of algebra",
+    "Tell me something interesting about space",
+)
+BATCH_KEY = "benchmark"
+
+
+def workload(rows: int, sessions: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        {"session_id": f"batch-{rng.randrange(sessions)}", "message": f"{rng.choice(PROMPTS)} ({i})"}
+        for i in range(rows)
+    ]
+
+
+async def per_request(base_url: str, rows, concurrency: int) -> dict:
+    """Each session's rows in order, `concurrency` sessions at a time"""
+    sessions = defaultdict(list)
+    for row in rows:
+        sessions[row["session_id"]].append(row)
+    pending = list(sessions.values())
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        async def worker():
+            nonlocal errors
+            while pending:
+                for row in pending.pop():
+                    response = await client.post("/api/chat", json=row)
+                    errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return {"rows_per_second": len(rows) / elapsed, "seconds": elapsed, "errors": errors}
+
+
+async def batch(base_url: str, rows, concurrency: int) -> dict:
+    body = "\n".join(json.dumps(row) for row in rows)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        start = time.perf_counter()
+        summary = None
+        async with client.stream("POST", f"/api/chat/batch?concurrency={concurrency}", content=body,
+                                 headers={"X-Batch-Key": BATCH_KEY}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    summary = json.loads(line)
+        elapsed = time.perf_counter() - start
+    return {"rows_per_second": len(rows) / elapsed, "seconds": elapsed, "errors": summary["failed"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16, help="Sessions in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub LLM latency in seconds")
+    parser.add_argument("--mongo-standin", action="store_true", help="Store turns in an in-memory MongoDB")
+    args = parser.parse_args()
+
+    rows = workload(args.rows, args.sessions)
+    llm_port = free_port()
+    llm = start_fake_llm(llm_port, args.latency)
+    env = {
+        "BATCH_API_KEY": BATCH_KEY,
+        "CHAT_RATE_PER_SESSION": "0",
+        "CHAT_RATE_PER_IP": "0",
+        "CHAT_MAX_CONCURRENT": str(args.concurrency),
+        "LLM_MAX_CONCURRENCY": str(args.concurrency),
+        "ROLLING_SUMMARY": "off",
+        "LOG_LEVEL": "WARNING",
+    }
+    print(f"{args.rows} rows over {args.sessions} sessions, {args.concurrency} in flight, "
+          f"stub LLM latency {args.latency:.3f}s (ideal {args.concurrency / args.latency:.0f} rows/s)")
+    print(f"{'mode':>12} {'rows/s':>9} {'seconds':>9} {'errors':>7}")
+    try:
+        for mode, run in (("per-request", per_request), ("batch", batch)):
+            # A fresh backend per mode, so neither starts with the other's session history
+            api_port = free_port()
+            backend = start_backend(api_port, llm_port, env, mongo_standin=args.mongo_standin)
+            try:
+                result = asyncio.run(run(f"http://127.0.0.1:{api_port}", rows, args.concurrency))
+            finally:
+                stop(backend)
+            print(f"{mode:>12} {result['rows_per_second']:>9.1f} {result['seconds']:>9.2f} {result['errors']:>7}")
+    finally:
+        stop(llm)
+
+
+if __name__ == "__main__":
+    main()
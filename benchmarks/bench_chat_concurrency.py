@@ -0,0 +1,67 @@
+"""
+Chat throughput vs. concurrent sessions against a local stub LLM.
+
+Starts benchmarks.fake_llm and backend/server.py, then drives /api/chat with
+N concurrent sessions for each level and reports requests/sec. With a
+non-blocking LLM path, throughput should scale roughly linearly with the
+number of sessions until LLM_MAX_CONCURRENCY is reached.
+
+    python -m benchmarks.bench_chat_concurrency --latency 0.25 --levels 1 2 4 8 16 32
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.utils import free_port, start_backend, start_fake_llm, stop
+
+
+async def drive(base_url: str, sessions: int, requests_per_session: int) -> float:
+    async def session_loop(client, index):
+        for turn in range(requests_per_session):
+            response = await client.post("/api/chat", json={
+                "message": f"hello number {turn}",
+                "session_id": f"bench-{sessions}-{index}",
+            })
+            response.raise_for_status()
+
+    limits = httpx.Limits(max_connections=sessions, max_keepalive_connections=sessions)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[session_loop(client, i) for i in range(sessions)])
+        elapsed = time.perf_counter() - start
+    return sessions * requests_per_session / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.25, help="Stub LLM latency in seconds")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests-per-session", type=int, default=5)
+    parser.add_argument("--max-concurrency", type=int, default=64, help="LLM_MAX_CONCURRENCY for the backend")
+    args = parser.parse_args()
+
+    llm_port, api_port = free_port(), free_port()
+    llm = backend = None
+    try:
+        llm = start_fake_llm(llm_port, args.latency)
+        backend = start_backend(api_port, llm_port, {"LLM_MAX_CONCURRENCY": str(args.max_concurrency)})
+        base_url = f"http://127.0.0.1:{api_port}"
+
+        # Warm up connection pools on both sides before measuring
+        asyncio.run(drive(base_url, 2, 2))
+
+        print(f"Stub LLM latency: {args.latency:.3f}s, ideal per-session rate: {1 / args.latency:.1f} req/s")
+        print(f"{'sessions':>8} {'req/s':>10} {'speedup':>8}")
+        baseline = None
+        for sessions in args.levels:
+            rps = asyncio.run(drive(base_url, sessions, args.requests_per_session))
+            baseline = baseline or rps
+            print(f"{sessions:>8} {rps:>10.1f} {rps / baseline:>7.1f}x")
+    finally:
+        stop(backend, llm)
+
+
+if __name__ == "__main__":
+    main()
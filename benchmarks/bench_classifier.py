@@ -0,0 +1,88 @@
+"""
+Persona classification micro-benchmark: the compiled single-pass classifier
+vs. the original nested substring loops.
+
+The original scan costs O(keywords x message length); the compiled one only
+depends on message length. `--extra-keywords` pads every persona with random
+keywords to show how each scales as keyword sets grow.
+
+    python -m benchmarks.bench_classifier --iterations 20000
+    python -m benchmarks.bench_classifier --iterations 1000 --extra-keywords 1000
+"""
+import argparse
+import random
+import string
+import sys
+import time
+
+from benchmarks.utils import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+from server import SaarthiAgentSystem  # noqa: E402
+
+MESSAGES = [
+    "Hello, how are you today?",
+    "Can you explain photosynthesis to me in simple terms?",
+    "I'm feeling anxious and stressed about my exams next week",
+    "What's the weather like in Mumbai right now?",
+    "Help me with my math homework, I don't understand fractions",
+    "Tell me a joke about programmers",
+    "I have been really overwhelmed at work and can't sleep properly",
+    "Explain the fundamental theorem of calculus and why it matters for physics " * 4,
+]
+
+
+def legacy_classify(personas, message):
+    """The original implementation, kept here for comparison"""
+    message_lower = message.lower()
+    for keyword in personas["mental_health"].keywords:
+        if keyword in message_lower:
+            return "mental_health"
+    for keyword in personas["education"].keywords:
+        if keyword in message_lower:
+            return "education"
+    return "general"
+
+
+def timeit(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message in MESSAGES:
+            fn(message)
+    return (time.perf_counter() - start) / (iterations * len(MESSAGES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--extra-keywords", type=int, default=0, help="Random keywords added to each persona")
+    args = parser.parse_args()
+
+    agent = SaarthiAgentSystem()
+    if args.extra_keywords:
+        rng = random.Random(0)
+        agent.reload_keywords({
+            key: persona.keywords + [
+                "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10)))
+                for _ in range(args.extra_keywords)
+            ]
+            for key, persona in agent.personas.items()
+        })
+    total_keywords = sum(len(persona.keywords) for persona in agent.personas.values())
+    print(f"{total_keywords} keywords across {len(agent.personas)} personas")
+    results = {
+        "legacy substring loops": timeit(lambda m: legacy_classify(agent.personas, m), args.iterations),
+        "compiled classify": timeit(lambda m: agent.classify_persona(m, "bench"), args.iterations),
+        "compiled scores": timeit(agent.persona_scores, args.iterations),
+    }
+    for label, seconds in results.items():
+        print(f"{label:<24} {seconds * 1e6:>8.2f} µs/message")
+
+    disagreements = [m for m in MESSAGES if legacy_classify(agent.personas, m) != agent.classify_persona(m, "bench")]
+    print(f"\nMessages classified differently (substring false positives fixed): {len(disagreements)}")
+    for message in disagreements:
+        print(f"  {message[:60]!r}: {legacy_classify(agent.personas, message)} -> {agent.classify_persona(message, 'bench')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Load test of the main API endpoints against a local stub LLM and MongoDB.
+
+Starts benchmarks.fake_llm and server.py (on the in-memory MongoDB stand-in,
+or on BENCH_MONGO_URL when set), seeds some conversations, then drives
+/api/chat, /api/sessions and /api/conversations/{session_id} with a closed
+loop of N concurrent clients per level. Reports throughput, error count
+and p50/p95/p99 latency per endpoint and level.
+
+Results can be saved as JSON (with the git commit they were measured on)
+and compared with an earlier run to spot regressions:
+
+    python -m benchmarks.bench_load --latency 0.25 --token-delay 0.005 --levels 1 8 32 --output before.json
+    python -m benchmarks.bench_load --latency 0.25 --token-delay 0.005 --levels 1 8 32 --compare before.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.utils import ROOT_DIR, free_port, percentile, start_backend, start_fake_llm, stop
+
+ENDPOINTS = ["chat", "sessions", "conversations"]
+MESSAGES = [
+    "Hello, how are you today?",
+    "Can you explain photosynthesis for my biology homework?",
+    "I have been feeling stressed about work lately",
+    "What should I cook for dinner tonight?",
+]
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit or None, dirty
+    except OSError:
+        return None, False
+
+
+def make_request(endpoint: str, worker: str, index: int, seeded_sessions):
+    """(method, url, json body) for one request against `endpoint`"""
+    if endpoint == "chat":
+        return "POST", "/api/chat", {"message": f"{random.choice(MESSAGES)} ({index})", "session_id": worker}
+    if endpoint == "sessions":
+        return "GET", "/api/sessions?limit=50", None
+    return "GET", f"/api/conversations/{random.choice(seeded_sessions)}?limit=50", None
+
+
+async def drive(client, endpoint: str, concurrency: int, requests: int, seeded_sessions) -> dict:
+    """Closed loop: `concurrency` clients issue `requests` requests in total"""
+    latencies, statuses = [], {}
+    counter = itertools.count()
+
+    async def worker(i):
+        session_id = f"load-{endpoint}-{concurrency}-{i}-{random.getrandbits(32):08x}"
+        while (index := next(counter)) < requests:
+            method, url, body = make_request(endpoint, session_id, index, seeded_sessions)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status != 200),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def seed(client, sessions: int, turns: int):
+    """Create `sessions` conversations of `turns` turns each; returns their ids"""
+    session_ids = [f"seed-{i}-{random.getrandbits(32):08x}" for i in range(sessions)]
+
+    async def converse(session_id):
+        for turn in range(turns):
+            response = await client.post("/api/chat", json={"message": f"{MESSAGES[turn % len(MESSAGES)]}",
+                                                             "session_id": session_id})
+            response.raise_for_status()
+
+    await asyncio.gather(*[converse(session_id) for session_id in session_ids])
+    return session_ids
+
+
+async def run(base_url: str, args) -> list:
+    limit = max(args.levels)
+    limits = httpx.Limits(max_connections=limit, max_keepalive_connections=limit)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        seeded = await seed(client, args.seed_sessions, args.seed_turns)
+        # Let the write-behind queue flush the seeded turns
+        await asyncio.sleep(1.0)
+        results = []
+        for endpoint in args.endpoints:
+            for concurrency in args.levels:
+                result = await drive(client, endpoint, concurrency, args.requests, seeded)
+                results.append(result)
+                print(f"{endpoint:>14} {concurrency:>6} {result['rps']:>9.1f} {result['p50_ms']:>9.1f} "
+                      f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['errors']:>7}")
+        return results
+
+
+def compare(results: list, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r["endpoint"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline_path} ({(baseline['meta'].get('commit') or 'unknown')[:10]}):")
+    print(f"{'endpoint':>14} {'conc':>6} {'req/s':>10} {'p95':>10} {'p99':>10}")
+
+    def change(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    for result in results:
+        old = previous.get((result["endpoint"], result["concurrency"]))
+        if old is None:
+            continue
+        print(f"{result['endpoint']:>14} {result['concurrency']:>6} {change(result['rps'], old['rps']):>10} "
+              f"{change(result['p95_ms'], old['p95_ms']):>10} {change(result['p99_ms'], old['p99_ms']):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.25, help="Stub LLM time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Stub LLM time per generated token (s)")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32], help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and level")
+    parser.add_argument("--seed-sessions", type=int, default=50)
+    parser.add_argument("--seed-turns", type=int, default=4)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier --output file to compare against")
+    args = parser.parse_args()
+
+    llm_port, api_port = free_port(), free_port()
+    llm = backend = None
+    try:
+        llm = start_fake_llm(llm_port, args.latency, ["--token-delay", str(args.token_delay)])
+        backend = start_backend(api_port, llm_port, {
+            # Measure the pipeline, not the limits protecting it
+            "CHAT_RATE_PER_SESSION": "0",
+            "CHAT_RATE_PER_IP": "0",
+            "CHAT_MAX_CONCURRENT": str(max(args.levels) * 2),
+            "LLM_MAX_CONCURRENCY": str(max(args.levels) * 2),
+            "LOG_LEVEL": "WARNING",
+        }, mongo_standin="BENCH_MONGO_URL" not in os.environ)
+        base_url = f"http://127.0.0.1:{api_port}"
+
+        print(f"Stub LLM latency {args.latency:.3f}s + {args.token_delay:.3f}s/token, "
+              f"MongoDB: {os.environ.get('BENCH_MONGO_URL', 'in-memory stand-in')}")
+        print(f"{'endpoint':>14} {'conc':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        results = asyncio.run(run(base_url, args))
+    finally:
+        stop(backend, llm)
+
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "mongo": "url" if "BENCH_MONGO_URL" in os.environ else "standin",
+            "config": vars(args),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cost of the chat pipeline's metrics instrumentation.
+
+Times the metric operations one /api/chat turn performs (stage timers,
+per-persona/model histograms, token counters) and a /metrics scrape with
+many label series, and compares the per-turn cost with a typical LLM round
+trip. No server or LLM is needed.
+
+    python -m benchmarks.bench_metrics --turns 200000 --llm-latency 0.25
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.utils import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+from metrics import Registry  # noqa: E402
+
+PERSONAS = ["general", "education", "mental_health"]
+
+
+def build_registry():
+    registry = Registry()
+    return registry, {
+        "stage": registry.histogram("stage_seconds", "Stage latency", ["stage"]),
+        "turn": registry.histogram("turn_seconds", "Turn latency", ["persona", "source"]),
+        "llm": registry.histogram("llm_seconds", "LLM latency", ["persona", "model"]),
+        "tokens": registry.counter("tokens_total", "Tokens", ["persona", "model", "kind"]),
+    }
+
+
+def instrumented_turn(metrics, persona: str, elapsed: float):
+    """The metric operations of one non-streamed, uncached chat turn"""
+    metrics["stage"].observe(elapsed, stage="validation")
+    with metrics["stage"].time(stage="classify"):
+        pass
+    with metrics["stage"].time(stage="context"):
+        pass
+    with metrics["stage"].time(stage="queue"):
+        pass
+    metrics["stage"].observe(elapsed, stage="llm")
+    metrics["llm"].observe(elapsed, persona=persona, model="llama3-8b-8192")
+    metrics["tokens"].inc(420, persona=persona, model="llama3-8b-8192", kind="prompt")
+    metrics["tokens"].inc(120, persona=persona, model="llama3-8b-8192", kind="completion")
+    metrics["turn"].observe(elapsed, persona=persona, source="llm")
+    with metrics["stage"].time(stage="store"):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200000)
+    parser.add_argument("--llm-latency", type=float, default=0.25, help="Typical LLM round trip to compare against")
+    parser.add_argument("--models", type=int, default=20, help="Distinct model labels, to grow the scrape")
+    args = parser.parse_args()
+
+    registry, metrics = build_registry()
+    start = time.perf_counter()
+    for i in range(args.turns):
+        instrumented_turn(metrics, PERSONAS[i % len(PERSONAS)], (i % 1000) / 1000)
+    per_turn = (time.perf_counter() - start) / args.turns
+
+    for i in range(args.models):
+        for persona in PERSONAS:
+            metrics["llm"].observe(0.1, persona=persona, model=f"model-{i}")
+    series = sum(len(metric.series) for metric in registry.metrics)
+    start = time.perf_counter()
+    text = registry.render()
+    scrape = time.perf_counter() - start
+
+    print(f"Metrics per chat turn: {per_turn * 1e6:.1f} us "
+          f"({per_turn / args.llm_latency * 100:.4f}% of a {args.llm_latency * 1000:.0f} ms LLM call)")
+    print(f"Scrape of {series} series ({len(text.splitlines())} lines): {scrape * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Prompt assembly micro-benchmark: each persona's prebuilt system message and
+completion settings vs. building the whole request envelope on every turn.
+
+The original code built a new system message dict, a messages list grown
+with extend/append, and a fresh set of completion keyword arguments for
+every call. Now the system message and settings are built once per persona
+and each turn only allocates the list and its new user message. Memory is
+what one in-flight request's envelope holds (tracemalloc, averaged over
+`--iterations` envelopes kept alive at once), so it scales with concurrency.
+
+    python -m benchmarks.bench_prompt --iterations 100000
+    python -m benchmarks.bench_prompt --exchanges 0
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from benchmarks.utils import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+from server import LLM_MODEL, SaarthiAgentSystem  # noqa: E402
+
+
+def completion_args(**kwargs):
+    """Stands in for create_completion: the keyword arguments one LLM request is sent with"""
+    return kwargs
+
+
+def legacy_envelope(persona, context, message):
+    """The original per-turn assembly, kept here for comparison"""
+    messages = [{"role": "system", "content": persona.prompt}]
+    messages.extend(context)
+    messages.append({"role": "user", "content": message})
+    return completion_args(messages=messages, model=LLM_MODEL, temperature=0.7, max_tokens=500)
+
+
+def envelope(persona, context, message):
+    return completion_args(messages=persona.messages(context, message), model=persona.model,
+                           temperature=persona.temperature, max_tokens=persona.max_tokens)
+
+
+def measure(build, persona, context, message, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        build(persona, context, message)
+    seconds = (time.perf_counter() - start) / iterations
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [build(persona, context, message) for _ in range(iterations)]
+    retained = (tracemalloc.get_traced_memory()[0] - before) / len(held)
+    tracemalloc.stop()
+    return seconds, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--exchanges", type=int, default=6, help="Prior exchanges in each turn's context")
+    args = parser.parse_args()
+
+    persona = SaarthiAgentSystem().personas["education"]
+    context = []
+    for i in range(args.exchanges):
+        context.append({"role": "user", "content": f"Question {i} about photosynthesis"})
+        context.append({"role": "assistant", "content": f"Answer {i}: plants turn light into sugar."})
+    message = "Can you explain the Calvin cycle?"
+    assert legacy_envelope(persona, context, message) == envelope(persona, context, message)
+
+    print(f"{args.exchanges} prior exchanges, {args.iterations} envelopes")
+    results = {}
+    for label, build in (("per-turn (original)", legacy_envelope), ("prebuilt prefix", envelope)):
+        seconds, retained = measure(build, persona, context, message, args.iterations)
+        results[label] = retained
+        print(f"{label:<22} {seconds * 1e9:>8.0f} ns/turn {retained:>8.0f} bytes per in-flight request")
+    original, prebuilt = results.values()
+    print(f"Envelope memory: {prebuilt / original:.0%} of the original")
+
+
+if __name__ == "__main__":
+    main()
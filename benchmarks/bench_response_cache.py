@@ -0,0 +1,126 @@
+"""
+Response cache replay: hit ratio and LLM time saved over recorded chat traffic.
+
+Replays a JSONL file of {"session_id": ..., "message": ...} turns (in order)
+through the agent with a stub LLM, once per cache mode. Without --traffic a
+synthetic mix is generated: common openers and FAQ questions with casing,
+punctuation and filler variations, follow-up turns, and mental-health turns
+(never cached).
+
+    python -m benchmarks.bench_response_cache
+    python -m benchmarks.bench_response_cache --traffic traffic.jsonl --latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from benchmarks.utils import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+import server  # noqa: E402
+from cache import ResponseCache  # noqa: E402
+
+OPENERS = [
+    "hello", "hi", "hey there", "what can you do", "who are you", "tell me a joke",
+    "explain photosynthesis", "what is gravity", "help me with my math homework",
+    "how do I solve quadratic equations", "what is the capital of france",
+]
+VARIANTS = ["{}", "{}!", "{}?", "{} please", "{}.", "{} ?", "can you {}"]
+FOLLOW_UPS = ["tell me more", "why?", "give me an example", "thanks", "can you simplify that"]
+MENTAL_HEALTH = ["I feel anxious about my exams", "I'm stressed and can't sleep", "I feel sad today"]
+
+
+def synthetic_traffic(sessions, seed=0):
+    rng = random.Random(seed)
+    turns = []
+    for i in range(sessions):
+        session_id = f"replay-{i}"
+        if rng.random() < 0.15:
+            first = rng.choice(MENTAL_HEALTH)
+        elif rng.random() < 0.1:
+            first = f"unique question number {i} about {rng.random():.6f}"
+        else:
+            opener = rng.choice(OPENERS)
+            first = rng.choice(VARIANTS).format(opener.capitalize() if rng.random() < 0.5 else opener)
+        turns.append({"session_id": session_id, "message": first})
+        for _ in range(rng.randint(0, 2)):
+            turns.append({"session_id": session_id, "message": rng.choice(FOLLOW_UPS)})
+    return turns
+
+
+def load_traffic(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class StubLLM:
+    """In-process stand-in for the LLM client that waits `latency` per call"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        text = f"Reply {self.calls}."
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+async def replay(turns, mode, latency, concurrency):
+    llm = StubLLM(latency)
+    server.groq_client, server.groq_client_is_async = llm, True
+    cache = None
+    if mode != "off":
+        embedder = None
+        if mode == "semantic":
+            from semantic import HashedEmbedder
+            embedder = HashedEmbedder()
+        cache = ResponseCache(embedder=embedder, threshold=server.RESPONSE_CACHE_THRESHOLD)
+    agent = server.SaarthiAgentSystem(response_cache=cache)
+
+    # Up to `concurrency` sessions at a time, turns within a session in order
+    by_session = {}
+    for turn in turns:
+        by_session.setdefault(turn["session_id"], []).append(turn["message"])
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run_session(session_id, messages):
+        async with slots:
+            for message in messages:
+                await agent.generate_response(message, session_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(s, m) for s, m in by_session.items()))
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "turns": len(turns),
+        "llm_calls": llm.calls,
+        "wall_seconds": round(elapsed, 3),
+        **({key: value for key, value in cache.metrics().items() if key != "entries"} if cache else {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--traffic", help="JSONL file of {session_id, message} turns")
+    parser.add_argument("--sessions", type=int, default=2000, help="synthetic sessions when no --traffic is given")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub LLM seconds per call")
+    parser.add_argument("--concurrency", type=int, default=32, help="sessions replayed at once")
+    parser.add_argument("--modes", nargs="+", default=["off", "exact", "semantic"])
+    args = parser.parse_args()
+
+    turns = load_traffic(args.traffic) if args.traffic else synthetic_traffic(args.sessions)
+    for mode in args.modes:
+        result = asyncio.run(replay(turns, mode, args.latency, args.concurrency))
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Conversation search latency: the in-process BM25 index vs. scanning every turn.
+
+Builds N synthetic turns (Zipf-distributed words, so some query terms are
+rare and some appear in a large share of turns), indexes them with
+search.InvertedIndex and times paginated queries: a rare term, common
+terms, several terms, and a search scoped to one session. The baseline is
+what searching without an index amounts to (a $regex over every stored
+message): a substring scan of all turns. With --vectors (needs numpy), it
+also times brute-force semantic search over the most recent turns.
+
+    python -m benchmarks.bench_search --turns 1000000
+    python -m benchmarks.bench_search --turns 1000000 --no-numpy
+    python -m benchmarks.bench_search --turns 200000 --vectors 100000
+"""
+import argparse
+import itertools
+import random
+import resource
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from benchmarks.utils import BACKEND_DIR, percentile
+
+sys.path.insert(0, BACKEND_DIR)
+import search  # noqa: E402
+from search import InvertedIndex, VectorIndex, tokenize  # noqa: E402
+
+TOPICS = ("exam", "stress", "chemistry", "recipe", "sleep", "anxious", "photosynthesis", "algebra", "movie",
+          "lonely", "career", "football", "weather", "dinner", "interview")
+
+
+def vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = sorted({"".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size * 2)})[:size]
+    rng.shuffle(words)
+    # Topic words rank 50-64: each ends up in several percent of turns
+    return words[:50] + list(TOPICS) + words[50:]
+
+
+def generate(turns: int, sessions: int, seed: int = 7):
+    rng = random.Random(seed)
+    words = vocabulary(20000, rng)
+    # Zipf-like: the head of the vocabulary appears in most turns, the tail in a handful
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    start = datetime(2025, 1, 1)
+    for i in range(turns):
+        message = " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(6, 14)))
+        response = " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(20, 40)))
+        yield {
+            "_id": f"turn-{i:08d}",
+            "session_id": f"session-{rng.randrange(sessions)}",
+            "user_message": message,
+            "ai_response": response,
+            "persona_used": rng.choice(("general", "education", "mental_health")),
+            "timestamp": start + timedelta(seconds=i)
+        }
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def time_queries(run, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), percentile(samples, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=50_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--scan-runs", type=int, default=3, help="Runs of the slow full-scan baseline")
+    parser.add_argument("--vectors", type=int, default=0, help="Also embed and search this many recent turns")
+    parser.add_argument("--no-numpy", action="store_true", help="Score text queries in pure Python")
+    args = parser.parse_args()
+    if args.no_numpy:
+        search.np = None
+
+    index = InvertedIndex()
+    before = rss_mb()
+    start = time.perf_counter()
+    for i, doc in enumerate(generate(args.turns, args.sessions), 1):
+        index.add(doc, Counter(tokenize(f"{doc['user_message']} {doc['ai_response']}")))
+        if i % 100_000 == 0:
+            print(f"  indexed {i}/{args.turns}", end="\r")
+    elapsed = time.perf_counter() - start
+    grown = rss_mb() - before
+    print(f"Indexed {args.turns:,} turns in {elapsed:.1f}s ({args.turns / elapsed:,.0f} turns/s, generation included): "
+          f"{len(index.postings):,} terms, {grown:,.0f} MB ({grown * 1e6 / args.turns:,.0f} bytes per turn)")
+    # The same turns again, as the raw text a scan has to read
+    texts = [f"{doc['user_message']} {doc['ai_response']}".lower() for doc in generate(args.turns, args.sessions)]
+
+    head = max(index.postings, key=lambda term: len(index.postings[term]))
+    rare = next(term for term, numbers in sorted(index.postings.items(), key=lambda item: len(item[1]))
+                if len(numbers) >= 20)
+    queries = {
+        f"rare term ({rare})": (rare, None),
+        "common term (exam)": ("exam", None),
+        f"most common term ({head})": (head, None),
+        "three terms": ("chemistry exam stress", None),
+        "one session": (head, "session-42"),
+    }
+    print(f"\nText scoring: {'numpy' if search.np is not None else 'pure Python'}")
+    print(f"{'query':<28} {'matches':>9} {'index p50':>10} {'p95':>8} {'scan p50':>10}")
+    for label, (query, session_id) in queries.items():
+        terms = tokenize(query)
+        total, _ = index.search(terms, 20, 0, session_id)
+        p50, p95 = time_queries(lambda: index.search(terms, 20, 0, session_id), args.runs)
+        needles = query.split()
+        scan, _ = time_queries(lambda: [i for i, text in enumerate(texts) if any(n in text for n in needles)],
+                               args.scan_runs)
+        print(f"{label:<28} {total:>9,} {p50:>8.1f}ms {p95:>6.1f}ms {scan:>8.1f}ms")
+
+    if args.vectors:
+        from semantic import HashedEmbedder
+        embedder = HashedEmbedder(dim=512)
+        vectors = VectorIndex(embedder, args.vectors)
+        recent = range(max(0, args.turns - args.vectors), args.turns)
+        start = time.perf_counter()
+        for offset in range(0, len(recent), 1000):
+            batch = recent[offset:offset + 1000]
+            vectors.add(list(batch), embedder.embed([texts[i][:200] for i in batch]))
+        print(f"\nEmbedded {len(recent):,} turns in {time.perf_counter() - start:.1f}s")
+        query = embedder.embed(["feeling anxious about my chemistry exam"])[0]
+        p50, p95 = time_queries(lambda: vectors.search(query, 20), args.runs)
+        print(f"{'semantic top 20':<28} {len(recent):>9,} {p50:>8.1f}ms {p95:>6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Semantic persona router latency (single message) and batch throughput.
+
+    python -m benchmarks.bench_semantic_router
+    python -m benchmarks.bench_semantic_router --router model   # needs sentence-transformers
+"""
+import argparse
+import random
+import sys
+import time
+
+from benchmarks.utils import BACKEND_DIR, percentile
+
+sys.path.insert(0, BACKEND_DIR)
+from semantic import PERSONA_EXAMPLES, HashedEmbedder, SemanticRouter, SentenceTransformerEmbedder  # noqa: E402
+
+FILLERS = ["honestly", "lately", "right now", "please", "for my class", "at night", "again"]
+
+
+def corpus(size, seed=0):
+    rng = random.Random(seed)
+    examples = [example for persona in PERSONA_EXAMPLES.values() for example in persona]
+    return [f"{rng.choice(examples)} {rng.choice(FILLERS)}" for _ in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--router", choices=["hashed", "model"], default="hashed")
+    parser.add_argument("--single-runs", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 256, 4096])
+    args = parser.parse_args()
+
+    embedder = SentenceTransformerEmbedder() if args.router == "model" else HashedEmbedder()
+    start = time.perf_counter()
+    router = SemanticRouter(embedder)
+    print(f"Router ({embedder.name}) built in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    messages = corpus(args.single_runs)
+    router.route(messages[0])  # warm-up
+    samples = []
+    for message in messages:
+        start = time.perf_counter()
+        router.route(message)
+        samples.append(time.perf_counter() - start)
+    print(f"single message: p50 {percentile(samples, 50) * 1000:.3f}ms  "
+          f"p99 {percentile(samples, 99) * 1000:.3f}ms  (budget 5ms)")
+
+    for batch_size in args.batch_sizes:
+        batch = corpus(batch_size, seed=batch_size)
+        start = time.perf_counter()
+        router.route_batch(batch)
+        elapsed = time.perf_counter() - start
+        print(f"batch {batch_size:>6}: {elapsed * 1000:>9.2f}ms  {batch_size / elapsed:>10.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+/api/sessions query cost: full-collection $group vs. the sessions summary.
+
+Seeds a scratch database with N conversations spread over M sessions, builds
+the summaries the same way a fresh server start does, then times the old
+aggregation against the indexed summary query. Needs a real mongod:
+
+    BENCH_MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_sessions --conversations 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from benchmarks.utils import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+from persistence import backfill_session_summaries, ensure_indexes  # noqa: E402
+
+LEGACY_PIPELINE = [
+    {
+        "$group": {
+            "_id": "$session_id",
+            "last_message": {"$last": "$$ROOT"},
+            "message_count": {"$sum": 1}
+        }
+    },
+    {
+        "$sort": {"last_message.timestamp": -1}
+    }
+]
+
+
+async def seed(db, conversations, sessions, batch_size=10000):
+    session_ids = [f"bench-{uuid.uuid4().hex[:12]}" for _ in range(sessions)]
+    start = datetime(2025, 1, 1)
+    written = 0
+    while written < conversations:
+        batch = []
+        for i in range(min(batch_size, conversations - written)):
+            batch.append({
+                "_id": str(uuid.uuid4()),
+                "session_id": random.choice(session_ids),
+                "user_message": "How do I manage stress before exams?",
+                "ai_response": "Here are a few things that can help. " * 5,
+                "persona_used": random.choice(["general", "education", "mental_health"]),
+                "persona_name": "General Assistant",
+                "timestamp": start + timedelta(seconds=written + i),
+                "error": None
+            })
+        await db.conversations.insert_many(batch, ordered=False)
+        written += len(batch)
+        print(f"  seeded {written}/{conversations}", end="\r")
+    print()
+
+
+async def time_query(label, query, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await query()
+        samples.append(time.perf_counter() - start)
+    print(f"{label:<32} median {statistics.median(samples) * 1000:>9.1f}ms  min {min(samples) * 1000:>9.1f}ms")
+
+
+async def run(args):
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.database]
+    await client.drop_database(args.database)
+    try:
+        print(f"Seeding {args.conversations} conversations over {args.sessions} sessions...")
+        start = time.perf_counter()
+        await seed(db, args.conversations, args.sessions)
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        await ensure_indexes(db)
+        await backfill_session_summaries(db)
+        print(f"Indexes + summary backfill in {time.perf_counter() - start:.1f}s")
+
+        await time_query(
+            "legacy $group (all sessions)",
+            lambda: db.conversations.aggregate(LEGACY_PIPELINE, allowDiskUse=True).to_list(length=None),
+            args.runs
+        )
+        await time_query(
+            f"summary page (limit={args.limit})",
+            lambda: db.sessions.find({}).sort([("last_updated", -1), ("_id", 1)]).limit(args.limit).to_list(length=args.limit),
+            args.runs
+        )
+        await time_query(
+            "summary total count",
+            db.sessions.estimated_document_count,
+            args.runs
+        )
+    finally:
+        if not args.keep:
+            await client.drop_database(args.database)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.getenv("BENCH_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="saarthi_bench_sessions")
+    parser.add_argument("--conversations", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded database afterwards")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
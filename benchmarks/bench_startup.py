@@ -0,0 +1,54 @@
+"""
+Worker cold start: time until /api/health answers and until the first chat turn.
+
+Spawns server.py `--runs` times against the stub LLM and a MongoDB URL that
+is unreachable by default (with pymongo's default 30s server selection, so
+any startup path that waits on MongoDB shows up), and reports how long each
+worker took to accept requests and to answer its first /api/chat, which
+includes waiting for the LLM SDK to finish loading.
+
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --mongo-url mongodb://localhost:27017
+"""
+import argparse
+import statistics
+import time
+
+import httpx
+
+from benchmarks.utils import free_port, start_backend, start_fake_llm, stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mongo-url", default="mongodb://127.0.0.1:1", help="MONGO_URL for the backend")
+    args = parser.parse_args()
+
+    llm_port = free_port()
+    llm = start_fake_llm(llm_port, 0.0)
+    ready, first_chat = [], []
+    try:
+        for _ in range(args.runs):
+            api_port = free_port()
+            start = time.perf_counter()
+            backend = start_backend(api_port, llm_port, {"MONGO_URL": args.mongo_url})
+            try:
+                ready.append(time.perf_counter() - start)
+                response = httpx.post(f"http://127.0.0.1:{api_port}/api/chat",
+                                      json={"message": "hello", "session_id": "cold-start"}, timeout=60.0)
+                response.raise_for_status()
+                first_chat.append(time.perf_counter() - start)
+            finally:
+                stop(backend)
+    finally:
+        stop(llm)
+
+    print(f"MongoDB: {args.mongo_url}, {args.runs} runs")
+    print(f"{'':>22} {'median s':>9} {'max s':>9}")
+    print(f"{'accepting requests':>22} {statistics.median(ready):>9.2f} {max(ready):>9.2f}")
+    print(f"{'first chat answered':>22} {statistics.median(first_chat):>9.2f} {max(first_chat):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
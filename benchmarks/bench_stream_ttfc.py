@@ -0,0 +1,73 @@
+"""
+Time-to-first-chunk: /api/chat vs. /api/chat/stream against a local fake LLM.
+
+For /api/chat the first usable text arrives with the full response; for the
+streaming endpoint it arrives with the first complete sentence. The gap is
+how much sooner the voice UI can start speaking.
+
+    python -m benchmarks.bench_stream_ttfc --latency 0.2 --token-delay 0.02 --runs 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.utils import free_port, percentile, start_backend, start_fake_llm, stop
+
+
+async def time_blocking(client, session_id):
+    start = time.perf_counter()
+    response = await client.post("/api/chat", json={"message": "hello", "session_id": session_id})
+    response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed
+
+
+async def time_streaming(client, session_id):
+    start = time.perf_counter()
+    first_chunk = None
+    async with client.stream("POST", "/api/chat/stream", json={"message": "hello", "session_id": session_id}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if first_chunk is None and line == "event: chunk":
+                first_chunk = time.perf_counter() - start
+    return first_chunk, time.perf_counter() - start
+
+
+async def run(base_url, runs):
+    results = {"/api/chat": [], "/api/chat/stream": []}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        for i in range(runs):
+            results["/api/chat"].append(await time_blocking(client, f"ttfc-block-{i}"))
+            results["/api/chat/stream"].append(await time_streaming(client, f"ttfc-stream-{i}"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub LLM time to first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Stub LLM seconds per token")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    llm_port, api_port = free_port(), free_port()
+    llm = backend = None
+    try:
+        llm = start_fake_llm(llm_port, args.latency, ["--token-delay", str(args.token_delay)])
+        backend = start_backend(api_port, llm_port)
+        results = asyncio.run(run(f"http://127.0.0.1:{api_port}", args.runs))
+
+        print(f"{'endpoint':<18} {'first chunk p50':>16} {'first chunk p95':>16} {'total p50':>10}")
+        for endpoint, samples in results.items():
+            firsts = [first for first, _ in samples]
+            totals = [total for _, total in samples]
+            print(f"{endpoint:<18} {statistics.median(firsts) * 1000:>14.0f}ms "
+                  f"{percentile(firsts, 95) * 1000:>14.0f}ms {statistics.median(totals) * 1000:>8.0f}ms")
+    finally:
+        stop(backend, llm)
+
+
+if __name__ == "__main__":
+    main()
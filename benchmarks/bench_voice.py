@@ -0,0 +1,225 @@
+"""
+Voice latency: end of speech to first synthesized audio on /api/voice.
+
+Streams audio to the WebSocket endpoint in real time (20 ms chunks) and
+times each turn from the moment the user stopped speaking to the first
+"partial"/"transcript"/"chunk" event and the first binary audio message.
+Two ways of ending an utterance are measured:
+
+  silence   the server's endpoint detector waits VOICE_SILENCE_MS of silence
+  end       the client sends {"type": "end"} right away (push-to-talk)
+
+The app runs in-process with a stub LLM (time to first token + per-token
+delay). Speech models are stand-ins that spend `--stt-cost` seconds of CPU
+per second of audio and `--tts-cost` seconds per sentence, unless real
+models are configured (VOICE_STT=vosk VOICE_STT_MODEL=... and/or
+VOICE_TTS=piper VOICE_TTS_MODEL=...), in which case pass --wav with a
+16 kHz mono 16-bit recording of speech.
+
+    python -m benchmarks.bench_voice --turns 20
+    VOICE_STT=vosk VOICE_STT_MODEL=models/vosk VOICE_TTS=piper VOICE_TTS_MODEL=models/piper.onnx \\
+        python -m benchmarks.bench_voice --wav hello.wav
+"""
+import argparse
+import asyncio
+import json
+import struct
+import sys
+import time
+import wave
+from types import SimpleNamespace
+
+from benchmarks.utils import BACKEND_DIR, percentile
+
+sys.path.insert(0, BACKEND_DIR)
+import server  # noqa: E402
+from voice import RecognitionStream, SpeechRecognizer, SpeechSynthesizer  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK_MS = 20
+REPLY = ("That sounds like a lot to carry right now. Let's take it one step at a time. "
+         "What feels most urgent to you today? We can start there together.")
+
+
+class BusyStream(RecognitionStream):
+    def __init__(self, cost):
+        self.cost = cost
+        self.seconds = 0.0
+
+    def accept(self, pcm):
+        audio_seconds = len(pcm) / 2 / SAMPLE_RATE
+        self.seconds += audio_seconds
+        busy(self.cost * audio_seconds)
+        return f"partial after {self.seconds:.2f}s"
+
+    def finish(self):
+        busy(self.cost * 0.1)
+        return "I have been feeling stressed about work lately"
+
+
+class BusyRecognizer(SpeechRecognizer):
+    """Stand-in recognizer spending `cost` seconds of CPU per second of audio"""
+
+    name = "standin"
+
+    def __init__(self, cost):
+        self.cost = cost
+
+    def stream(self, sample_rate):
+        return BusyStream(self.cost)
+
+
+class BusySynthesizer(SpeechSynthesizer):
+    """Stand-in synthesizer spending `cost` seconds of CPU per sentence"""
+
+    name = "standin"
+    sample_rate = 22050
+
+    def __init__(self, cost):
+        self.cost = cost
+
+    def synthesize(self, text):
+        busy(self.cost)
+        return bytes(int(self.sample_rate * 0.06 * len(text)) * 2)
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class StreamingStubLLM:
+    """In-process LLM stand-in streaming REPLY word by word"""
+
+    def __init__(self, latency, token_delay):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, stream=False, **kwargs):
+        await asyncio.sleep(self.latency)
+        words = [word + " " for word in REPLY.split(" ")]
+
+        async def deltas():
+            for word in words:
+                await asyncio.sleep(self.token_delay)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+
+        return deltas()
+
+
+class InProcessWebSocket:
+    """Just enough of a WebSocket client to talk to the ASGI app directly"""
+
+    def __init__(self, app, path):
+        self.inbound = asyncio.Queue()
+        self.outbound = asyncio.Queue()
+        scope = {"type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": path,
+                 "raw_path": path.encode(), "root_path": "", "query_string": b"", "headers": [],
+                 "client": ("127.0.0.1", 50000), "server": ("bench", 80), "subprotocols": []}
+        self.task = asyncio.ensure_future(app(scope, self.inbound.get, self.outbound.put))
+
+    async def send(self, text=None, data=None):
+        await self.inbound.put({"type": "websocket.receive", "text": text, "bytes": data})
+
+    async def receive(self):
+        return await self.outbound.get()
+
+    async def close(self):
+        await self.inbound.put({"type": "websocket.disconnect", "code": 1000})
+        await self.task
+
+
+def speech_audio(path, milliseconds):
+    """PCM from a WAV file, or a loud tone the energy detector treats as speech"""
+    if path:
+        with wave.open(path, "rb") as f:
+            if (f.getframerate(), f.getnchannels(), f.getsampwidth()) != (SAMPLE_RATE, 1, 2):
+                raise SystemExit("--wav must be 16 kHz mono 16-bit PCM")
+            return f.readframes(f.getnframes())
+    samples = SAMPLE_RATE * milliseconds // 1000
+    return struct.pack(f"<{samples}h", *[3000 if i % 2 else -3000 for i in range(samples)])
+
+
+async def run_turn(ws, speech, mode):
+    """Send one utterance in real time; returns event timings relative to end of speech"""
+    chunk = SAMPLE_RATE * CHUNK_MS // 1000 * 2
+    silence = bytes(chunk)
+    for offset in range(0, len(speech), chunk):
+        await ws.send(data=speech[offset:offset + chunk])
+        await asyncio.sleep(CHUNK_MS / 1000)
+    end_of_speech = time.perf_counter()
+    if mode == "end":
+        await ws.send(text=json.dumps({"type": "end"}))
+
+    timings = {}
+
+    async def keep_talking_silence():
+        while True:
+            await ws.send(data=silence)
+            await asyncio.sleep(CHUNK_MS / 1000)
+
+    feeder = asyncio.ensure_future(keep_talking_silence()) if mode == "silence" else None
+    try:
+        while True:
+            message = await ws.receive()
+            elapsed = time.perf_counter() - end_of_speech
+            if message.get("bytes") is not None:
+                timings.setdefault("first_audio", elapsed)
+                continue
+            event = json.loads(message["text"])
+            timings.setdefault(event["type"], elapsed)
+            if event["type"] == "error":
+                raise RuntimeError(event)
+            if event["type"] == "done":
+                return timings
+    finally:
+        if feeder is not None:
+            feeder.cancel()
+
+
+async def measure(args, mode):
+    ws = InProcessWebSocket(server.app, "/api/voice")
+    await ws.inbound.put({"type": "websocket.connect"})
+    await ws.receive()
+    await ws.send(text=json.dumps({"type": "start", "session_id": f"bench-voice-{mode}"}))
+    await ws.receive()
+    speech = speech_audio(args.wav, args.speech_ms)
+    results = []
+    try:
+        for _ in range(args.turns):
+            results.append(await run_turn(ws, speech, mode))
+    finally:
+        await ws.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=10, help="Utterances per mode")
+    parser.add_argument("--speech-ms", type=int, default=1500, help="Length of the synthetic utterance")
+    parser.add_argument("--wav", help="16 kHz mono 16-bit WAV to send instead of a tone")
+    parser.add_argument("--latency", type=float, default=0.25, help="Stub LLM time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Stub LLM time per word (s)")
+    parser.add_argument("--stt-cost", type=float, default=0.1, help="Stand-in STT CPU seconds per audio second")
+    parser.add_argument("--tts-cost", type=float, default=0.15, help="Stand-in TTS CPU seconds per sentence")
+    args = parser.parse_args()
+
+    server.groq_client, server.groq_client_is_async = StreamingStubLLM(args.latency, args.token_delay), True
+    server.session_limiter = server.RateLimiter(0, 1)
+    recognizer, synthesizer = server.create_voice_models()
+    server.speech_recognizer = recognizer or BusyRecognizer(args.stt_cost)
+    server.speech_synthesizer = synthesizer or BusySynthesizer(args.tts_cost)
+    print(f"STT: {server.speech_recognizer.name}, TTS: {server.speech_synthesizer.name}, "
+          f"silence {server.VOICE_SILENCE_MS} ms, LLM {args.latency:.2f}s + {args.token_delay:.3f}s/word")
+    print(f"{'mode':>8} {'event':>12} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode in ("silence", "end"):
+        results = asyncio.run(measure(args, mode))
+        for event in ("transcript", "chunk", "first_audio"):
+            values = [result[event] for result in results if event in result]
+            print(f"{mode:>8} {event:>12} {percentile(values, 50) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
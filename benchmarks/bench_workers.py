@@ -0,0 +1,95 @@
+"""
+Multi-worker scaling of the backend's own CPU work.
+
+Runs backend/serve.py with 1, 2, 4, ... worker processes against a
+zero-latency stub LLM, so each /api/chat turn costs only what the backend
+spends on it: validation, persona classification of a long message,
+prompt building and JSON (de)serialization. Reports throughput per worker
+count, the speedup over one worker and the scaling efficiency
+(speedup / workers). On an N-core machine the speedup should stay close
+to linear up to N workers.
+
+    python -m benchmarks.bench_workers --workers 1 2 4 --concurrency 64
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+
+import httpx
+
+from benchmarks.utils import free_port, percentile, start_backend, start_fake_llm, stop
+
+WORDS = ("study", "homework", "stressed", "recipe", "weekend", "explain", "feeling", "project", "travel", "music")
+
+
+def long_message(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+
+async def drive(base_url: str, concurrency: int, duration: float, message_words: int) -> dict:
+    """Closed loop of `concurrency` clients for `duration` seconds"""
+    latencies, errors = [], 0
+    counter = itertools.count()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker(i):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                body = {"message": f"{long_message(message_words)} {next(counter)}", "session_id": f"w{i}"}
+                start = time.perf_counter()
+                response = await client.post("/api/chat", json=body)
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return {"rps": len(latencies) / elapsed, "p95_ms": percentile(latencies, 95) * 1000, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per worker count")
+    parser.add_argument("--message-words", type=int, default=400, help="Words per chat message")
+    args = parser.parse_args()
+
+    llm_port = free_port()
+    llm = start_fake_llm(llm_port, 0.0)
+    env = {
+        "CHAT_RATE_PER_SESSION": "0",
+        "CHAT_RATE_PER_IP": "0",
+        "CHAT_MAX_CONCURRENT": str(args.concurrency),
+        "LLM_MAX_CONCURRENCY": str(args.concurrency),
+        "ROLLING_SUMMARY": "off",
+    }
+    print(f"{os.cpu_count()} CPUs, {args.concurrency} clients, {args.message_words}-word messages")
+    print(f"{'workers':>8} {'req/s':>9} {'speedup':>8} {'efficiency':>11} {'p95 ms':>9} {'errors':>7}")
+    baseline = None
+    try:
+        for workers in args.workers:
+            api_port = free_port()
+            backend = start_backend(api_port, llm_port, env, workers=workers)
+            try:
+                # Warm up every worker before measuring
+                asyncio.run(drive(f"http://127.0.0.1:{api_port}", args.concurrency, 1.0, args.message_words))
+                result = asyncio.run(drive(f"http://127.0.0.1:{api_port}", args.concurrency,
+                                           args.duration, args.message_words))
+            finally:
+                stop(backend)
+            baseline = baseline or result["rps"] / workers
+            speedup = result["rps"] / baseline
+            print(f"{workers:>8} {result['rps']:>9.1f} {speedup:>7.2f}x {speedup / workers:>10.0%} "
+                  f"{result['p95_ms']:>9.1f} {result['errors']:>7}")
+    finally:
+        stop(llm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Local OpenAI-compatible stub LLM server for benchmarks.
+
+Serves POST /v1/chat/completions with a canned reply, so server.py can be
+load-tested without a Groq key or network. `--latency` is the time to the
+first token and `--token-delay` the time per generated token; non-streaming
+requests wait for the whole generation, `stream=True` requests get
+OpenAI-style SSE deltas as the tokens are "generated".
+
+Faults can be injected to exercise the LLM gateway: `--fail-rate` answers
+that share of requests with `--fail-status`, and `--slow-rate` adds
+`--slow-latency` seconds to that share of requests (tail latency).
+
+    python -m benchmarks.fake_llm --port 9100 --latency 0.25 --token-delay 0.01
+    python -m benchmarks.fake_llm --port 9101 --fail-rate 0.2 --slow-rate 0.05 --slow-latency 2
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+DEFAULT_REPLY = (
+    "That's a great question. Here is a short answer from the local stub model. "
+    "It is only used for benchmarks, so the content does not matter much. "
+    "Real replies are usually a few sentences long, which is what this imitates. "
+    "Streaming lets the first of them be spoken before the last one exists."
+)
+
+
+def tokenize(text: str):
+    """Split text into word-ish tokens that join back to the original"""
+    return re.findall(r"\S+\s*", text)
+
+
+def create_app(latency: float = 0.25, reply: str = DEFAULT_REPLY, token_delay: float = 0.0,
+               fail_rate: float = 0.0, fail_status: int = 503, slow_rate: float = 0.0,
+               slow_latency: float = 0.0, seed=None) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+    app.state.latency = latency
+    app.state.token_delay = token_delay
+    app.state.reply = reply
+    app.state.fail_rate = fail_rate
+    app.state.fail_status = fail_status
+    app.state.slow_rate = slow_rate
+    app.state.slow_latency = slow_latency
+    app.state.rng = random.Random(seed)
+    app.state.requests = 0
+    app.state.models = []
+
+    async def stream_tokens(model: str, completion_id: str):
+        for token in tokenize(app.state.reply):
+            await asyncio.sleep(app.state.token_delay)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        final = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        app.state.models.append(body.get("model"))
+        rng = app.state.rng
+        delay = app.state.latency
+        if rng.random() < app.state.slow_rate:
+            delay += app.state.slow_latency
+        await asyncio.sleep(delay)
+        if rng.random() < app.state.fail_rate:
+            return JSONResponse(
+                {"error": {"message": "Injected fault", "type": "server_error"}},
+                status_code=app.state.fail_status
+            )
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "fake-model")
+        if body.get("stream"):
+            return StreamingResponse(stream_tokens(model, completion_id), media_type="text/event-stream")
+
+        content = app.state.reply
+        await asyncio.sleep(app.state.token_delay * len(tokenize(content)))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": sum(len(m.get("content", "").split()) for m in body.get("messages", [])),
+                "completion_tokens": len(content.split()),
+                "total_tokens": 0
+            }
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub LLM")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.25, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with --fail-status")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    app = create_app(
+        latency=args.latency,
+        token_delay=args.token_delay,
+        fail_rate=args.fail_rate,
+        fail_status=args.fail_status,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+        seed=args.seed
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
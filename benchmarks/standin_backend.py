@@ -0,0 +1,42 @@
+"""
+Run backend/server.py with an in-memory MongoDB stand-in (mongomock-motor).
+
+Every MongoDB-backed code path (write-behind inserts, session summaries,
+conversation pages, the mongo history store) runs as in production, just
+without a mongod, so benchmarks can exercise /api/sessions and
+/api/conversations anywhere. The stand-in is far slower than a real
+server for large collections; point BENCH_MONGO_URL at a mongod for
+database-bound numbers.
+
+    python -m benchmarks.standin_backend --port 8001
+"""
+import argparse
+import sys
+
+import uvicorn
+
+from benchmarks.utils import BACKEND_DIR
+
+sys.path.insert(0, BACKEND_DIR)
+
+
+def patch_database(server):
+    """Make the lifespan connect to an in-memory mock instead of MONGO_URL"""
+    from mongomock_motor import AsyncMongoMockClient
+
+    server.AsyncIOMotorClient = lambda url: AsyncMongoMockClient()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+
+    import server
+    patch_database(server)
+    uvicorn.run(server.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
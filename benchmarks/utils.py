@@ -0,0 +1,88 @@
+"""Shared helpers for spawning the backend and its stubs in benchmarks"""
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+UNREACHABLE_MONGO = "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=50"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def start_fake_llm(port: int, latency: float, extra_args=()) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_llm", "--port", str(port), "--latency", str(latency), *extra_args],
+        cwd=ROOT_DIR,
+    )
+    # FastAPI answers unknown GETs with 404, which is enough to know it's up
+    wait_for(f"http://127.0.0.1:{port}/")
+    return proc
+
+
+def start_backend(port: int, llm_port: int, env_overrides=None, mongo_standin: bool = False,
+                  workers: int = 0) -> subprocess.Popen:
+    """Start server.py against the stub LLM; with `mongo_standin`, on an in-memory MongoDB;
+    with `workers`, as that many processes through the serve.py entry point"""
+    env = dict(os.environ)
+    env.update({
+        "GROQ_API_KEY": "benchmark",
+        "LLM_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "MONGO_URL": env.get("BENCH_MONGO_URL", UNREACHABLE_MONGO),
+    })
+    env.update(env_overrides or {})
+    if mongo_standin:
+        command = [sys.executable, "-m", "benchmarks.standin_backend", "--port", str(port)]
+    elif workers:
+        env.update({"HOST": "127.0.0.1", "PORT": str(port), "WEB_CONCURRENCY": str(workers)})
+        env.setdefault("LOG_LEVEL", "WARNING")
+        command = [sys.executable, "serve.py"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1",
+                   "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(
+        command,
+        cwd=ROOT_DIR if mongo_standin else BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    wait_for(f"http://127.0.0.1:{port}/api/health")
+    return proc
+
+
+def stop(*procs):
+    for proc in procs:
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
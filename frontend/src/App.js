@@ -40,7 +40,7 @@ const App = () => {
     error: speechError,
     startListening,
     stopListening,
-    speakText,
+    queueSpeech,
     stopSpeaking,
     setRecognitionCallback
   } = useSpeech();
@@ -50,7 +50,7 @@ const App = () => {
     isConnected,
     error: chatError,
     messagesEndRef,
-    sendMessage,
+    sendMessageStream,
     clearConversation,
     clearConversationFromDB,
     loadConversation
@@ -92,10 +92,10 @@ const App = () => {
   }, [currentSessionId]);
 
   const handleSendMessage = async (textMessage, personaPreference) => {
-    const response = await sendMessage(textMessage, personaPreference);
-    if (response) {
-      speakText(response);
-    }
+    // Drop anything still being read out from the previous answer, then
+    // speak each sentence of the new one as soon as it is streamed in
+    stopSpeaking();
+    await sendMessageStream(textMessage, personaPreference, queueSpeech);
   };
 
   const handleSessionClick = async (sessionId) => {
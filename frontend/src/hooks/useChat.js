@@ -5,6 +5,8 @@ const useChat = (backendUrl, currentSessionId, updateSessionLastActive) => {
   const [isConnected, setIsConnected] = useState(false);
   const [error, setError] = useState('');
   const messagesEndRef = useRef(null);
+  // Messages being streamed right now, so a double submit doesn't send them twice
+  const inFlightRef = useRef(new Set());
 
   useEffect(() => {
     checkBackendConnection();
@@ -54,7 +56,8 @@ const useChat = (backendUrl, currentSessionId, updateSessionLastActive) => {
       id: Date.now(),
       type: 'user',
       text: textMessage,
-      timestamp: new Date().toLocaleTimeString()
+      timestamp: new Date().toLocaleTimeString(),
+      idempotencyKey: window.crypto?.randomUUID?.() || `${currentSessionId}-${Date.now()}-${Math.random().toString(36).slice(2)}`
     };
 
     setConversation(prev => [...prev, userMessage]);
@@ -77,6 +80,8 @@ const useChat = (backendUrl, currentSessionId, updateSessionLastActive) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          // Lets the backend answer a retried request with the stored result
+          'Idempotency-Key': userMessage.idempotencyKey,
         },
         body: JSON.stringify(requestBody),
       });
@@ -119,6 +124,135 @@ const useChat = (backendUrl, currentSessionId, updateSessionLastActive) => {
     }
   };
 
+  // Streaming variant of sendMessage: calls onSentence for each sentence as
+  // soon as the backend emits it, so speech can start before generation ends
+  const sendMessageStream = async (textMessage, personaPreference, onSentence) => {
+    if (!textMessage.trim()) return;
+
+    if (!currentSessionId) {
+      const errorMessage = {
+        id: Date.now() + 1,
+        type: 'error',
+        text: 'Error: No active session. Please create or select a session first.',
+        timestamp: new Date().toLocaleTimeString()
+      };
+      setConversation(prev => [...prev, errorMessage]);
+      setError('No active session');
+      return null;
+    }
+
+    const inFlightKey = `${currentSessionId}\n${personaPreference}\n${textMessage}`;
+    if (inFlightRef.current.has(inFlightKey)) return null;
+    inFlightRef.current.add(inFlightKey);
+
+    const userMessage = {
+      id: Date.now(),
+      type: 'user',
+      text: textMessage,
+      timestamp: new Date().toLocaleTimeString(),
+      idempotencyKey: window.crypto?.randomUUID?.() || `${currentSessionId}-${Date.now()}-${Math.random().toString(36).slice(2)}`
+    };
+    const aiMessageId = Date.now() + 1;
+
+    setConversation(prev => [...prev, userMessage]);
+
+    const updateAiMessage = (changes) => {
+      setConversation(prev => prev.map(msg => (
+        msg.id === aiMessageId ? { ...msg, ...changes } : msg
+      )));
+    };
+
+    try {
+      const requestBody = {
+        message: textMessage,
+        session_id: currentSessionId
+      };
+
+      if (personaPreference && personaPreference !== 'auto') {
+        requestBody.persona_preference = personaPreference;
+      }
+
+      const response = await fetch(`${backendUrl}/api/chat/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          // Lets the backend answer a retried request with the stored result
+          'Idempotency-Key': userMessage.idempotencyKey,
+        },
+        body: JSON.stringify(requestBody),
+      });
+
+      if (!response.ok) {
+        const errorText = await response.text();
+        console.error('Error response:', errorText);
+        throw new Error(`HTTP error! status: ${response.status}, body: ${errorText}`);
+      }
+
+      setConversation(prev => [...prev, {
+        id: aiMessageId,
+        type: 'ai',
+        text: '',
+        persona: '',
+        timestamp: new Date().toLocaleTimeString()
+      }]);
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let streamedText = '';
+      let finalResponse = null;
+
+      const handleEvent = (block) => {
+        let eventName = 'message';
+        let data = '';
+        block.split('\n').forEach(line => {
+          if (line.startsWith('event: ')) eventName = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        });
+        if (!data) return;
+        const payload = JSON.parse(data);
+
+        if (eventName === 'persona') {
+          updateAiMessage({ persona: payload.persona_used });
+        } else if (eventName === 'chunk') {
+          streamedText = streamedText ? `${streamedText} ${payload.text}` : payload.text;
+          updateAiMessage({ text: streamedText });
+          if (onSentence) onSentence(payload.text);
+        } else if (eventName === 'done') {
+          finalResponse = payload.response;
+          updateAiMessage({ text: payload.response, persona: payload.persona_used });
+        }
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop();
+        blocks.forEach(handleEvent);
+      }
+      if (buffer.trim()) handleEvent(buffer);
+
+      updateSessionLastActive(currentSessionId);
+
+      return finalResponse ?? streamedText;
+
+    } catch (err) {
+      const errorMessage = {
+        id: Date.now() + 2,
+        type: 'error',
+        text: `Error: ${err.message}`,
+        timestamp: new Date().toLocaleTimeString()
+      };
+      setConversation(prev => [...prev, errorMessage]);
+      setError(err.message);
+      return null;
+    } finally {
+      inFlightRef.current.delete(inFlightKey);
+    }
+  };
+
   const clearConversation = () => {
     setConversation([]);
   };
@@ -168,6 +302,7 @@ const useChat = (backendUrl, currentSessionId, updateSessionLastActive) => {
     error,
     messagesEndRef,
     sendMessage,
+    sendMessageStream,
     clearConversation,
     clearConversationFromDB,
     loadConversation,
@@ -72,12 +72,25 @@ const useSessions = (backendUrl) => {
         : session
     ));
     
-    // Load conversation history from backend
+    // Load conversation history from backend, one page at a time
     try {
-      const response = await fetch(`${backendUrl}/api/conversations/${sessionId}`);
-      if (response.ok) {
+      const conversations = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({
+          limit: '200',
+          fields: 'user_message,ai_response,persona_name,timestamp'
+        });
+        if (cursor) params.set('after', cursor);
+        const response = await fetch(`${backendUrl}/api/conversations/${sessionId}?${params}`);
+        if (!response.ok) break;
         const data = await response.json();
-        return data.conversations.map(conv => [
+        conversations.push(...data.conversations);
+        cursor = data.next_cursor;
+      } while (cursor);
+
+      if (conversations.length > 0) {
+        return conversations.map(conv => [
           {
             id: Date.now() + Math.random(),
             type: 'user',
@@ -7,6 +7,7 @@ const useSpeech = () => {
   
   const recognitionRef = useRef(null);
   const synthRef = useRef(null);
+  const pendingUtterancesRef = useRef(0);
 
   useEffect(() => {
     // Initialize Speech Recognition
@@ -72,9 +73,32 @@ const useSpeech = () => {
     }
   };
 
+  // Queue a sentence behind whatever is already being spoken. Used for
+  // streamed responses, where sentences arrive one at a time.
+  const queueSpeech = (text) => {
+    if (!synthRef.current || !text) return;
+
+    const utterance = new SpeechSynthesisUtterance(text);
+    utterance.rate = 0.9;
+    utterance.pitch = 1;
+    utterance.volume = 1;
+
+    const finish = () => {
+      pendingUtterancesRef.current = Math.max(0, pendingUtterancesRef.current - 1);
+      if (pendingUtterancesRef.current === 0) setIsSpeaking(false);
+    };
+    utterance.onstart = () => setIsSpeaking(true);
+    utterance.onend = finish;
+    utterance.onerror = finish;
+
+    pendingUtterancesRef.current += 1;
+    synthRef.current.speak(utterance);
+  };
+
   const stopSpeaking = () => {
     if (synthRef.current) {
       synthRef.current.cancel();
+      pendingUtterancesRef.current = 0;
       setIsSpeaking(false);
     }
   };
@@ -92,6 +116,7 @@ const useSpeech = () => {
     startListening,
     stopListening,
     speakText,
+    queueSpeech,
     stopSpeaking,
     setRecognitionCallback
   };
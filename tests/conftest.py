@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Keep server.py imports fast and offline: no real Groq key, unreachable Mongo
+os.environ.setdefault('GROQ_API_KEY', 'test-key')
+os.environ.setdefault('MONGO_URL', 'mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=50')
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import struct
+import time
+from types import SimpleNamespace
+
+
+def make_completion(content):
+    """Build an object shaped like an OpenAI chat completion"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+    )
+
+
+def make_stream_chunk(content):
+    """Build an object shaped like a streamed chat completion chunk"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(delta=SimpleNamespace(content=content))]
+    )
+
+
+class FakeStream:
+    """Async iterator over streamed chunks with a delay between tokens"""
+
+    def __init__(self, tokens, token_delay=0.0):
+        self.tokens = list(tokens)
+        self.token_delay = token_delay
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.tokens:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.token_delay)
+        return make_stream_chunk(self.tokens.pop(0))
+
+
+class FakeAsyncLLM:
+    """Async client stand-in that records calls and sleeps for `delay` seconds"""
+
+    def __init__(self, delay=0.0, reply="Hello from the fake LLM.", token_delay=0.0):
+        self.delay = delay
+        self.reply = reply
+        self.token_delay = token_delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if kwargs.get("stream"):
+            tokens = [word + " " for word in self.reply.split(" ")]
+            tokens[-1] = tokens[-1].rstrip()
+            return FakeStream(tokens, self.token_delay)
+        return make_completion(self.reply)
+
+
+class FakeSyncLLM:
+    """Blocking client stand-in, like the plain Groq SDK"""
+
+    def __init__(self, delay=0.0, reply="Hello from the fake LLM."):
+        self.delay = delay
+        self.reply = reply
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        time.sleep(self.delay)
+        return make_completion(self.reply)
+
+
+class FakeCollection:
+    """Minimal async stand-in for a motor collection's insert_many"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.docs = []
+        self.batches = []
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("insert failed")
+        self.batches.append(len(docs))
+        self.docs.extend(docs)
+
+
+def parse_sse(body):
+    """(event, data) pairs of a server-sent event stream"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def pcm_tone(milliseconds, amplitude=3000, sample_rate=16000):
+    """16-bit mono PCM alternating between +/- amplitude (loud enough to count as speech)"""
+    samples = sample_rate * milliseconds // 1000
+    return struct.pack(f"<{samples}h", *[amplitude if i % 2 else -amplitude for i in range(samples)])
+
+
+def pcm_silence(milliseconds, sample_rate=16000):
+    return bytes(sample_rate * milliseconds // 1000 * 2)
+
+
+class FakeRecognitionStream:
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.received = 0
+
+    def accept(self, pcm):
+        self.received += len(pcm)
+        self.recognizer.views.append(type(pcm).__name__)
+        return f"heard {self.received} bytes"
+
+    def finish(self):
+        return self.recognizer.transcript if self.received else ""
+
+
+class FakeRecognizer:
+    """Speech recognizer stand-in that "hears" a fixed transcript"""
+
+    name = "fake"
+
+    def __init__(self, transcript="I am so worried about my exams"):
+        self.transcript = transcript
+        self.views = []
+
+    def stream(self, sample_rate):
+        return FakeRecognitionStream(self)
+
+
+class FakeSynthesizer:
+    """Speech synthesizer stand-in: two bytes of "audio" per character"""
+
+    name = "fake"
+    sample_rate = 22050
+
+    def __init__(self):
+        self.sentences = []
+
+    def synthesize(self, text):
+        self.sentences.append(text)
+        return b"\x01\x00" * len(text)
+
+
+class ASGIWebSocket:
+    """In-process WebSocket client for an ASGI app"""
+
+    def __init__(self, app, path):
+        self.app = app
+        self.path = path
+        self.inbound = asyncio.Queue()
+        self.outbound = asyncio.Queue()
+        self.task = None
+
+    async def __aenter__(self):
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": self.path,
+            "raw_path": self.path.encode(), "root_path": "", "query_string": b"", "headers": [],
+            "client": ("127.0.0.1", 50000), "server": ("test", 80), "subprotocols": []
+        }
+        self.task = asyncio.ensure_future(self.app(scope, self.inbound.get, self.outbound.put))
+        await self.inbound.put({"type": "websocket.connect"})
+        assert (await self.outbound.get())["type"] == "websocket.accept"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.inbound.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self.task, 5)
+
+    async def send_json(self, data):
+        await self.inbound.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def send_bytes(self, data):
+        await self.inbound.put({"type": "websocket.receive", "bytes": data})
+
+    async def receive(self):
+        """Next message from the app: a dict for text (JSON), bytes for binary, None once closed"""
+        message = await asyncio.wait_for(self.outbound.get(), 5)
+        if message["type"] == "websocket.close":
+            return None
+        if message.get("bytes") is not None:
+            return message["bytes"]
+        return json.loads(message["text"])
@@ -0,0 +1,265 @@
+import asyncio
+
+import httpx
+import pytest
+
+import server
+from starlette.requests import Request
+from admission import AdmissionController, MongoRateLimiter, Overloaded, RateLimiter
+from singleflight import IdempotencyStore, SingleFlight
+from tests.fakes import FakeAsyncLLM
+
+
+def test_rate_limiter_allows_burst_then_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("admission.time.monotonic", lambda: now[0])
+    limiter = RateLimiter(rate=2, burst=3)
+
+    for _ in range(3):
+        limiter.check("a")
+    with pytest.raises(Overloaded) as excinfo:
+        limiter.check("a")
+    assert excinfo.value.retry_after == pytest.approx(0.5)
+    assert excinfo.value.retry_after_header == "1"
+    # Other keys have their own bucket
+    limiter.check("b")
+
+    now[0] += 0.5
+    limiter.check("a")
+    assert limiter.stats == {"allowed": 5, "limited": 1}
+
+
+def test_rate_limiter_bounds_tracked_keys_and_can_be_disabled():
+    limiter = RateLimiter(rate=1, burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.check(key)
+    assert list(limiter.buckets) == ["b", "c"]
+
+    disabled = RateLimiter(rate=0, burst=1)
+    for _ in range(100):
+        disabled.check("a")
+    assert len(disabled) == 0
+
+
+def test_mongo_rate_limiter_is_shared_between_workers(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    monkeypatch.setattr("admission.time.time", lambda: 1000.0)
+    collection = mongomock_motor.AsyncMongoMockClient().saarthi.rate_limits
+    # Two workers' limiters on the same collection: 3 requests per 3s window in total
+    workers = [MongoRateLimiter(collection, "session", rate=1, burst=3) for _ in range(2)]
+
+    async def run():
+        await workers[0].check_shared("a")
+        await workers[1].check_shared("a")
+        await workers[0].check_shared("a")
+        with pytest.raises(Overloaded) as excinfo:
+            await workers[1].check_shared("a")
+        await workers[1].check_shared("b")
+        return excinfo.value
+
+    error = asyncio.run(run())
+    assert error.retry_after == pytest.approx(2.0)
+    assert workers[1].stats["limited"] == 1
+
+
+def test_mongo_rate_limiter_falls_back_to_local_buckets():
+    limiter = MongoRateLimiter(None, "ip", rate=1, burst=1)
+
+    async def run():
+        await limiter.check_shared("a")
+        with pytest.raises(Overloaded):
+            await limiter.check_shared("a")
+
+    asyncio.run(run())
+    assert len(limiter) == 1
+
+
+def test_admission_caps_concurrency_and_serves_priority_first():
+    admission = AdmissionController(max_concurrent=2, max_queue=10)
+    order = []
+    running = [0]
+    peak = [0]
+
+    async def turn(name, priority):
+        admitted_at = await admission.acquire(priority)
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        order.append(name)
+        await asyncio.sleep(0.02)
+        running[0] -= 1
+        admission.release(admitted_at)
+
+    async def run():
+        tasks = [asyncio.ensure_future(turn(f"general-{i}", 1)) for i in range(4)]
+        await asyncio.sleep(0)
+        # Arrives last but jumps every queued general request
+        tasks.append(asyncio.ensure_future(turn("mental_health", 0)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert peak[0] == 2
+    assert order[:3] == ["general-0", "general-1", "mental_health"]
+    assert admission.active == 0 and admission.waiting == 0
+
+
+def test_full_queue_sheds_or_displaces_by_priority():
+    admission = AdmissionController(max_concurrent=1, max_queue=1)
+
+    async def run():
+        held = await admission.acquire(1)
+        queued = asyncio.ensure_future(admission.acquire(1))
+        await asyncio.sleep(0)
+
+        # Same priority as the waiter: refused straight away
+        with pytest.raises(Overloaded):
+            await admission.acquire(1)
+
+        # Higher priority: the queued general request is refused instead
+        urgent = asyncio.ensure_future(admission.acquire(0))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as excinfo:
+            await queued
+        assert excinfo.value.reason.startswith("Displaced")
+
+        admission.release(held)
+        admission.release(await urgent)
+
+    asyncio.run(run())
+    assert admission.stats["shed_queue_full"] == 1
+    assert admission.stats["displaced"] == 1
+    assert admission.active == 0 and admission.waiting == 0
+
+
+def test_queue_timeout_sheds_and_frees_the_place():
+    admission = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.02)
+
+    async def run():
+        held = await admission.acquire()
+        with pytest.raises(Overloaded) as excinfo:
+            await admission.acquire()
+        assert excinfo.value.retry_after > 0
+        admission.release(held)
+        admission.release(await admission.acquire())
+
+    asyncio.run(run())
+    assert admission.stats["shed_timeout"] == 1
+    assert admission.active == 0 and admission.waiting == 0
+
+
+@pytest.fixture
+def overload_env(monkeypatch):
+    llm = FakeAsyncLLM(delay=0.05)
+    monkeypatch.setattr(server, "db", None)
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    monkeypatch.setattr(server, "Saarthi_system", server.SaarthiAgentSystem())
+    monkeypatch.setattr(server, "chat_flight", SingleFlight())
+    monkeypatch.setattr(server, "idempotent_results", IdempotencyStore())
+    monkeypatch.setattr(server, "chat_admission", AdmissionController(max_concurrent=4, max_queue=8, queue_timeout=5))
+    monkeypatch.setattr(server, "session_limiter", RateLimiter(rate=1, burst=2))
+    monkeypatch.setattr(server, "ip_limiter", RateLimiter(rate=0, burst=1))
+
+    async def store_conversation(message_id, request, result, idempotency_key=None):
+        pass
+
+    monkeypatch.setattr(server, "store_conversation", store_conversation)
+    return llm
+
+
+def run_load(requests, path="/api/chat"):
+    """Fire every (message, session_id) request at once against the app"""
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[
+                client.post(path, json={"message": message, "session_id": session_id})
+                for message, session_id in requests
+            ])
+    return asyncio.run(run())
+
+
+def test_burst_is_shed_with_429_instead_of_overloading_the_llm(overload_env):
+    llm = overload_env
+
+    responses = run_load([(f"hello {i}", f"s{i}") for i in range(40)])
+
+    statuses = [r.status_code for r in responses]
+    # 4 running + 8 queued are served; the rest are refused fast
+    assert statuses.count(200) == 12
+    assert statuses.count(429) == 28
+    assert all(r.headers["Retry-After"].isdigit() for r in responses if r.status_code == 429)
+    assert llm.max_in_flight <= 4
+
+
+def test_streamed_burst_is_shed_with_429_instead_of_overloading_the_llm(overload_env):
+    llm = overload_env
+
+    responses = run_load([(f"hello {i}", f"s{i}") for i in range(40)], path="/api/chat/stream")
+
+    statuses = [r.status_code for r in responses]
+    assert statuses.count(200) == 12
+    assert statuses.count(429) == 28
+    assert all(r.headers["Retry-After"].isdigit() for r in responses if r.status_code == 429)
+    assert all("event: done" in r.text for r in responses if r.status_code == 200)
+    assert llm.max_in_flight <= 4
+    # Every slot is handed back once its stream ends
+    assert server.chat_admission.active == 0 and server.chat_admission.waiting == 0
+
+
+def test_mental_health_traffic_survives_a_general_burst(overload_env):
+    general = [(f"hello {i}", f"g{i}") for i in range(30)]
+    urgent = [(f"I feel so anxious and overwhelmed {i}", f"m{i}") for i in range(5)]
+
+    responses = run_load(general + urgent)
+
+    assert all(r.status_code == 200 for r in responses[len(general):])
+    assert server.chat_admission.stats["displaced"] > 0
+
+
+def test_session_rate_limit_returns_429(overload_env):
+    responses = run_load([(f"hello {i}", "same-session") for i in range(4)])
+
+    statuses = sorted(r.status_code for r in responses)
+    assert statuses == [200, 200, 429, 429]
+    assert server.session_limiter.stats["limited"] == 2
+
+
+def connection(peer, forwarded_for=None):
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "client": (peer, 50000), "headers": headers})
+
+
+def test_client_ip_trusts_forwarded_for_only_from_configured_proxies(monkeypatch):
+    forwarded = "198.51.100.7, 203.0.113.9, 10.0.0.7"
+    assert server.client_ip(connection("10.1.2.3", forwarded)) == "10.1.2.3"
+
+    monkeypatch.setattr(server, "trusted_proxies", server.parse_networks("10.0.0.0/8, not-an-ip"))
+    # The nearest hop outside the proxies; the client can forge anything before it
+    assert server.client_ip(connection("10.1.2.3", forwarded)) == "203.0.113.9"
+    assert server.client_ip(connection("10.1.2.3", "10.0.0.8")) == "10.0.0.8"
+    assert server.client_ip(connection("10.1.2.3")) == "10.1.2.3"
+    assert server.client_ip(connection("192.0.2.1", forwarded)) == "192.0.2.1"
+
+
+def test_ip_limit_is_per_client_behind_a_proxy_and_replays_skip_limits(overload_env, monkeypatch):
+    monkeypatch.setattr(server, "trusted_proxies", server.parse_networks("10.0.0.5"))
+    monkeypatch.setattr(server, "ip_limiter", RateLimiter(rate=0.01, burst=1))
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app, client=("10.0.0.5", 443))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def post(session_id, ip, key=None):
+                headers = {"X-Forwarded-For": ip, **({"Idempotency-Key": key} if key else {})}
+                return await client.post("/api/chat", json={"message": "hello", "session_id": session_id},
+                                         headers=headers)
+            first = await post("a", "203.0.113.1", key="k1")
+            other_client = await post("b", "203.0.113.2")
+            same_client = await post("c", "203.0.113.1")
+            replay = await post("a", "203.0.113.1", key="k1")
+        return first, other_client, same_client, replay
+
+    first, other_client, same_client, replay = asyncio.run(run())
+    assert first.status_code == other_client.status_code == 200
+    assert same_client.status_code == 429
+    # A retry of a completed request is answered from the stored result, not refused
+    assert replay.status_code == 200 and replay.json() == first.json()
@@ -0,0 +1,150 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+import server
+from archive import (
+    ConversationArchiver,
+    archive_conversations,
+    ensure_archive_indexes,
+    expire_conversations,
+    pack_chunk,
+    unpack_chunk,
+)
+from history import MongoHistoryStore
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+NOW = datetime.utcnow().replace(microsecond=0)
+PERSONAS = ("general", "education", "mental_health")
+
+
+def turn(session_id, i, age_days, **extra):
+    request = server.ConversationRequest(message=f"question {i}", session_id=session_id)
+    result = {"response": f"answer {i} " * 20, "persona_used": PERSONAS[i % 3], "persona_name": "unused", **extra}
+    doc = server.conversation_document(f"{session_id}-{i:03d}", request, result)
+    # Pairs of turns share a timestamp so the _id tie-breaker matters
+    doc["timestamp"] = NOW - timedelta(days=age_days) + timedelta(seconds=i // 2)
+    return doc
+
+
+@pytest.fixture
+def archived_db(monkeypatch):
+    """`long` has 25 turns from 60 days ago and 6 from today; `other` has 3 old ones"""
+    db = mongomock_motor.AsyncMongoMockClient().Saarthi_db2
+
+    async def seed():
+        docs = [turn("long", i, 60 if i < 25 else 0) for i in range(31)]
+        docs += [turn("other", i, 90, error="timeout" if i == 1 else None) for i in range(3)]
+        await db.conversations.insert_many(docs)
+        await ensure_archive_indexes(db.conversation_archive)
+        return await archive_conversations(db.conversations, db.conversation_archive,
+                                           NOW - timedelta(days=30), chunk_turns=10)
+
+    stats = asyncio.run(seed())
+    monkeypatch.setattr(server, "db", db)
+    return db, stats
+
+
+def test_chunks_store_compact_rows_and_round_trip():
+    turns = [turn("s", i, 1, error="boom" if i == 2 else None) for i in range(4)]
+    assert "persona_name" not in turns[0] and "error" not in turns[0]
+    chunk = pack_chunk(turns, "zlib")
+    assert (chunk["_id"], chunk["count"], chunk["start"], chunk["end"]) == ("s-000", 4, turns[0]["timestamp"], turns[-1]["timestamp"])
+    raw = sum(len(json.dumps(t, default=str)) for t in turns)
+    assert len(chunk["data"]) < raw / 4
+    assert unpack_chunk(chunk) == turns
+    assert unpack_chunk(chunk)[2]["error"] == "boom"
+
+
+def test_old_turns_move_to_chunks_and_a_rerun_is_a_no_op(archived_db):
+    db, stats = archived_db
+
+    async def state():
+        hot = await db.conversations.distinct("_id")
+        chunks = await db.conversation_archive.find({}, {"data": 0}).sort([("session_id", 1), ("start", 1)]).to_list(None)
+        again = await archive_conversations(db.conversations, db.conversation_archive, NOW - timedelta(days=30))
+        return hot, chunks, again
+
+    hot, chunks, again = asyncio.run(state())
+    assert (stats["turns"], stats["chunks"]) == (28, 4)
+    assert sorted(hot) == [f"long-{i:03d}" for i in range(25, 31)]
+    assert [(c["_id"], c["count"]) for c in chunks] == [("long-000", 10), ("long-010", 10), ("long-020", 5), ("other-000", 3)]
+    assert again["turns"] == 0
+
+
+def fetch(session_id, *requests):
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(f"/api/conversations/{session_id}", params=params) for params in requests]
+    return asyncio.run(run())
+
+
+def test_history_pages_read_across_archived_and_hot_turns(archived_db):
+    seen, params = [], {"limit": 7}
+    while True:
+        page = fetch("long", params)[0].json()
+        seen.extend(conv["user_message"] for conv in page["conversations"])
+        if not page["next_cursor"]:
+            break
+        last = page
+        params = {"limit": 7, "after": page["next_cursor"]}
+    assert seen == [f"question {i}" for i in range(31)]
+
+    # Backwards from the last page crosses from hot turns into the archive
+    previous = fetch("long", {"limit": 7, "before": page["prev_cursor"]})[0].json()
+    assert [conv["user_message"] for conv in previous["conversations"]] == [f"question {i}" for i in range(21, 28)]
+    assert last["conversations"] == previous["conversations"]
+
+    exported = fetch("long", {"format": "ndjson", "fields": "user_message,persona_name,error"})[0]
+    lines = [json.loads(line) for line in exported.text.splitlines()]
+    assert len(lines) == 31
+    assert lines[4] == {"user_message": "question 4", "persona_name": "Education Specialist", "error": None}
+    assert lines[28]["persona_name"] == "Education Specialist"
+
+    other = fetch("other", {})[0].json()["conversations"]
+    assert [conv["error"] for conv in other] == [None, "timeout", None]
+    assert other[0]["persona_name"] == "General Assistant" and "_id" not in other[0]
+
+
+def test_deleting_a_session_clears_its_archive(archived_db, monkeypatch):
+    db, _ = archived_db
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.delete("/api/conversations/long")
+        return response, await db.conversation_archive.count_documents({"session_id": "long"})
+
+    response, remaining = asyncio.run(run())
+    assert response.json()["deleted_count"] == 31
+    assert remaining == 0
+
+
+def test_context_is_rehydrated_from_the_archive_for_idle_sessions(archived_db):
+    db, _ = archived_db
+    store = MongoHistoryStore(db.session_history, db.conversations, max_messages=8, archive=db.conversation_archive)
+    messages = asyncio.run(store.get("other"))
+    assert messages[0::2] == ["question 0", "question 1", "question 2"]
+
+
+def test_retention_and_the_archiver_lease(archived_db):
+    db, _ = archived_db
+
+    async def run():
+        first = ConversationArchiver(db, archive_after=0, retain_days=75, interval=60)
+        second = ConversationArchiver(db, archive_after=0, retain_days=75, interval=60)
+        ran = [await first.run_once(), await second.run_once()]
+        remaining = await db.conversation_archive.distinct("session_id")
+        expired = await expire_conversations(db, NOW - timedelta(days=365))
+        return ran, first.stats, remaining, expired
+
+    ran, stats, remaining, expired = asyncio.run(run())
+    assert ran == [True, False]
+    assert stats["runs"] == 1
+    assert remaining == ["long"]
+    assert expired == {"turns": 0, "chunks": 0, "sessions": 0}
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import server
+from tests.fakes import FakeAsyncLLM, FakeSyncLLM
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(server, "db", None)
+    return server.SaarthiAgentSystem()
+
+
+def use_client(monkeypatch, client, is_async):
+    monkeypatch.setattr(server, "groq_client", client)
+    monkeypatch.setattr(server, "groq_client_is_async", is_async)
+
+
+def test_concurrent_sessions_overlap_with_async_client(monkeypatch, agent):
+    llm = FakeAsyncLLM(delay=0.2)
+    use_client(monkeypatch, llm, True)
+
+    async def run():
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            agent.generate_response("hello", f"session-{i}") for i in range(10)
+        ])
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    assert all(r["response"] == llm.reply for r in results)
+    assert llm.max_in_flight == 10
+    assert elapsed < 1.0
+
+
+def test_sync_client_is_offloaded_to_threads(monkeypatch, agent):
+    llm = FakeSyncLLM(delay=0.2)
+    use_client(monkeypatch, llm, False)
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            agent.generate_response("hello", f"session-{i}") for i in range(5)
+        ])
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) < 0.8
+    assert len(llm.calls) == 5
+
+
+def test_concurrency_limit_is_respected(monkeypatch, agent):
+    llm = FakeAsyncLLM(delay=0.05)
+    use_client(monkeypatch, llm, True)
+    agent.llm_semaphore = asyncio.Semaphore(2)
+
+    async def run():
+        await asyncio.gather(*[
+            agent.generate_response("hello", f"session-{i}") for i in range(8)
+        ])
+
+    asyncio.run(run())
+    assert llm.max_in_flight == 2
+
+
+def test_health_responds_while_chat_in_flight(monkeypatch):
+    monkeypatch.setattr(server, "db", None)
+    use_client(monkeypatch, FakeAsyncLLM(delay=0.5), True)
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            chat = asyncio.create_task(client.post(
+                "/api/chat", json={"message": "hello", "session_id": "health-check"}
+            ))
+            await asyncio.sleep(0.05)
+            start = time.perf_counter()
+            health = await client.get("/api/health")
+            health_latency = time.perf_counter() - start
+            chat_response = await chat
+            return health, health_latency, chat_response
+
+    health, health_latency, chat_response = asyncio.run(run())
+    assert health.status_code == 200
+    assert health_latency < 0.25
+    assert chat_response.status_code == 200
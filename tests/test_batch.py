@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import server
+from admission import AdmissionController
+from batch import group_rows, parse_rows, run_groups
+from singleflight import SingleFlight
+from tests.fakes import FakeAsyncLLM
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+ROWS = [
+    {"session_id": "qa-1", "message": "I feel so stressed about work"},
+    {"session_id": "qa-2", "message": "Can you help with my math homework?"},
+    {"session_id": "qa-1", "message": "What should I do tonight?"},
+    "not json",
+    {"session_id": "qa-3", "message": "Tell me a fun fact", "persona_preference": "education"},
+    {"session_id": "qa-2", "message": "   "},
+]
+
+
+def to_jsonl(rows):
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n\n"
+
+
+def test_rows_are_grouped_by_session_in_input_order_and_sorted_by_persona():
+    rows = parse_rows(to_jsonl(ROWS).splitlines(), lambda data: server.ConversationRequest(**data))
+    assert [row.line for row in rows] == [1, 2, 3, 4, 5, 6]
+    assert "Message cannot be empty" in rows[5].error and rows[3].error
+    for row, persona in zip(rows, ["mental_health", "education", "general", None, "education", None]):
+        row.persona = persona
+
+    groups = group_rows(rows)
+    assert [[row.line for row in group] for group in groups] == [[2], [5], [1, 3]]
+
+
+def test_pool_runs_each_group_in_order_with_bounded_concurrency():
+    rows = parse_rows([json.dumps({"session_id": f"s{i % 4}", "message": f"m{i}"}) for i in range(12)],
+                      lambda data: server.ConversationRequest(**data))
+    running, peak, seen = set(), 0, {}
+
+    async def run_row(row):
+        nonlocal peak
+        session = row.request.session_id
+        assert session not in running
+        running.add(session)
+        peak = max(peak, len(running))
+        await asyncio.sleep(0.01)
+        running.discard(session)
+        seen.setdefault(session, []).append(row.line)
+        return row.line
+
+    async def run():
+        return [line async for line in run_groups(group_rows(rows), run_row, concurrency=2)]
+
+    assert sorted(asyncio.run(run())) == list(range(1, 13))
+    assert peak == 2
+    assert seen["s0"] == [1, 5, 9]
+
+
+@pytest.fixture
+def batch_env(monkeypatch):
+    llm = FakeAsyncLLM(delay=0.01, reply="Here is a thoughtful answer.")
+    db = mongomock_motor.AsyncMongoMockClient().Saarthi_db2
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    monkeypatch.setattr(server, "Saarthi_system", server.SaarthiAgentSystem())
+    monkeypatch.setattr(server, "chat_flight", SingleFlight())
+    monkeypatch.setattr(server, "chat_admission", AdmissionController(max_concurrent=4))
+    monkeypatch.setattr(server, "BATCH_API_KEY", "qa-secret")
+    return llm, db
+
+
+def post_batch(*requests):
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.post(url, content=body, headers=headers) for url, body, headers in requests]
+    return asyncio.run(run())
+
+
+KEY = {"X-Batch-Key": "qa-secret"}
+
+
+def test_batch_endpoint_classifies_once_streams_ndjson_and_bulk_stores(batch_env, monkeypatch):
+    llm, db = batch_env
+    classified = []
+    classify_batch = server.Saarthi_system.classify_batch
+    monkeypatch.setattr(server.Saarthi_system, "classify_batch",
+                        lambda messages: classified.append(list(messages)) or classify_batch(messages))
+    monkeypatch.setattr(server.Saarthi_system, "classify_persona",
+                        lambda *args: pytest.fail("rows are classified in the batch pass"))
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/chat/batch?concurrency=2", content=to_jsonl(ROWS), headers=KEY)
+        stored = await db.conversations.find({}, {"_id": 0, "session_id": 1, "user_message": 1, "persona_used": 1}).to_list(None)
+        sessions = await db.sessions.find({}).to_list(None)
+        return response, stored, sessions
+
+    response, stored, sessions = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    results, summary = lines[:-1], lines[-1]
+
+    assert len(classified) == 1 and len(classified[0]) == 4
+    assert sorted(result["line"] for result in results) == [1, 2, 3, 4, 5, 6]
+    by_line = {result["line"]: result for result in results}
+    assert by_line[1]["persona_used"] == "mental_health"
+    assert by_line[2]["persona_used"] == "education"
+    assert by_line[5]["persona_used"] == "education"
+    assert by_line[1]["response"] == llm.reply and by_line[1]["message_id"]
+    assert by_line[4]["error"] and by_line[6]["error"]
+    # The second turn of qa-1 was answered with the first one in its context
+    follow_up = next(call["messages"] for call in llm.calls if call["messages"][-1]["content"] == "What should I do tonight?")
+    assert {"role": "user", "content": "I feel so stressed about work"} in follow_up
+
+    assert summary["type"] == "summary"
+    assert (summary["rows"], summary["succeeded"], summary["failed"], summary["invalid"], summary["stored"]) == (6, 4, 2, 2, 4)
+    assert summary["personas"] == {"mental_health": 1, "education": 2, "general": 1}
+    assert summary["rows_per_second"] > 0
+    assert len(stored) == 4
+    assert {s["_id"]: s["message_count"] for s in sessions} == {"qa-1": 2, "qa-2": 1, "qa-3": 1}
+
+
+def test_batch_endpoint_rejects_empty_and_oversized_batches(batch_env, monkeypatch):
+    monkeypatch.setattr(server, "BATCH_MAX_ROWS", 2)
+    empty, oversized = post_batch(("/api/chat/batch", "\n", KEY), ("/api/chat/batch", to_jsonl(ROWS[:3]), KEY))
+    assert empty.status_code == 400
+    assert oversized.status_code == 413
+
+
+def test_batch_endpoint_needs_the_configured_key(batch_env, monkeypatch):
+    llm, _ = batch_env
+    body = to_jsonl(ROWS[:1])
+    missing, wrong = post_batch(("/api/chat/batch", body, {}), ("/api/chat/batch", body, {"X-Batch-Key": "guess"}))
+    assert missing.status_code == 401 and wrong.status_code == 401
+    monkeypatch.setattr(server, "BATCH_API_KEY", None)
+    disabled, = post_batch(("/api/chat/batch", body, KEY))
+    assert disabled.status_code == 404
+    assert llm.calls == []
+
+
+def test_batch_rows_wait_behind_live_chat_in_the_admission_queue(batch_env, monkeypatch):
+    llm, _ = batch_env
+    admission = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=5)
+    monkeypatch.setattr(server, "chat_admission", admission)
+    order = []
+
+    async def collect(items):
+        return [item async for item in items]
+
+    async def run():
+        held = await admission.acquire()
+        rows = server.parse_batch([json.dumps({"session_id": "qa", "message": "batch row"})])
+        batch = asyncio.create_task(collect(server.run_batch(rows)))
+        await asyncio.sleep(0.05)
+        assert admission.waiting == 1
+        # A live turn displaces the waiting batch row from the full queue and goes first
+        live = asyncio.create_task(admission.acquire(priority=1))
+        await asyncio.sleep(0)
+        admission.release(held)
+        await live
+        order.append("live")
+        admission.release()
+        result = await batch
+        order.append("batch")
+        return result
+
+    result, summary = asyncio.run(run())
+    assert order == ["live", "batch"]
+    assert result["response"] == llm.reply and summary["stored"] == 1
+    assert admission.active == 0 and admission.stats["displaced"] == 1
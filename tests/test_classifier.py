@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import server
+from classifier import KeywordClassifier
+from persona_classification_test import CLASSIFIER_CASES
+
+
+@pytest.fixture
+def agent():
+    return server.SaarthiAgentSystem()
+
+
+@pytest.mark.parametrize("message,expected", CLASSIFIER_CASES)
+def test_classifier_cases(agent, message, expected):
+    assert agent.classify_persona(message, "test") == expected
+
+
+def test_scores_count_hits_per_persona(agent):
+    scores = agent.persona_scores("Explain how to study when stressed and worried")
+    assert scores == {"general": 2, "education": 2, "mental_health": 2}
+
+
+def test_multi_word_keywords_match_across_whitespace():
+    classifier = KeywordClassifier({"general": ["tell me"]}, priority=["general"], default="none")
+    assert classifier.classify("Tell   me more") == "general"
+    assert classifier.classify("Tell them") == "none"
+
+
+def test_reload_keywords_swaps_classifier(agent):
+    assert agent.classify_persona("I need help with chemistry", "test") == "general"
+    agent.reload_keywords({"education": ["chemistry"]})
+    assert agent.classify_persona("I need help with chemistry", "test") == "education"
+    assert agent.personas["education"].keywords == ["chemistry"]
+    with pytest.raises(ValueError):
+        agent.reload_keywords({"astrology": ["stars"]})
+
+
+def test_reload_endpoint_reads_keywords_file(tmp_path, monkeypatch):
+    keywords_file = tmp_path / "keywords.json"
+    keywords_file.write_text(json.dumps({"education": ["chemistry", "physics"]}))
+    monkeypatch.setattr(server, "PERSONA_KEYWORDS_FILE", str(keywords_file))
+    monkeypatch.setattr(server, "Saarthi_system", server.SaarthiAgentSystem())
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/personas/reload")
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.json()["education"] == ["chemistry", "physics"]
+    assert server.Saarthi_system.classify_persona("chemistry is hard", "test") == "education"
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+import server
+from context import ApproxTokenCounter, ContextBuilder
+from tests.fakes import FakeAsyncLLM
+
+
+class WordCounter:
+    """One token per word, so budgets in tests are easy to reason about"""
+
+    name = "words"
+
+    def __init__(self):
+        self.calls = 0
+
+    def count(self, text):
+        self.calls += 1
+        return len(text.split())
+
+
+def test_approx_counter_rounds_up():
+    counter = ApproxTokenCounter()
+    assert counter.count("") == 1
+    assert counter.count("abcd") == 1
+    assert counter.count("abcde") == 2
+
+
+def test_builder_fills_budget_from_newest_exchange():
+    builder = ContextBuilder(WordCounter(), budget=9)
+    history = ["one two", "three four", "five six", "seven eight", "nine ten", "eleven twelve"]
+
+    messages, evicted = builder.build("s", history)
+
+    assert evicted == ["one two", "three four"]
+    assert messages == [
+        {"role": "user", "content": "five six"},
+        {"role": "assistant", "content": "seven eight"},
+        {"role": "user", "content": "nine ten"},
+        {"role": "assistant", "content": "eleven twelve"},
+    ]
+
+
+def test_builder_skips_exchange_larger_than_budget():
+    builder = ContextBuilder(WordCounter(), budget=3)
+    assert builder.build("s", ["a b c", "d e f"]) == ([], ["a b c", "d e f"])
+
+
+def test_builder_drops_dangling_message_to_keep_roles_alternating():
+    builder = ContextBuilder(WordCounter(), budget=100)
+    messages, _ = builder.build("s", ["orphan reply", "q", "a"])
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[0]["content"] == "q"
+
+
+def test_summary_is_prepended_and_counts_towards_budget():
+    builder = ContextBuilder(WordCounter(), budget=7)
+    history = ["q1 q1", "a1 a1", "q2 q2", "a2 a2"]
+
+    messages, evicted = builder.build("s", history, summary="they said hello")
+
+    assert messages[0] == {"role": "system", "content": "Summary of the conversation so far:\nthey said hello"}
+    assert [m["content"] for m in messages[1:]] == ["q2 q2", "a2 a2"]
+    assert evicted == ["q1 q1", "a1 a1"]
+
+
+def test_max_exchanges_evicts_oldest_even_within_budget():
+    builder = ContextBuilder(WordCounter(), budget=100, max_exchanges=1)
+    messages, evicted = builder.build("s", ["q1", "a1", "q2", "a2"])
+    assert [m["content"] for m in messages] == ["q2", "a2"]
+    assert evicted == ["q1", "a1"]
+
+
+def test_token_counts_are_cached_per_session():
+    counter = WordCounter()
+    builder = ContextBuilder(counter, budget=100)
+
+    builder.build("s", ["q1", "a1"])
+    builder.build("s", ["q1", "a1", "q2", "a2"])
+
+    assert counter.calls == 4
+    assert builder.stats == {"counted": 4, "cached": 2}
+
+    builder.forget("s")
+    builder.build("s", ["q1", "a1"])
+    assert counter.calls == 6
+
+
+def test_token_count_cache_is_bounded():
+    builder = ContextBuilder(WordCounter(), max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        builder.build(session_id, ["q", "a"])
+    assert list(builder.token_counts) == ["b", "c"]
+
+
+def test_history_is_sent_as_chat_messages(monkeypatch):
+    monkeypatch.setattr(server, "db", None)
+    llm = FakeAsyncLLM()
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    agent = server.SaarthiAgentSystem()
+
+    async def run():
+        await agent.generate_response("hello there", "s")
+        await agent.generate_response("and again", "s")
+
+    asyncio.run(run())
+    messages = llm.calls[-1]["messages"]
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+    assert messages[0]["content"] == agent.personas["general"].prompt
+    assert messages[1]["content"] == "hello there"
+    assert messages[2]["content"] == llm.reply
+    assert messages[3]["content"] == "and again"
+
+
+def test_persona_prefix_is_shared_across_turns_with_per_persona_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "db", None)
+    llm = FakeAsyncLLM()
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    agent = server.SaarthiAgentSystem()
+    settings_file = tmp_path / "personas.json"
+    settings_file.write_text('{"education": {"model": "tutor-model", "temperature": 0.2, "max_tokens": 800}}')
+    agent.configure_personas(server.load_persona_settings(str(settings_file)))
+
+    async def run():
+        await agent.generate_response("hello there", "a")
+        await agent.generate_response("hello again", "b", persona_preference="general")
+        async for _ in agent.stream_response("help me study algebra", "a"):
+            pass
+
+    asyncio.run(run())
+    first, second, streamed = llm.calls
+    # Every turn starts with the same system message object, so the prefix is byte-identical
+    assert first["messages"][0] is second["messages"][0] is agent.personas["general"].system_message
+    assert (first["model"], first["temperature"], first["max_tokens"]) == (server.LLM_MODEL, 0.7, 500)
+    assert streamed["messages"][0]["content"] == agent.personas["education"].prompt
+    assert (streamed["model"], streamed["temperature"], streamed["max_tokens"]) == ("tutor-model", 0.2, 800)
+    assert [m["role"] for m in streamed["messages"]] == ["system", "user", "assistant", "user"]
+
+    settings_file.write_text('{"coach": {"temperature": 1.0}}')
+    with pytest.raises(ValueError, match="coach"):
+        agent.configure_personas(server.load_persona_settings(str(settings_file)))
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+import server
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def seeded_db(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient().Saarthi_db2
+
+    async def seed():
+        docs = []
+        for i in range(25):
+            docs.append({
+                "_id": f"turn-{i:03d}",
+                "session_id": "long-session",
+                "user_message": f"question {i}",
+                "ai_response": f"answer {i}",
+                "persona_used": "general",
+                "persona_name": "General Assistant",
+                # Pairs of turns share a timestamp so the _id tie-breaker matters
+                "timestamp": START + timedelta(seconds=i // 2),
+                "error": None
+            })
+        await db.conversations.insert_many(docs)
+
+    asyncio.run(seed())
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def fetch(*requests):
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get("/api/conversations/long-session", params=params) for params in requests]
+    return asyncio.run(run())
+
+
+def messages(page):
+    return [conv["user_message"] for conv in page["conversations"]]
+
+
+def test_forward_pagination_visits_every_turn_once(seeded_db):
+    seen = []
+    params = {"limit": 10}
+    while True:
+        page = fetch(params)[0].json()
+        seen.extend(messages(page))
+        if not page["next_cursor"]:
+            break
+        params = {"limit": 10, "after": page["next_cursor"]}
+    assert seen == [f"question {i}" for i in range(25)]
+
+
+def test_backward_pagination_returns_pages_in_chronological_order(seeded_db):
+    first = fetch({"limit": 10})[0].json()
+    third = fetch({"limit": 10, "after": fetch({"limit": 10, "after": first["next_cursor"]})[0].json()["next_cursor"]})[0].json()
+    assert messages(third) == [f"question {i}" for i in range(20, 25)]
+
+    previous = fetch({"limit": 10, "before": third["prev_cursor"]})[0].json()
+    assert messages(previous) == [f"question {i}" for i in range(10, 20)]
+    assert previous["prev_cursor"] is not None
+    assert previous["next_cursor"] is not None
+
+
+def test_projection_limits_returned_fields(seeded_db):
+    page = fetch({"limit": 2, "fields": "user_message,ai_response"})[0].json()
+    assert page["conversations"] == [
+        {"user_message": "question 0", "ai_response": "answer 0"},
+        {"user_message": "question 1", "ai_response": "answer 1"},
+    ]
+    assert page["next_cursor"] is not None
+
+
+def test_invalid_fields_and_cursors_are_rejected(seeded_db):
+    bad_field, bad_cursor = fetch({"fields": "password"}, {"after": "not-a-cursor"})
+    assert bad_field.status_code == 400
+    assert bad_cursor.status_code == 400
+
+
+def test_ndjson_export_streams_every_turn(seeded_db):
+    response = fetch({"format": "ndjson", "fields": "user_message,timestamp"})[0]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 25
+    assert lines[0] == {"user_message": "question 0", "timestamp": START.isoformat()}
@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from benchmarks.fake_llm import create_app
+from gateway import CircuitBreaker, GatewayError, LLMGateway, openai_provider
+
+pytest.importorskip("openai")
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def provider(name, app, **kwargs):
+    """Gateway provider talking to an in-process fake OpenAI-compatible server"""
+    return openai_provider(
+        name, f"http://{name}/v1", "test-key",
+        transport=httpx.ASGITransport(app=app), **kwargs
+    )
+
+
+def call(gateway):
+    return gateway.chat.completions.create(messages=MESSAGES, model="primary-model", max_tokens=10)
+
+
+def test_failures_fail_over_to_the_secondary_provider():
+    broken = create_app(latency=0, fail_rate=1.0, fail_status=503)
+    healthy = create_app(latency=0, reply="From the fallback.")
+    gateway = LLMGateway([provider("a", broken), provider("b", healthy)], backoff=0.01)
+
+    result = asyncio.run(call(gateway))
+
+    assert result.choices[0].message.content == "From the fallback."
+    assert broken.state.requests == 1
+    assert gateway.stats["retries"] == 1
+
+
+def test_client_errors_are_not_retried():
+    app = create_app(latency=0, fail_rate=1.0, fail_status=400)
+    gateway = LLMGateway([provider("a", app)], backoff=0.01)
+
+    with pytest.raises(Exception) as error:
+        asyncio.run(call(gateway))
+
+    assert getattr(error.value, "status_code", None) == 400
+    assert app.state.requests == 1
+
+
+def test_retries_give_up_with_gateway_error():
+    app = create_app(latency=0, fail_rate=1.0)
+    gateway = LLMGateway([provider("a", app, breaker=CircuitBreaker(failure_threshold=100))], retries=2, backoff=0.01)
+
+    with pytest.raises(GatewayError):
+        asyncio.run(call(gateway))
+    assert app.state.requests == 3
+
+
+def test_deadline_bounds_slow_calls():
+    app = create_app(latency=2.0)
+    gateway = LLMGateway([provider("a", app)], deadline=0.2)
+
+    start = time.perf_counter()
+    with pytest.raises(GatewayError, match="deadline"):
+        asyncio.run(call(gateway))
+    assert time.perf_counter() - start < 1.0
+
+
+def test_circuit_opens_after_consecutive_failures():
+    broken = create_app(latency=0, fail_rate=1.0)
+    healthy = create_app(latency=0)
+    primary = provider("a", broken, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    gateway = LLMGateway([primary, provider("b", healthy)], backoff=0.0)
+
+    async def run():
+        for _ in range(5):
+            await call(gateway)
+
+    asyncio.run(run())
+    assert primary.breaker.state == "open"
+    assert broken.state.requests == 2
+    assert healthy.state.requests == 5
+
+
+def test_half_open_breaker_allows_one_trial(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("gateway.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] += 11
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_slow_primary_is_hedged_to_the_secondary_model():
+    primary_app = create_app(latency=0.01)
+    secondary_app = create_app(latency=0.01, reply="Hedged answer.")
+    secondary = provider("b", secondary_app, model="small-model")
+    gateway = LLMGateway([provider("a", primary_app), secondary], hedge_min_samples=5)
+
+    async def run():
+        for _ in range(5):
+            await call(gateway)
+        primary_app.state.slow_rate, primary_app.state.slow_latency = 1.0, 2.0
+        start = time.perf_counter()
+        result = await call(gateway)
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result.choices[0].message.content == "Hedged answer."
+    assert elapsed < 1.0
+    assert secondary.stats["hedge_wins"] == 1
+    assert secondary_app.state.models == ["small-model"]
+
+
+def test_no_hedging_before_enough_samples():
+    primary_app = create_app(latency=0.05)
+    secondary_app = create_app(latency=0)
+    gateway = LLMGateway([provider("a", primary_app), provider("b", secondary_app)], hedge_min_samples=20)
+
+    asyncio.run(call(gateway))
+    assert secondary_app.state.requests == 0
+
+
+def test_streamed_calls_do_not_set_the_hedge_delay():
+    primary_app = create_app(latency=0.01, token_delay=0.05)
+    secondary_app = create_app(latency=0)
+    primary = provider("a", primary_app)
+    gateway = LLMGateway([primary, provider("b", secondary_app)], hedge_min_samples=5)
+
+    async def run():
+        for _ in range(5):
+            stream = await gateway.chat.completions.create(messages=MESSAGES, model="m", stream=True)
+            async for _ in stream:
+                pass
+        # Streams only time how long they take to start, far less than a full completion
+        assert gateway.hedge_delay(primary) is None
+        return await call(gateway)
+
+    asyncio.run(run())
+    assert len(primary.stream_latency.samples) == 5 and len(primary.latency.samples) == 1
+    assert secondary_app.state.requests == 0
+    assert primary.metrics()["stream_open_p95_ms"] is not None
@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from history import MemoryHistoryStore, MongoHistoryStore
+
+
+def test_memory_store_caps_messages_per_session():
+    store = MemoryHistoryStore(max_messages=4)
+
+    async def run():
+        for i in range(3):
+            await store.append("s", f"q{i}", f"a{i}")
+        return await store.get("s")
+
+    assert asyncio.run(run()) == ["q1", "a1", "q2", "a2"]
+
+
+def test_memory_store_evicts_least_recently_used_session():
+    store = MemoryHistoryStore(max_sessions=2)
+
+    async def run():
+        await store.append("a", "q", "r")
+        await store.append("b", "q", "r")
+        await store.get("a")  # "b" is now least recently used
+        await store.append("c", "q", "r")
+
+    asyncio.run(run())
+    assert "a" in store and "c" in store and "b" not in store
+    assert store.stats["evictions"] == 1
+
+
+def test_memory_store_expires_idle_sessions(monkeypatch):
+    store = MemoryHistoryStore(ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr("history.time.monotonic", lambda: now[0])
+
+    async def run():
+        await store.append("s", "q", "r")
+        fresh = await store.get("s")
+        now[0] += 61
+        stale = await store.get("s")
+        return fresh, stale
+
+    assert asyncio.run(run()) == (["q", "r"], [])
+    assert store.metrics() == {"backend": "memory", "hits": 1, "misses": 1, "evictions": 1, "hit_ratio": 0.5}
+
+
+def test_mongo_store_is_shared_between_instances():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().saarthi
+
+    async def run():
+        worker_a = MongoHistoryStore(db.session_history, db.conversations, max_messages=4)
+        worker_b = MongoHistoryStore(db.session_history, db.conversations, max_messages=4)
+        await worker_a.append("s", "q0", "a0")
+        await worker_b.append("s", "q1", "a1")
+        await worker_a.append("s", "q2", "a2")
+        return await worker_b.get("s"), worker_b.stats
+
+    messages, stats = asyncio.run(run())
+    assert messages == ["q1", "a1", "q2", "a2"]
+    assert stats["hits"] == 1
+
+
+def test_mongo_store_rehydrates_from_conversations_on_miss():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient().saarthi
+    start = datetime(2026, 1, 1)
+
+    async def run():
+        await db.conversations.insert_many([
+            {
+                "_id": f"turn-{i}",
+                "session_id": "old-session",
+                "user_message": f"q{i}",
+                "ai_response": f"a{i}",
+                "timestamp": start + timedelta(minutes=i)
+            }
+            for i in range(5)
+        ])
+        store = MongoHistoryStore(db.session_history, db.conversations, max_messages=4)
+        rehydrated = await store.get("old-session")
+        cached = await store.get("old-session")
+        empty = await store.get("new-session")
+        return store, rehydrated, cached, empty
+
+    store, rehydrated, cached, empty = asyncio.run(run())
+    assert rehydrated == ["q3", "a3", "q4", "a4"]
+    assert cached == rehydrated
+    assert empty == []
+    assert store.metrics() == {"backend": "mongo", "hits": 1, "misses": 2, "evictions": 1, "hit_ratio": 0.3333}
+
+
+class IndexedCollection:
+    """Stands in for a collection whose TTL index was built with another expireAfterSeconds"""
+
+    name = "session_history"
+
+    def __init__(self):
+        self.database = self
+        self.commands = []
+
+    async def create_index(self, key, **options):
+        raise OperationFailure("Index already exists with different options", code=85)
+
+    async def command(self, name, value, **options):
+        self.commands.append((name, value, options))
+
+
+def test_mongo_store_updates_the_ttl_of_an_existing_index():
+    collection = IndexedCollection()
+    store = MongoHistoryStore(collection, None, ttl=7200)
+    asyncio.run(store.ensure_indexes())
+    assert collection.commands == [
+        ("collMod", "session_history", {"index": {"name": "updated_at_ttl", "expireAfterSeconds": 7200}})
+    ]
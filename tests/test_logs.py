@@ -0,0 +1,155 @@
+import asyncio
+import io
+import json
+import logging
+import time
+
+import httpx
+import pytest
+
+import server
+from admission import AdmissionController, RateLimiter
+from logs import add_timing, bind, request_context, setup_logging
+from singleflight import IdempotencyStore, SingleFlight
+from summarizer import MemorySummaryStore, RollingSummarizer
+from tests.fakes import FakeAsyncLLM
+
+
+class SlowStream(io.StringIO):
+    """A stdout that takes `delay` seconds per write"""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return super().write(text)
+
+
+@pytest.fixture
+def capture_logs():
+    """Point the "saarthi" logger at a buffer; yields a function returning the parsed records"""
+    streams = []
+
+    def install(**kwargs):
+        stream = kwargs.pop("stream", None) or io.StringIO()
+        listener, handler = setup_logging(stream=stream, **kwargs)
+        listener.start()
+        streams.append((listener, stream))
+        return handler
+
+    def records():
+        listener, stream = streams[-1]
+        listener.stop()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield install, records
+    logger = logging.getLogger("saarthi")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(server.log_handler)
+    logger.setLevel(server.LOG_LEVEL)
+
+
+def test_chat_turn_record_carries_request_fields_and_timings(capture_logs, monkeypatch):
+    install, records = capture_logs
+    install()
+    monkeypatch.setattr(server, "db", None)
+    monkeypatch.setattr(server, "groq_client", FakeAsyncLLM())
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    monkeypatch.setattr(server, "Saarthi_system", server.SaarthiAgentSystem())
+    monkeypatch.setattr(server, "chat_flight", SingleFlight())
+    monkeypatch.setattr(server, "idempotent_results", IdempotencyStore())
+    monkeypatch.setattr(server, "chat_admission", AdmissionController())
+    monkeypatch.setattr(server, "session_limiter", RateLimiter(rate=0, burst=1))
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/chat",
+                json={"message": "help me study for my math exam", "session_id": "log-session"},
+                headers={"X-Request-ID": "req-123"}
+            )
+
+    response = asyncio.run(run())
+
+    assert response.headers["x-request-id"] == "req-123"
+    turn = next(record for record in records() if record["message"] == "Chat turn completed")
+    assert turn["level"] == "INFO"
+    assert turn["request_id"] == "req-123"
+    assert turn["session_id"] == "log-session"
+    assert turn["persona"] == "education"
+    assert turn["message_id"] == response.json()["message_id"]
+    assert {"validation", "classify", "context", "queue", "llm"} <= set(turn["timings_ms"])
+
+
+def test_sampling_thins_successes_but_keeps_errors(capture_logs):
+    install, records = capture_logs
+    install(sample_rate=0.0)
+    logger = logging.getLogger("saarthi")
+
+    logger.info("Chat turn completed", extra={"sample": True})
+    logger.info("Started")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("Chat turn crashed")
+
+    logged = records()
+    assert [record["message"] for record in logged] == ["Started", "Chat turn crashed"]
+    assert "ValueError: boom" in logged[1]["exception"]
+
+
+def test_slow_stdout_never_blocks_the_caller(capture_logs):
+    install, records = capture_logs
+    handler = install(queue_size=10, stream=SlowStream(delay=0.05))
+    logger = logging.getLogger("saarthi")
+
+    start = time.perf_counter()
+    for i in range(1000):
+        logger.info("record %d", i)
+    elapsed = time.perf_counter() - start
+
+    # 1000 synchronous writes would take 50s
+    assert elapsed < 0.5
+    assert handler.dropped > 0
+    assert len(records()) + handler.dropped == 1000
+
+
+def test_records_keep_the_timings_they_were_logged_with(capture_logs):
+    install, records = capture_logs
+    install()
+    logger = logging.getLogger("saarthi")
+
+    async def run():
+        bind(request_id="req-1")
+        add_timing("classify", 0.001)
+        logger.info("Classified")
+        # Still queued for the listener thread while the request goes on
+        add_timing("llm", 0.5)
+        logger.info("Answered")
+
+    asyncio.run(run())
+    classified, answered = records()
+    assert classified["timings_ms"] == {"classify": 1.0}
+    assert answered["timings_ms"] == {"classify": 1.0, "llm": 500.0}
+
+
+def test_lazily_started_background_task_has_no_request_context():
+    async def summarize(summary, exchanges):
+        return summary
+
+    async def context_of_task():
+        return request_context.get()
+
+    summarizer = RollingSummarizer(MemorySummaryStore(), summarize)
+    summarizer.run = context_of_task
+
+    async def run_in_request():
+        bind(request_id="req-1", session_id="s")
+        summarizer.start()
+        return await summarizer.task
+
+    assert asyncio.run(run_in_request()) is None
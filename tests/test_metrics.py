@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import server
+from admission import AdmissionController, RateLimiter
+from metrics import Registry
+from singleflight import IdempotencyStore, SingleFlight
+from tests.fakes import make_completion
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ["stage"], buckets=[0.1, 1])
+    for value in (0.05, 0.5, 5):
+        latency.observe(value, stage="llm")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE stage_seconds histogram" in lines
+    assert 'stage_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="llm",le="1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="llm",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="llm"} 5.55' in lines
+    assert 'stage_seconds_count{stage="llm"} 3' in lines
+
+
+def test_counter_escapes_labels_and_collectors_run_at_scrape_time():
+    registry = Registry()
+    errors = registry.counter("errors_total", "Errors", ["type"])
+    errors.inc(type='Bad "quote"')
+    errors.inc(2, type='Bad "quote"')
+    state = {"active": 1}
+    registry.collector(lambda: [("active", "gauge", "Active", [({}, state["active"])])])
+
+    state["active"] = 7
+    text = registry.render()
+
+    assert 'errors_total{type="Bad \\"quote\\""} 3' in text
+    assert "active 7" in text
+
+
+class UsageLLM:
+    """Fake client whose completions report a model and token usage"""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        completion = make_completion("Take a slow breath with me.")
+        completion.model = "fake-model"
+        completion.usage = SimpleNamespace(prompt_tokens=42, completion_tokens=7)
+        return completion
+
+
+@pytest.fixture
+def metrics_env(monkeypatch):
+    monkeypatch.setattr(server, "db", None)
+    monkeypatch.setattr(server, "groq_client", UsageLLM())
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    monkeypatch.setattr(server, "Saarthi_system", server.SaarthiAgentSystem())
+    monkeypatch.setattr(server, "chat_flight", SingleFlight())
+    monkeypatch.setattr(server, "idempotent_results", IdempotencyStore())
+    monkeypatch.setattr(server, "chat_admission", AdmissionController())
+    monkeypatch.setattr(server, "session_limiter", RateLimiter(rate=0, burst=1))
+    monkeypatch.setattr(server, "ip_limiter", RateLimiter(rate=0, burst=1))
+
+
+def test_chat_turn_is_visible_on_metrics_endpoint(metrics_env):
+    turns_before = server.CHAT_TURN_SECONDS.count(persona="mental_health", source="llm")
+    tokens_before = server.LLM_TOKENS.value(persona="mental_health", model="fake-model", kind="prompt")
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            chat = await client.post("/api/chat", json={"message": "I am so worried", "session_id": "metrics"})
+            assert chat.status_code == 200
+            return await client.get("/metrics")
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    for stage in ("validation", "classify", "context", "queue", "llm"):
+        assert f'saarthi_chat_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'saarthi_llm_request_seconds_count{persona="mental_health",model="fake-model"}' in text
+    assert 'saarthi_history_lookups_total{store="memory",result="miss"}' in text
+    assert "saarthi_chat_rejected_total" in text
+    assert server.CHAT_TURN_SECONDS.count(persona="mental_health", source="llm") == turns_before + 1
+    assert server.LLM_TOKENS.value(persona="mental_health", model="fake-model", kind="prompt") == tokens_before + 42
+
+
+def test_llm_errors_are_counted_by_type(metrics_env, monkeypatch):
+    async def fail(**kwargs):
+        raise TimeoutError("slow upstream")
+
+    monkeypatch.setattr(server, "groq_client", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fail))))
+    before = server.CHAT_ERRORS.value(stage="llm", type="TimeoutError")
+
+    result = asyncio.run(server.Saarthi_system.generate_response("hello", "errors"))
+
+    assert "error" in result
+    assert server.CHAT_ERRORS.value(stage="llm", type="TimeoutError") == before + 1
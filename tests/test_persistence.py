@@ -0,0 +1,89 @@
+import asyncio
+
+from persistence import ConversationWriter
+from tests.fakes import FakeCollection
+
+
+def test_full_batches_are_flushed_together():
+    collection = FakeCollection()
+
+    async def run():
+        writer = ConversationWriter(collection, batch_size=10, flush_interval=5.0)
+        for i in range(30):
+            await writer.enqueue({"_id": i})
+        await asyncio.sleep(0.05)
+        batches = list(collection.batches)
+        await writer.close()
+        return batches
+
+    assert asyncio.run(run()) == [10, 10, 10]
+    assert [doc["_id"] for doc in collection.docs] == list(range(30))
+
+
+def test_partial_batch_is_flushed_after_interval():
+    collection = FakeCollection()
+
+    async def run():
+        writer = ConversationWriter(collection, batch_size=100, flush_interval=0.05)
+        await writer.enqueue({"_id": 1})
+        await writer.enqueue({"_id": 2})
+        assert collection.batches == []
+        await asyncio.sleep(0.15)
+        batches = list(collection.batches)
+        await writer.close()
+        return batches
+
+    assert asyncio.run(run()) == [2]
+
+
+def test_close_drains_backlog():
+    collection = FakeCollection(delay=0.01)
+
+    async def run():
+        writer = ConversationWriter(collection, batch_size=7, flush_interval=10.0)
+        for i in range(20):
+            await writer.enqueue({"_id": i})
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert len(collection.docs) == 20
+    assert writer.stats["written"] == 20
+    assert writer.backlog == 0
+
+
+def test_enqueue_waits_when_backlog_is_full():
+    collection = FakeCollection(delay=0.2)
+
+    async def run():
+        writer = ConversationWriter(collection, batch_size=2, flush_interval=0.0, max_backlog=2)
+        for i in range(4):
+            await writer.enqueue({"_id": i})
+        # Two in the current batch, two more fill the backlog; the next one waits
+        blocked = asyncio.create_task(writer.enqueue({"_id": 4}))
+        await asyncio.sleep(0.05)
+        was_blocked = not blocked.done()
+        await blocked
+        await writer.close()
+        return was_blocked
+
+    assert asyncio.run(run()) is True
+    assert len(collection.docs) == 5
+
+
+def test_failed_batches_are_counted_and_do_not_stop_the_writer():
+    collection = FakeCollection(fail=True)
+
+    async def run():
+        writer = ConversationWriter(collection, batch_size=5, flush_interval=0.01)
+        for i in range(5):
+            await writer.enqueue({"_id": i})
+        await writer.flush()
+        collection.fail = False
+        await writer.enqueue({"_id": 5})
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.stats["failed"] == 5
+    assert writer.stats["written"] == 1
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+import server
+from cache import MongoResponseStore, ResponseCache, context_hash, normalize_message
+from tests.fakes import FakeAsyncLLM
+
+CONTEXT = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "Hello!"}]
+
+
+def test_messages_are_normalized():
+    assert normalize_message("  Hello,   WORLD!! ") == "hello world"
+    assert context_hash([]) == context_hash([])
+    assert context_hash(CONTEXT) != context_hash([])
+
+
+def test_exact_hit_is_keyed_on_persona_message_and_context():
+    cache = ResponseCache()
+    cache.put("general", "Hello!", [], "Hi there", latency=0.5)
+
+    assert cache.get("general", "hello", []) == "Hi there"
+    assert cache.get("education", "hello", []) is None
+    assert cache.get("general", "hello", CONTEXT) is None
+    assert cache.metrics()["hit_ratio"] == pytest.approx(1 / 3, abs=1e-4)
+    assert cache.stats["latency_saved"] == 0.5
+
+
+def test_mental_health_turns_are_not_cached():
+    cache = ResponseCache()
+    cache.put("mental_health", "I feel sad", [], "I'm here for you")
+    assert cache.get("mental_health", "I feel sad", []) is None
+    assert len(cache) == 0
+    assert cache.stats["skipped"] == 1
+
+
+def test_entries_expire_and_lru_is_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.put("general", "a", [], "A")
+    cache.put("general", "b", [], "B")
+    cache.get("general", "a", [])  # "b" is now least recently used
+    cache.put("general", "c", [], "C")
+    assert cache.get("general", "b", []) is None
+    assert cache.get("general", "a", []) == "A"
+
+    now[0] += 61
+    assert cache.get("general", "a", []) is None
+    assert cache.stats["evictions"] == 2
+
+
+def test_semantic_tier_matches_near_duplicate_first_turns():
+    pytest.importorskip("numpy")
+    from semantic import HashedEmbedder
+
+    cache = ResponseCache(embedder=HashedEmbedder(), threshold=0.8)
+    cache.put("education", "Can you explain photosynthesis?", [], "Plants turn light into sugar.")
+
+    assert cache.get("education", "can you explain photosynthesis please", []) == "Plants turn light into sugar."
+    assert cache.stats["semantic_hits"] == 1
+    # Only context-free turns use the semantic tier
+    assert cache.get("education", "can you explain photosynthesis please", CONTEXT) is None
+    assert cache.get("education", "what caused the first world war", []) is None
+
+
+def test_cached_turn_skips_the_llm_and_updates_history(monkeypatch):
+    monkeypatch.setattr(server, "db", None)
+    llm = FakeAsyncLLM()
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    agent = server.SaarthiAgentSystem(response_cache=ResponseCache())
+
+    async def run():
+        first = await agent.generate_response("Hello!", "a")
+        second = await agent.generate_response("hello", "b")
+        return first, second, await agent.history_store.get("b")
+
+    first, second, history = asyncio.run(run())
+    assert len(llm.calls) == 1
+    assert second["response"] == first["response"] and second["cached"]
+    assert history == ["hello", llm.reply]
+
+
+def test_shared_tier_serves_responses_cached_by_another_worker(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    monkeypatch.setattr(server, "db", None)
+    llm = FakeAsyncLLM()
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    collection = mongomock_motor.AsyncMongoMockClient().saarthi.response_cache
+    workers = []
+    for _ in range(2):
+        agent = server.SaarthiAgentSystem(response_cache=ResponseCache())
+        agent.shared_cache = MongoResponseStore(collection)
+        workers.append(agent)
+
+    async def run():
+        first = await workers[0].generate_response("Hello!", "a")
+        second = await workers[1].generate_response("hello", "b")
+        # Mental health turns stay out of both tiers
+        await workers[0].generate_response("I feel sad", "c", persona_preference="mental_health")
+        await workers[1].generate_response("I feel sad", "d", persona_preference="mental_health")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(llm.calls) == 3
+    assert second["response"] == first["response"] and second["cached"]
+    assert workers[1].shared_cache.stats["hits"] == 1
+    assert len(workers[1].response_cache) == 1
@@ -0,0 +1,238 @@
+import asyncio
+import random
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+import server
+from archive import archive_conversations
+from persistence import ConversationWriter
+import search as search_module
+from search import InvertedIndex, MemorySearchIndex, MongoTextSearch, tokenize
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def turn(session_id, i, message, response="Let's work through it together.", persona="general", age_days=0):
+    return {
+        "_id": f"{session_id}-{i:03d}",
+        "session_id": session_id,
+        "user_message": message,
+        "ai_response": response,
+        "persona_used": persona,
+        "timestamp": NOW - timedelta(days=age_days, minutes=5) + timedelta(seconds=i)
+    }
+
+
+def test_tokens_are_stemmed_and_stopwords_dropped():
+    assert tokenize("I'm SO stressed about the exams, stress everywhere!") == ["stress", "exam", "stress", "everywhere"]
+    assert tokenize("Feeling classes") == ["feel", "class"]
+
+
+def test_bm25_ranks_rare_and_repeated_terms_higher_and_filters():
+    index = InvertedIndex()
+    docs = [
+        turn("a", 0, "exam stress is everywhere", persona="mental_health"),
+        turn("a", 1, "what should I cook for dinner"),
+        turn("b", 2, "my chemistry exam is tomorrow, chemistry is hard", persona="education"),
+        turn("b", 3, "exam exam exam"),
+    ]
+    for doc in docs:
+        index.add(doc, Counter(tokenize(f"{doc['user_message']} {doc['ai_response']}")))
+
+    total, hits = index.search(tokenize("chemistry exam"), limit=10)
+    assert total == 3
+    assert [number for number, _ in hits] == [2, 3, 0]
+
+    assert index.search(tokenize("exam"), limit=10, session_id="a")[1][0][0] == 0
+    assert [n for n, _ in index.search(tokenize("exam"), limit=10, persona="education")[1]] == [2]
+    assert index.search(tokenize("exam"), limit=10, session_id="missing") == (0, [])
+    assert index.search(tokenize("exam"), limit=1, offset=1)[1] == index.search(tokenize("exam"), limit=2)[1][1:]
+
+    index.remove_session("b")
+    assert index.search(tokenize("chemistry exam"), limit=10)[0] == 1
+    assert len(index) == 2
+
+
+def test_vectorized_scoring_matches_pure_python(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(3)
+    words = ["exam", "stress", "sleep", "recipe", "chemistry", "movie", "lonely", "career"]
+    index = InvertedIndex()
+    for i in range(300):
+        doc = turn(f"s{i % 7}", i, " ".join(rng.choices(words, k=rng.randint(1, 8))),
+                   persona=rng.choice(["general", "education"]))
+        index.add(doc, Counter(tokenize(doc["user_message"])))
+    index.remove_session("s3")
+    queries = [("exam stress", {}), ("movie", {"persona": "education"}), ("lonely career sleep", {})]
+    vectorized = [index.search(tokenize(query), 15, 5, **filters) for query, filters in queries]
+    monkeypatch.setattr(search_module, "np", None)
+    for (query, filters), (total, hits) in zip(queries, vectorized):
+        expected_total, expected = index.search(tokenize(query), 15, 5, **filters)
+        assert total == expected_total
+        assert [number for number, _ in hits] == [number for number, _ in expected]
+        assert [score for _, score in hits] == pytest.approx([score for _, score in expected])
+
+
+@pytest.fixture
+def search_env(monkeypatch):
+    """Hot and archived turns in MongoDB, indexed by a memory search index once loaded"""
+    db = mongomock_motor.AsyncMongoMockClient().Saarthi_db2
+
+    async def seed():
+        await db.conversations.insert_many([
+            turn("old", 0, "I feel anxious before every chemistry exam", persona="mental_health", age_days=60),
+            turn("old", 1, "Can you recommend a pasta recipe?", age_days=60),
+            turn("kept", 0, "Explain photosynthesis for my biology exam", persona="education"),
+            turn("kept", 1, "Thanks, now tell me a joke"),
+        ])
+        await archive_conversations(db.conversations, db.conversation_archive, NOW - timedelta(days=30))
+        index = MemorySearchIndex(db.conversations, db.conversation_archive)
+        index.start()
+        await asyncio.gather(*index.tasks)
+        return index
+
+    index = asyncio.run(seed())
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "search_index", index)
+    return db, index
+
+
+def search(*requests, method="get"):
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.request(method, url, params=params) for url, params in requests]
+    return asyncio.run(run())
+
+
+def test_search_finds_archived_and_hot_turns_and_new_writes(search_env):
+    db, index = search_env
+    assert index.ready and index.stats["loaded"] == 4
+
+    async def write():
+        writer = ConversationWriter(db.conversations, on_write=server.index_conversations)
+        await writer.enqueue(turn("new", 0, "Is it normal to cry after an exam?", persona="mental_health"))
+        await writer.close()
+
+    asyncio.run(write())
+    body = search(("/api/search", {"q": "exam"}))[0].json()
+    assert body["mode"] == "text" and body["complete"]
+    assert body["total"] == 3
+    assert {r["message_id"] for r in body["results"]} == {"old-000", "kept-000", "new-000"}
+    archived = next(r for r in body["results"] if r["message_id"] == "old-000")
+    assert archived["persona_name"] == "Mental Health Support" and archived["error"] is None
+    assert all(r["score"] > 0 for r in body["results"])
+
+    first, second, scoped = search(
+        ("/api/search", {"q": "exam anxious", "limit": 1}),
+        ("/api/search", {"q": "exam anxious", "limit": 1, "offset": 1}),
+        ("/api/search", {"q": "exam", "session_id": "kept"})
+    )
+    assert first.json()["results"][0]["message_id"] == "old-000" and first.json()["has_more"]
+    assert second.json()["results"][0]["message_id"] != "old-000"
+    assert [r["message_id"] for r in scoped.json()["results"]] == ["kept-000"]
+
+
+def test_deleted_and_expired_turns_leave_the_results(search_env):
+    db, index = search_env
+    deleted, = search(("/api/conversations/old", {}), method="delete")
+    assert deleted.json()["deleted_count"] == 2
+    asyncio.run(db.conversations.delete_one({"_id": "kept-000"}))
+
+    body = search(("/api/search", {"q": "exam"}))[0].json()
+    assert body["results"] == [] and body["total"] == 1
+    # The missing turn was tombstoned when its page was read
+    assert search(("/api/search", {"q": "exam"}))[0].json()["total"] == 0
+
+
+def test_search_rejects_unavailable_modes_and_blank_queries(search_env, monkeypatch):
+    semantic, blank = search(("/api/search", {"q": "exam", "mode": "semantic"}), ("/api/search", {"q": "  "}))
+    assert semantic.status_code == 400 and blank.status_code == 400
+    monkeypatch.setattr(server, "search_index", None)
+    assert search(("/api/search", {"q": "exam"}))[0].status_code == 404
+
+
+def test_mongo_text_index_is_built_in_the_background():
+    db = mongomock_motor.AsyncMongoMockClient().Saarthi_db2
+
+    async def run():
+        index = MongoTextSearch(db.conversations)
+        before = await index.search("exam")
+        index.start()
+        await asyncio.gather(*index.tasks)
+        return before, index.ready, await db.conversations.index_information()
+
+    before, ready, indexes = asyncio.run(run())
+    assert before == {"results": [], "total": None, "has_more": False, "complete": False}
+    assert ready and "conversation_text" in indexes
+
+
+def test_hybrid_search_blends_keyword_and_embedding_rankings(search_env):
+    pytest.importorskip("numpy")
+    from semantic import HashedEmbedder
+    db, _ = search_env
+
+    async def build():
+        index = MemorySearchIndex(db.conversations, db.conversation_archive, embedder=HashedEmbedder(dim=512),
+                                  vector_capacity=2, min_similarity=0.05)
+        index.start()
+        await asyncio.wait_for(index.tasks[0], 5)
+        new = [turn("new", 0, "My anxiety keeps me awake", persona="mental_health"),
+               turn("new", 1, "Any tips for anxiety before a chemistry exam?", persona="mental_health")]
+        await db.conversations.insert_many(new)
+        index.add(new)
+        while index.vectors.added < 4:
+            await asyncio.sleep(0.01)
+        # old-000 ("anxious before every chemistry exam") is archived, so only its keywords match
+        semantic = await index.search("anxiety", mode="semantic")
+        hybrid = await index.search("chemistry anxiety", mode="hybrid")
+        scoped = await index.search("anxiety", mode="semantic", session_id="kept")
+        await index.close()
+        return index, semantic, hybrid, scoped
+
+    index, semantic, hybrid, scoped = asyncio.run(build())
+    assert index.modes == ("text", "semantic", "hybrid")
+    # Hot turns loaded at startup, then new ones; archived turns are never embedded
+    # and the ring only keeps the last two
+    assert index.vectors.added == 4 and len(index.vectors) == 2
+    assert [r["_id"] for r in semantic["results"]] == ["new-000", "new-001"]
+    # The only turn with both "chemistry" and an embedding match ranks first
+    assert hybrid["results"][0]["_id"] == "new-001"
+    assert "old-000" in {r["_id"] for r in hybrid["results"]}
+    assert scoped["results"] == []
+
+
+def test_ranking_runs_off_the_event_loop_and_holds_back_index_changes(search_env, monkeypatch):
+    db, index = search_env
+    release = threading.Event()
+    rank = index.rank
+
+    def slow_rank(*args):
+        release.wait(5)
+        return rank(*args)
+
+    monkeypatch.setattr(index, "rank", slow_rank)
+
+    async def run():
+        late = turn("late", 0, "One more exam question", persona="education")
+        await db.conversations.insert_one(late)
+        query = asyncio.create_task(index.search("exam"))
+        await asyncio.sleep(0.05)
+        # The loop stays free while the query is ranked; a write arriving now waits for it
+        index.add([late])
+        index.remove_session("kept")
+        assert len(index.text) == 4 and index.applied is not None
+        release.set()
+        first = await query
+        return first, await index.search("exam")
+
+    first, second = asyncio.run(run())
+    assert first["total"] == 2
+    assert {r["_id"] for r in second["results"]} == {"old-000", "late-000"}
+    assert index.deferred == [] and index.applied is None
@@ -0,0 +1,62 @@
+import statistics
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import server
+from semantic import HashedEmbedder, SemanticRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    return SemanticRouter(HashedEmbedder(), threshold=0.3)
+
+
+def test_paraphrase_without_keywords_routes_to_mental_health(router):
+    persona, confidence = router.route("I can't sleep and everything feels heavy")
+    assert persona == "mental_health"
+    assert confidence >= router.threshold
+
+
+def test_low_similarity_defers_to_keywords(router):
+    persona, confidence = router.route("This is his favourite dish")
+    assert persona is None
+    assert confidence < router.threshold
+    assert router.route("")[0] is None
+
+
+def test_batch_matches_single_routing(router):
+    messages = [
+        "I feel hopeless and alone",
+        "Help me with my chemistry revision",
+        "Tell me a joke",
+        "This is his favourite dish",
+    ]
+    batch = router.route_batch(messages)
+    single = [router.route(m) for m in messages]
+    assert [persona for persona, _ in batch] == [persona for persona, _ in single]
+    assert [score for _, score in batch] == pytest.approx([score for _, score in single], abs=1e-5)
+
+
+def test_agent_uses_router_and_keeps_mental_health_priority(router):
+    agent = server.SaarthiAgentSystem(semantic_router=router)
+    keyword_only = server.SaarthiAgentSystem()
+
+    paraphrase = "I can't sleep and everything feels heavy"
+    assert keyword_only.classify_persona(paraphrase, "s") == "general"
+    assert agent.classify_persona(paraphrase, "s") == "mental_health"
+    # A mental health keyword is never overridden by the router
+    assert agent.classify_persona("How can I cope with anxiety?", "s") == "mental_health"
+    assert agent.classify_batch([paraphrase, "Tell me a joke"]) == ["mental_health", "general"]
+
+
+def test_single_message_latency_is_well_under_5ms(router):
+    message = "I've been feeling really low since my exams and I can't concentrate on anything"
+    samples = []
+    for _ in range(200):
+        start = time.perf_counter()
+        router.route(message)
+        samples.append(time.perf_counter() - start)
+    assert statistics.median(samples) < 0.005
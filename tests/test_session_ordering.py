@@ -0,0 +1,82 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import server
+from locks import KeyedLock
+from tests.fakes import make_completion
+
+
+class EchoLLM:
+    """Replies "re: <last user message>" after a random short delay, and
+    records how many prior exchanges each prompt carried
+    """
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.context_sizes = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        question = messages[-1]["content"]
+        session_id = question.split(":")[0]
+        exchanges = (len(messages) - 2) // 2
+        self.context_sizes.setdefault(session_id, []).append(exchanges)
+        await asyncio.sleep(self.rng.random() * 0.01)
+        return make_completion(f"re: {question}")
+
+
+def test_keyed_lock_serializes_same_key_and_cleans_up():
+    locks = KeyedLock()
+    order = []
+
+    async def worker(key, i):
+        async with locks.hold(key):
+            order.append((key, i, "start"))
+            await asyncio.sleep(0.01)
+            order.append((key, i, "end"))
+
+    async def run():
+        await asyncio.gather(*[worker("a", i) for i in range(3)], worker("b", 0))
+
+    asyncio.run(run())
+    a_events = [event for event in order if event[0] == "a"]
+    assert a_events == [("a", i, step) for i in range(3) for step in ("start", "end")]
+    # "b" ran alongside "a" rather than after it
+    assert order.index(("b", 0, "start")) < order.index(("a", 0, "end"))
+    assert len(locks) == 0
+    assert locks.stats == {"acquired": 4, "contended": 2}
+
+
+def test_thousands_of_interleaved_sessions_keep_history_paired(monkeypatch):
+    sessions, turns = 2000, 3
+    llm = EchoLLM()
+    monkeypatch.setattr(server, "db", None)
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    agent = server.SaarthiAgentSystem()
+    agent.llm_semaphore = asyncio.Semaphore(sessions * turns)
+
+    # Every turn of every session is started at once, in shuffled order
+    calls = [(i, t) for i in range(sessions) for t in range(turns)]
+    random.Random(1).shuffle(calls)
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*[agent.generate_response(f"s{i}:{t}", f"s{i}") for i, t in calls])
+        elapsed = time.perf_counter() - start
+        histories = {f"s{i}": await agent.history_store.get(f"s{i}") for i in range(sessions)}
+        return elapsed, histories
+
+    elapsed, histories = asyncio.run(run())
+
+    for session_id, history in histories.items():
+        assert len(history) == 2 * turns
+        for question, answer in zip(history[::2], history[1::2]):
+            assert answer == f"re: {question}"
+        # Each turn saw every exchange recorded before it
+        assert llm.context_sizes[session_id] == list(range(turns))
+    assert len(agent.session_locks) == 0
+    # Sessions ran in parallel: far less than sessions * turns * mean delay (30s)
+    assert elapsed < 10
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+import server
+from persistence import ConversationWriter, ensure_indexes, session_summary_updates
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+START = datetime(2026, 1, 1)
+
+
+def conversation(session_id, minute, text="hi"):
+    return {
+        "_id": f"{session_id}-{minute}",
+        "session_id": session_id,
+        "user_message": text,
+        "ai_response": f"reply to {text}",
+        "persona_used": "general",
+        "persona_name": "General Assistant",
+        "timestamp": START + timedelta(minutes=minute),
+        "error": None
+    }
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient().Saarthi_db2
+    writer = ConversationWriter(db.conversations, sessions_collection=db.sessions, flush_interval=0.01)
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "conversation_writer", writer)
+    return db
+
+
+def test_summary_updates_keep_latest_message_per_session():
+    updates = session_summary_updates([
+        conversation("a", 2, "second"),
+        conversation("b", 1),
+        conversation("a", 1, "first"),
+    ])
+    by_session = {update._filter["_id"]: update._doc for update in updates}
+    assert by_session["a"]["$inc"] == {"message_count": 2}
+    assert by_session["a"]["$set"]["last_message"] == "second"
+    assert by_session["b"]["$inc"] == {"message_count": 1}
+
+
+def test_sessions_endpoint_serves_paginated_summaries(mock_db):
+    async def run():
+        await ensure_indexes(mock_db)
+        for minute in range(3):
+            for session_id in ("old", "mid", "new"):
+                offset = {"old": 0, "mid": 10, "new": 20}[session_id]
+                await server.conversation_writer.enqueue(
+                    conversation(session_id, offset + minute, f"{session_id} {minute}")
+                )
+        await server.conversation_writer.flush()
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.get("/api/sessions", params={"limit": 2})).json()
+            second = (await client.get("/api/sessions", params={"limit": 2, "skip": 2})).json()
+            await client.delete("/api/conversations/new")
+            after_delete = (await client.get("/api/sessions")).json()
+        await server.conversation_writer.close()
+        return first, second, after_delete
+
+    first, second, after_delete = asyncio.run(run())
+    assert [s["session_id"] for s in first["sessions"]] == ["new", "mid"]
+    assert first["total_sessions"] == 3
+    assert first["has_more"] is True
+    assert first["sessions"][0]["message_count"] == 3
+    assert first["sessions"][0]["last_message"] == "new 2"
+    assert [s["session_id"] for s in second["sessions"]] == ["old"]
+    assert second["has_more"] is False
+    assert [s["session_id"] for s in after_delete["sessions"]] == ["mid", "old"]
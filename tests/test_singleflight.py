@@ -0,0 +1,234 @@
+import asyncio
+
+import httpx
+import pytest
+
+import server
+from admission import AdmissionController, RateLimiter
+from singleflight import IdempotencyStore, SingleFlight, StreamFlight
+from tests.fakes import FakeAsyncLLM, parse_sse
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        return await asyncio.gather(*[flight.do("k", work) for _ in range(5)])
+
+    assert asyncio.run(run()) == ["result"] * 5
+    assert len(runs) == 1
+    assert flight.stats == {"calls": 1, "shared": 4}
+    assert len(flight) == 0
+
+
+def test_exceptions_are_shared_and_not_cached():
+    flight = SingleFlight()
+    runs = []
+
+    async def failing():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    async def run():
+        results = await asyncio.gather(*[flight.do("k", failing) for _ in range(3)], return_exceptions=True)
+        # The next call after a failure runs again
+        again = await asyncio.gather(flight.do("k", failing), return_exceptions=True)
+        return results + again
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(runs) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_idempotency_store_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("singleflight.time.monotonic", lambda: now[0])
+    store = IdempotencyStore(ttl=10)
+    store.put("k", "v")
+    assert store.get("k") == "v"
+    now[0] += 11
+    assert store.get("k") is None
+
+
+@pytest.fixture
+def chat_env(monkeypatch):
+    llm = FakeAsyncLLM(delay=0.1)
+    monkeypatch.setattr(server, "db", None)
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    monkeypatch.setattr(server, "Saarthi_system", server.SaarthiAgentSystem())
+    monkeypatch.setattr(server, "chat_flight", SingleFlight())
+    monkeypatch.setattr(server, "chat_stream_flight", StreamFlight())
+    monkeypatch.setattr(server, "idempotent_results", IdempotencyStore())
+    monkeypatch.setattr(server, "chat_admission", AdmissionController())
+    monkeypatch.setattr(server, "session_limiter", RateLimiter(rate=0, burst=1))
+    stored = []
+
+    async def store_conversation(message_id, request, result, idempotency_key=None):
+        stored.append(message_id)
+
+    monkeypatch.setattr(server, "store_conversation", store_conversation)
+    return llm, stored
+
+
+async def post_chat(client, message="hello", headers=None):
+    response = await client.post(
+        "/api/chat", json={"message": message, "session_id": "s"}, headers=headers or {}
+    )
+    return response.json()
+
+
+async def post_stream(client, message="hello", headers=None):
+    response = await client.post(
+        "/api/chat/stream", json={"message": message, "session_id": "s"}, headers=headers or {}
+    )
+    return parse_sse(response.text)
+
+
+def run_client(fn):
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await fn(client)
+    return asyncio.run(run())
+
+
+def test_duplicate_in_flight_requests_share_llm_call_and_document(chat_env):
+    llm, stored = chat_env
+
+    results = run_client(lambda client: asyncio.gather(*[post_chat(client) for _ in range(5)]))
+
+    assert len(llm.calls) == 1
+    assert len(stored) == 1
+    assert {r["message_id"] for r in results} == set(stored)
+
+
+def test_retry_with_idempotency_key_returns_stored_result(chat_env):
+    llm, stored = chat_env
+
+    async def run(client):
+        first = await post_chat(client, headers={"Idempotency-Key": "abc"})
+        retry = await post_chat(client, headers={"Idempotency-Key": "abc"})
+        fresh = await post_chat(client, headers={"Idempotency-Key": "def"})
+        return first, retry, fresh
+
+    first, retry, fresh = run_client(run)
+    assert retry == first
+    assert fresh["message_id"] != first["message_id"]
+    assert len(llm.calls) == 2
+    assert len(stored) == 2
+
+
+def test_duplicate_in_flight_streams_share_one_turn(chat_env):
+    llm, stored = chat_env
+    llm.reply = "First sentence of the answer. And here is the second one."
+    llm.token_delay = 0.01
+
+    async def run(client):
+        first = asyncio.ensure_future(post_stream(client, headers={"Idempotency-Key": "abc"}))
+        await asyncio.sleep(0.15)
+        # Joins mid-stream, after the first chunk went out
+        late = post_stream(client, headers={"Idempotency-Key": "abc"})
+        unkeyed = [post_stream(client, "same message") for _ in range(3)]
+        first, late, *unkeyed = await asyncio.gather(first, late, *unkeyed)
+        return first, late, unkeyed
+
+    first, late, unkeyed = run_client(run)
+    assert [event for event, _ in first] == ["persona", "chunk", "chunk", "done"]
+    assert late == first
+    assert unkeyed[0] == unkeyed[1] == unkeyed[2]
+    assert len(llm.calls) == 2
+    assert stored == [first[-1][1]["message_id"], unkeyed[0][-1][1]["message_id"]]
+    assert server.chat_stream_flight.stats == {"calls": 2, "shared": 3}
+
+
+def test_stream_retry_with_idempotency_key_replays_stored_turn(chat_env):
+    llm, stored = chat_env
+    llm.reply = "First sentence of the answer. And here is the second one."
+
+    async def run(client):
+        first = await post_stream(client, headers={"Idempotency-Key": "abc"})
+        retry = await post_stream(client, headers={"Idempotency-Key": "abc"})
+        # The same key works across /api/chat and /api/chat/stream
+        plain = await post_chat(client, headers={"Idempotency-Key": "abc"})
+        return first, retry, plain
+
+    first, retry, plain = run_client(run)
+    assert retry == first
+    assert plain == first[-1][1]
+    assert len(llm.calls) == 1 and len(stored) == 1
+
+
+def test_idempotency_key_is_found_in_mongo(chat_env, monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    llm, _ = chat_env
+    db = mongomock_motor.AsyncMongoMockClient().db
+    monkeypatch.setattr(server, "db", db)
+
+    async def run(client):
+        await db.conversations.insert_one({
+            "_id": "m1", "session_id": "s", "idempotency_key": "abc",
+            "ai_response": "Stored answer", "persona_name": "General Assistant"
+        })
+        return await post_chat(client, headers={"Idempotency-Key": "abc"})
+
+    result = run_client(run)
+    assert result["message_id"] == "m1" and result["response"] == "Stored answer"
+    assert llm.calls == []
+
+
+def test_retry_after_a_failed_turn_calls_the_llm_again(chat_env, monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    llm, _ = chat_env
+    db = mongomock_motor.AsyncMongoMockClient().db
+    monkeypatch.setattr(server, "db", db)
+    create = llm.create
+
+    async def fail_first(**kwargs):
+        if not llm.calls:
+            llm.calls.append(kwargs)
+            raise TimeoutError("provider timed out")
+        return await create(**kwargs)
+
+    llm.chat.completions.create = fail_first
+
+    async def store_conversation(message_id, request, result, idempotency_key=None):
+        await db.conversations.insert_one(server.conversation_document(message_id, request, result, idempotency_key))
+
+    monkeypatch.setattr(server, "store_conversation", store_conversation)
+
+    async def run(client):
+        failed = await post_chat(client, headers={"Idempotency-Key": "abc"})
+        retry = await post_chat(client, headers={"Idempotency-Key": "abc"})
+        again = await post_chat(client, headers={"Idempotency-Key": "abc"})
+        return failed, retry, again
+
+    failed, retry, again = run_client(run)
+    assert failed["response"].startswith("I'm having trouble")
+    assert retry["response"] == llm.reply and retry["message_id"] != failed["message_id"]
+    assert again == retry
+    assert len(llm.calls) == 2
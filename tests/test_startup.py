@@ -0,0 +1,149 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import serve
+import server
+from tests.conftest import BACKEND_DIR
+from tests.fakes import FakeAsyncLLM
+
+
+def test_import_does_not_load_llm_sdks():
+    code = "import sys, server; print(sorted(m for m in ('openai', 'groq') if m in sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=dict(os.environ),
+        capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip().splitlines()[-1] == "[]"
+
+
+class FlakyMongoClient:
+    """Mongo client whose ping hangs until `up` is set, then delegates to a mock"""
+
+    def __init__(self, mock):
+        self.mock = mock
+        self.up = False
+        self.admin = SimpleNamespace(command=self.command)
+
+    async def command(self, name):
+        if not self.up:
+            await asyncio.sleep(3600)
+        return await self.mock.admin.command(name)
+
+    def __getattr__(self, name):
+        return getattr(self.mock, name)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def startup_env(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    client = FlakyMongoClient(mongomock_motor.AsyncMongoMockClient())
+    monkeypatch.setattr(server, "AsyncIOMotorClient", lambda url: client)
+    monkeypatch.setattr(server, "MONGO_CONNECT_TIMEOUT", 0.05)
+    monkeypatch.setattr(server, "MONGO_RETRY_INTERVAL", 0.02)
+    monkeypatch.setattr(server, "db", None)
+    monkeypatch.setattr(server, "mongo_client", None)
+    monkeypatch.setattr(server, "groq_client", None)
+    monkeypatch.setattr(server, "llm_client_ready", None)
+    monkeypatch.setattr(server, "conversation_writer", server.ConversationWriter(None, flush_interval=0.01))
+    monkeypatch.setattr(server, "Saarthi_system", server.SaarthiAgentSystem())
+    return client
+
+
+def test_unreachable_mongo_does_not_stall_startup_and_reconnects(startup_env, monkeypatch):
+    client = startup_env
+    monkeypatch.setattr(server, "create_llm_client", lambda: (FakeAsyncLLM(), True))
+
+    async def run():
+        start = time.perf_counter()
+        async with server.lifespan(server.app):
+            boot = time.perf_counter() - start
+            assert server.db is None
+            client.up = True
+            for _ in range(100):
+                if server.db is not None:
+                    break
+                await asyncio.sleep(0.01)
+            assert server.db is not None
+            assert server.conversation_writer.collection.name == "conversations"
+        return boot
+
+    assert asyncio.run(run()) < 1.0
+
+
+def test_first_request_waits_for_the_llm_client(startup_env, monkeypatch):
+    client = startup_env
+    client.up = True
+    llm = FakeAsyncLLM()
+
+    def slow_client():
+        time.sleep(0.2)
+        return llm, True
+
+    monkeypatch.setattr(server, "create_llm_client", slow_client)
+
+    async def run():
+        async with server.lifespan(server.app):
+            assert server.groq_client is None
+            result = await server.Saarthi_system.generate_response("hello", "startup")
+            return result
+
+    result = asyncio.run(run())
+    assert "error" not in result
+    assert len(llm.calls) == 1
+
+
+def test_shutdown_finishes_background_turns_and_flushes_their_writes(startup_env, monkeypatch):
+    client = startup_env
+    client.up = True
+    llm = FakeAsyncLLM(delay=0.2)
+    monkeypatch.setattr(server, "create_llm_client", lambda: (llm, True))
+    monkeypatch.setattr(server, "chat_flight", server.SingleFlight())
+
+    async def run():
+        async with server.lifespan(server.app):
+            request = server.ConversationRequest(message="hello", session_id="draining")
+            # A turn whose client went away: only the shielded flight task is left running
+            caller = asyncio.ensure_future(server.chat_flight.do("turn", lambda: server.run_chat(request)))
+            await asyncio.sleep(0.05)
+            caller.cancel()
+        return await server.db.conversations.count_documents({"session_id": "draining"})
+
+    assert asyncio.run(run()) == 1
+    assert len(llm.calls) == 1
+
+
+def test_database_attaches_when_an_index_build_fails(startup_env, monkeypatch):
+    client = startup_env
+    client.up = True
+    limiter = server.MongoRateLimiter(None, "session", rate=1, burst=5)
+    monkeypatch.setattr(server, "session_limiter", limiter)
+
+    async def fail():
+        raise RuntimeError("index build failed")
+
+    monkeypatch.setattr(limiter, "ensure_indexes", fail)
+    monkeypatch.setattr(server, "search_index", None)
+    assert asyncio.run(server.attach_database(client)) is True
+    assert server.db is not None
+    assert limiter.collection.name == "rate_limits"
+
+
+def test_several_workers_default_to_shared_state():
+    environ = {"HISTORY_STORE": "memory"}
+    serve.configure_shared_state(4, environ)
+    assert environ == {"HISTORY_STORE": "memory", "RATE_LIMIT_STORE": "mongo", "RESPONSE_CACHE_STORE": "mongo",
+                       "SEARCH_INDEX": "mongo"}
+
+    single = {}
+    serve.configure_shared_state(1, single)
+    assert single == {}
+    assert serve.worker_count(0) >= 1 and serve.worker_count(3) == 3
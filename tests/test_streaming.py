@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import server
+from streaming import SentenceChunker
+from tests.fakes import FakeAsyncLLM, parse_sse
+
+REPLY = "Photosynthesis turns light into chemical energy. Plants use it to make sugar! Does that help?"
+
+
+def test_chunker_releases_complete_sentences_only():
+    chunker = SentenceChunker(min_chars=5)
+    assert chunker.feed("Hello there. How ") == ["Hello there."]
+    assert chunker.feed("are you") == []
+    assert chunker.feed("? Fine") == ["How are you?"]
+    assert chunker.flush() == ["Fine"]
+    assert chunker.flush() == []
+
+
+def test_chunker_merges_short_fragments():
+    chunker = SentenceChunker(min_chars=20)
+    assert chunker.feed("Hi! This sentence is long enough. ") == ["Hi! This sentence is long enough."]
+
+
+@pytest.fixture
+def streaming_llm(monkeypatch):
+    llm = FakeAsyncLLM(reply=REPLY, token_delay=0.02)
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    monkeypatch.setattr(server, "db", None)
+    return llm
+
+
+def test_stream_endpoint_emits_sentences_then_done(streaming_llm):
+    session_id = "stream-session"
+    asyncio.run(server.Saarthi_system.history_store.clear(session_id))
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/chat/stream", json={
+                "message": "explain photosynthesis", "session_id": session_id
+            })
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    assert events[0] == ("persona", {"persona_used": "Education Specialist"})
+    chunks = [data["text"] for name, data in events if name == "chunk"]
+    assert chunks == [
+        "Photosynthesis turns light into chemical energy.",
+        "Plants use it to make sugar!",
+        "Does that help?",
+    ]
+    name, done = events[-1]
+    assert name == "done"
+    assert done["response"] == REPLY
+    assert done["message_id"]
+    assert streaming_llm.calls[0]["stream"] is True
+    history = asyncio.run(server.Saarthi_system.history_store.get(session_id))
+    assert history == ["explain photosynthesis", REPLY]
+
+
+def test_first_chunk_arrives_before_generation_finishes(streaming_llm):
+    async def run():
+        received = []
+        start = time.perf_counter()
+        async for event in server.Saarthi_system.stream_response("hello", "ttfc-session"):
+            received.append((event["type"], time.perf_counter() - start))
+        return received
+
+    received = asyncio.run(run())
+    first_chunk = next(t for kind, t in received if kind == "chunk")
+    done = received[-1][1]
+    assert first_chunk < done / 2
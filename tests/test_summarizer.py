@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+import server
+from summarizer import (
+    EMPTY_SUMMARY,
+    MemorySummaryStore,
+    MongoSummaryStore,
+    RollingSummarizer,
+    fingerprint,
+    unfolded,
+)
+from tests.fakes import FakeAsyncLLM
+
+
+class FakeSummarize:
+    """Summarize callable that appends user messages to the previous summary"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, summary, exchanges):
+        self.calls.append((summary, list(exchanges)))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return " ".join(filter(None, [summary] + [user for user, _ in exchanges]))
+
+
+def test_unfolded_skips_exchanges_already_in_summary():
+    evicted = ["q1", "a1", "q2", "a2", "q3", "a3"]
+    assert unfolded(evicted, EMPTY_SUMMARY) == [("q1", "a1"), ("q2", "a2"), ("q3", "a3")]
+    record = {"summary": "s", "through": fingerprint(("q2", "a2"))}
+    assert unfolded(evicted, record) == [("q3", "a3")]
+    # Folded exchange already dropped from history: everything evicted is newer
+    record = {"summary": "s", "through": fingerprint(("q0", "a0"))}
+    assert len(unfolded(evicted, record)) == 3
+
+
+def test_summarizer_folds_incrementally():
+    summarize = FakeSummarize()
+    summarizer = RollingSummarizer(MemorySummaryStore(), summarize, interval=0.01)
+
+    async def run():
+        summarizer.schedule("s", ["q1", "a1"])
+        await asyncio.sleep(0.05)
+        record = await summarizer.get("s")
+        summarizer.schedule("s", ["q1", "a1", "q2", "a2"], record)
+        await asyncio.sleep(0.05)
+        # Nothing new: not even queued
+        record = await summarizer.get("s")
+        summarizer.schedule("s", ["q1", "a1", "q2", "a2"], record)
+        await summarizer.close()
+        return record
+
+    record = asyncio.run(run())
+    assert record["summary"] == "q1 q2"
+    assert summarize.calls == [("", [("q1", "a1")]), ("q1", [("q2", "a2")])]
+    assert summarizer.stats["scheduled"] == 2
+    assert summarizer.stats["exchanges"] == 2
+
+
+def test_summarizer_batches_and_limits_concurrency():
+    summarize = FakeSummarize(delay=0.05)
+    summarizer = RollingSummarizer(MemorySummaryStore(), summarize, batch_size=4, interval=0.2, concurrency=2)
+
+    async def run():
+        for i in range(10):
+            summarizer.schedule(f"s{i}", [f"q{i}", f"a{i}"])
+        await asyncio.sleep(0.35)
+        first_tick = summarizer.stats["summarized"]
+        await summarizer.close()
+        return first_tick
+
+    # One batch of batch_size per interval, at most `concurrency` calls at once
+    assert asyncio.run(run()) == 4
+    assert summarize.max_in_flight == 2
+    assert len(summarizer.pending) == 6
+
+
+def test_summarizer_defers_while_busy():
+    busy = [True]
+    summarize = FakeSummarize()
+    summarizer = RollingSummarizer(MemorySummaryStore(), summarize, interval=0.01, is_busy=lambda: busy[0])
+
+    async def run():
+        summarizer.schedule("s", ["q", "a"])
+        await asyncio.sleep(0.05)
+        deferred = len(summarize.calls)
+        busy[0] = False
+        await asyncio.sleep(0.05)
+        await summarizer.close()
+        return deferred
+
+    assert asyncio.run(run()) == 0
+    assert summarizer.stats["deferred"] > 0
+    assert len(summarize.calls) == 1
+
+
+def test_mongo_summary_is_kept_on_the_session_document():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    sessions = mongomock_motor.AsyncMongoMockClient().db.sessions
+    store = MongoSummaryStore(sessions)
+
+    async def run():
+        await sessions.insert_one({"_id": "s", "message_count": 12})
+        await store.put("s", "they like chess", "abc")
+        await store.put("missing", "never stored", "abc")
+        stored = await store.get("s")
+        missing = await store.get("missing")
+        await store.clear("s")
+        cleared = await store.get("s")
+        doc = await sessions.find_one({"_id": "s"})
+        return stored, missing, cleared, doc, await sessions.count_documents({})
+
+    stored, missing, cleared, doc, count = asyncio.run(run())
+    assert stored == {"summary": "they like chess", "through": "abc"}
+    assert missing == EMPTY_SUMMARY and cleared == EMPTY_SUMMARY
+    assert doc["message_count"] == 12
+    assert count == 1
+
+
+def test_long_session_keeps_summary_in_prompt(monkeypatch):
+    monkeypatch.setattr(server, "db", None)
+    llm = FakeAsyncLLM(reply="Noted.")
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    agent = server.SaarthiAgentSystem(
+        context_builder=server.ContextBuilder(max_exchanges=2),
+        summary_store=MemorySummaryStore()
+    )
+    agent.summarizer.interval = 0.01
+
+    async def run():
+        for i in range(5):
+            await agent.generate_response(f"fact number {i}", "s")
+            await asyncio.sleep(0.05)
+        await agent.summarizer.close()
+
+    asyncio.run(run())
+    chat_calls = [call for call in llm.calls if call["max_tokens"] == 500]
+    summary_calls = [call for call in llm.calls if call["messages"][0]["content"] == server.SUMMARY_PROMPT]
+    assert summary_calls
+    last = chat_calls[-1]["messages"]
+    assert last[1]["role"] == "system" and last[1]["content"].endswith("Noted.")
+    # Bounded window: persona, summary, two exchanges, new message
+    assert len(last) == 7
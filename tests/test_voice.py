@@ -0,0 +1,194 @@
+import asyncio
+
+import pytest
+
+import server
+from admission import AdmissionController
+from singleflight import SingleFlight
+from tests.fakes import ASGIWebSocket, FakeAsyncLLM, FakeRecognizer, FakeSynthesizer, pcm_silence, pcm_tone
+from voice import AudioRingBuffer, EndpointDetector
+
+
+def test_ring_buffer_wraps_without_copying_or_overwriting_unread_audio():
+    ring = AudioRingBuffer(8)
+    assert ring.write(b"abcdef") == 6
+    ring.consume(4)
+    assert ring.write(b"ghijklmn") == 6
+    assert ring.dropped == 2
+
+    first = ring.peek(100)
+    assert first.obj is ring.buffer
+    assert bytes(first) == b"efgh"
+    ring.consume(len(first))
+    assert bytes(ring.peek(100)) == b"ijkl"
+    assert len(ring) == 4
+
+
+def test_endpoint_detector_waits_for_speech_then_silence():
+    detector = EndpointDetector(threshold=500, silence_ms=100)
+    assert not detector.feed(memoryview(pcm_silence(500)))
+    assert not detector.feed(memoryview(pcm_tone(200)))
+    assert not detector.feed(memoryview(pcm_silence(80)))
+    assert detector.feed(memoryview(pcm_silence(20)))
+
+    detector.reset()
+    assert not detector.feed(memoryview(pcm_silence(200)))
+
+
+@pytest.fixture
+def voice_env(monkeypatch):
+    llm = FakeAsyncLLM(reply="Exams can feel overwhelming. Let's make a plan together, one subject at a time.")
+    recognizer, synthesizer = FakeRecognizer(), FakeSynthesizer()
+    monkeypatch.setattr(server, "db", None)
+    monkeypatch.setattr(server, "groq_client", llm)
+    monkeypatch.setattr(server, "groq_client_is_async", True)
+    monkeypatch.setattr(server, "Saarthi_system", server.SaarthiAgentSystem())
+    monkeypatch.setattr(server, "chat_flight", SingleFlight())
+    monkeypatch.setattr(server, "speech_recognizer", recognizer)
+    monkeypatch.setattr(server, "speech_synthesizer", synthesizer)
+    monkeypatch.setattr(server, "voice_models_ready", None)
+    monkeypatch.setattr(server, "VOICE_SILENCE_MS", 200)
+    monkeypatch.setattr(server, "session_limiter", server.RateLimiter(rate=0, burst=1))
+    stored = []
+
+    async def store_conversation(message_id, request, result, idempotency_key=None):
+        stored.append((request.message, result["response"]))
+
+    monkeypatch.setattr(server, "store_conversation", store_conversation)
+    return llm, recognizer, synthesizer, stored
+
+
+async def receive_until(ws, message_type):
+    """Messages up to and including the first `message_type` event; audio as bytes"""
+    messages = []
+    while not (messages and isinstance(messages[-1], dict) and messages[-1]["type"] == message_type):
+        messages.append(await ws.receive())
+    return messages
+
+
+def test_voice_turn_from_silence_detection_to_spoken_reply(voice_env):
+    llm, recognizer, synthesizer, stored = voice_env
+
+    async def run():
+        async with ASGIWebSocket(server.app, "/api/voice") as ws:
+            await ws.send_json({"type": "start", "session_id": "voice-1"})
+            assert await ws.receive() == {"type": "ready", "sample_rate": 16000, "tts_sample_rate": 22050}
+            # Odd-sized chunks, as a network would deliver them
+            audio = pcm_tone(300) + pcm_silence(300)
+            for offset in range(0, len(audio), 999):
+                await ws.send_bytes(audio[offset:offset + 999])
+            return await receive_until(ws, "transcript"), await receive_until(ws, "done")
+
+    heard, reply = asyncio.run(run())
+    assert heard[0]["type"] == "partial"
+    assert heard[-1]["text"] == recognizer.transcript
+    types = [m["type"] if isinstance(m, dict) else "pcm" for m in reply]
+    assert types == ["persona", "chunk", "audio", "pcm", "chunk", "audio", "pcm", "done"]
+    assert reply[0]["persona_used"] == "Mental Health Support"
+    assert reply[3] == b"\x01\x00" * len(reply[1]["text"])
+    assert reply[2]["bytes"] == len(reply[3]) and reply[2]["sample_rate"] == 22050
+    assert synthesizer.sentences == [reply[1]["text"], reply[4]["text"]]
+    assert stored == [(recognizer.transcript, llm.reply)]
+    # The recognizer was handed views of the ring buffer, never copies
+    assert set(recognizer.views) == {"memoryview"}
+
+
+def test_client_can_end_the_utterance_and_get_text_only_replies(voice_env, monkeypatch):
+    llm, recognizer, _, stored = voice_env
+    monkeypatch.setattr(server, "speech_synthesizer", None)
+
+    async def run():
+        async with ASGIWebSocket(server.app, "/api/voice") as ws:
+            await ws.send_json({"type": "start", "session_id": "voice-2", "persona_preference": "general"})
+            assert (await ws.receive())["tts_sample_rate"] is None
+            await ws.send_bytes(pcm_tone(100))
+            await ws.send_json({"type": "end"})
+            return await receive_until(ws, "done")
+
+    messages = asyncio.run(run())
+    assert [m for m in messages if m["type"] == "transcript"][0]["text"] == recognizer.transcript
+    assert "audio" not in {m["type"] for m in messages}
+    assert len(stored) == 1
+
+
+def test_voice_is_refused_without_a_recognizer_or_with_a_bad_start(voice_env, monkeypatch):
+    async def run():
+        async with ASGIWebSocket(server.app, "/api/voice") as ws:
+            await ws.send_json({"type": "start", "session_id": "voice-3", "encoding": "mp3"})
+            bad_start = await ws.receive()
+            assert await ws.receive() is None
+        monkeypatch.setattr(server, "speech_recognizer", None)
+        async with ASGIWebSocket(server.app, "/api/voice") as ws:
+            disabled = await ws.receive()
+        return bad_start, disabled
+
+    bad_start, disabled = asyncio.run(run())
+    assert bad_start["type"] == "error" and "Encoding" in bad_start["detail"]
+    assert "not enabled" in disabled["detail"]
+
+
+class FakeOpusDecoder:
+    """Passes packets through as PCM, except corrupt ones"""
+
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+
+    def decode(self, packet):
+        if packet == b"corrupt":
+            raise ValueError("Invalid Opus packet: corrupted stream")
+        return packet
+
+
+def test_unsupported_opus_rates_and_bad_messages_get_error_events(voice_env, monkeypatch):
+    llm, recognizer, _, stored = voice_env
+    monkeypatch.setattr(server, "speech_synthesizer", None)
+    monkeypatch.setattr(server, "OpusDecoder", FakeOpusDecoder)
+
+    async def run():
+        async with ASGIWebSocket(server.app, "/api/voice") as ws:
+            await ws.send_json({"type": "start", "session_id": "voice-4", "encoding": "opus", "sample_rate": 44100})
+            bad_rate = await ws.receive()
+            assert await ws.receive() is None
+        async with ASGIWebSocket(server.app, "/api/voice") as ws:
+            await ws.send_json({"type": "start", "session_id": "voice-4", "encoding": "opus", "sample_rate": 16000})
+            assert (await ws.receive())["type"] == "ready"
+            await ws.send_bytes(b"corrupt")
+            corrupt = await ws.receive()
+            await ws.inbound.put({"type": "websocket.receive", "text": "{not json"})
+            malformed = await ws.receive()
+            # The session carries on after both
+            await ws.send_bytes(pcm_tone(100))
+            await ws.send_json({"type": "end"})
+            return bad_rate, corrupt, malformed, await receive_until(ws, "done")
+
+    bad_rate, corrupt, malformed, reply = asyncio.run(run())
+    assert bad_rate["type"] == "error" and "48000" in bad_rate["detail"]
+    assert corrupt["type"] == "error" and "Opus" in corrupt["detail"]
+    assert malformed["type"] == "error"
+    assert reply[-1]["response"] == llm.reply and len(stored) == 1
+
+
+def test_voice_turns_wait_for_an_admission_slot(voice_env, monkeypatch):
+    llm, recognizer, _, stored = voice_env
+    monkeypatch.setattr(server, "speech_synthesizer", None)
+    admission = AdmissionController(max_concurrent=1, max_queue=0)
+    monkeypatch.setattr(server, "chat_admission", admission)
+
+    async def utterance(ws, message_type):
+        await ws.send_bytes(pcm_tone(100))
+        await ws.send_json({"type": "end"})
+        return await receive_until(ws, message_type)
+
+    async def run():
+        held = await admission.acquire()
+        async with ASGIWebSocket(server.app, "/api/voice") as ws:
+            await ws.send_json({"type": "start", "session_id": "voice-5"})
+            assert (await ws.receive())["type"] == "ready"
+            refused = await utterance(ws, "error")
+            admission.release(held)
+            return refused[-1], await utterance(ws, "done")
+
+    refused, reply = asyncio.run(run())
+    assert refused["status"] == 429 and refused["retry_after"] >= 1
+    assert reply[-1]["response"] == llm.reply and len(stored) == 1
+    assert admission.active == 0 and admission.stats["shed_queue_full"] == 1